@@ -4,38 +4,93 @@
 import os
 import re
 import sys
+import threading
+import time
+
+# Startup profile: (phase, seconds) in load order; shown by the "startup" command
+# or at launch with CHETNA_PROFILE_STARTUP=1. For per-module detail run
+# `python -X importtime botchetna.py`.
+STARTUP = []
+_phase_t0 = time.perf_counter()
+
+def _phase(name):
+    global _phase_t0
+    now = time.perf_counter()
+    STARTUP.append((name, now - _phase_t0))
+    _phase_t0 = now
+
 from chetnaintent import get_intent
-from chetna_loader import ChetnaLoader
+from chetna_loader import ChetnaLoader, minutes_now
+from chetna_planner import planner_for
+from chetna_positions import load_routes, positions_for
+from chetna_cities import resolver_for
+from chetna_reload import TimetableReloader, format_stats as format_reload_stats
+from chetna_analytics import format_report as format_complaint_report
+from chetna_llmcache import ResponseCache
+from chetna_llmworker import LlmWorker
+from chetna_metrics import format_stats as format_metrics
+from chetna_speech import SpeechService, DEFAULT_MODEL_DIR as DEFAULT_VOSK_MODEL
 from chetnautils import (
-    respond3, respond, detect_language, log_event, log_chat,
-    save_complaint_json, get_bus_delay_minutes,
-    voice_available, tts_available, say,
+    respond3, respond, prompt, fixed_prompts, detect_language, log_event, log_chat, chunked,
+    save_complaint_json, get_bus_delay_minutes, current_delays, COMPLAINT_STATS, METRICS, DELAYS,
+    voice_available, tts_available, say, cancel_speech, tts_service, module_available,
 )
-import json
-from langdetect import detect   
-import pyttsx3                         # for text-to-speech (Chetna’s female voice)
-import speech_recognition as sr
+_phase("imports")
+
 # -------- Optional: GPT4All local LLM (used only if installed & available) --------
-LOCAL_LLM_READY = False
-LLM_MODEL = None
-try:
-    from gpt4all import GPT4All  # pip install gpt4all
-    model_name = os.getenv("CHETNA_GPT4ALL_MODEL", "ggml-model-gpt4all-falcon-q4_0.bin")
-    model_dir = os.getenv("CHETNA_GPT4ALL_MODELS", os.path.join(os.getcwd(), "models"))
-    model_path = os.path.join(model_dir, model_name)
-    if os.path.exists(model_path):
-        LLM_MODEL = GPT4All(model_name=model_name, model_path=model_dir, allow_download=False)
-        LOCAL_LLM_READY = True
-except Exception:
-    LOCAL_LLM_READY = False
-
-def llm_fallback(prompt: str, lang: str) -> str:
+# The model is loaded on first use, or warmed in a background thread once the
+# prompt is up (CHETNA_LLM_WARM=0 to disable), never at import.
+LLM_MODEL_NAME = os.getenv("CHETNA_GPT4ALL_MODEL", "ggml-model-gpt4all-falcon-q4_0.bin")
+LLM_MODEL_DIR = os.getenv("CHETNA_GPT4ALL_MODELS", os.path.join(os.getcwd(), "models"))
+LOCAL_LLM_READY = module_available("gpt4all") and os.path.exists(os.path.join(LLM_MODEL_DIR, LLM_MODEL_NAME))
+_LLM = None          # None = not loaded yet, False = failed to load
+_LLM_LOCK = threading.Lock()
+
+def get_llm():
+    """The GPT4All model, loading it on first call; None if unavailable."""
+    global _LLM
+    if not LOCAL_LLM_READY:
+        return None
+    if _LLM is None:
+        with _LLM_LOCK:
+            if _LLM is None:
+                t0 = time.perf_counter()
+                try:
+                    from gpt4all import GPT4All  # pip install gpt4all
+                    _LLM = GPT4All(model_name=LLM_MODEL_NAME, model_path=LLM_MODEL_DIR, allow_download=False)
+                except Exception:
+                    _LLM = False
+                STARTUP.append(("llm (lazy)", time.perf_counter() - t0))
+    return _LLM or None
+
+def warm_llm_async():
+    if LOCAL_LLM_READY and _LLM is None:
+        threading.Thread(target=get_llm, name="chetna-llm-warm", daemon=True).start()
+
+# Answers are cached by (language, normalized prompt), near-duplicates included,
+# and kept on disk for CHETNA_LLM_CACHE_TTL_HOURS (default 168)
+LLM_CACHE = ResponseCache(
+    os.getenv("CHETNA_LLM_CACHE", "cache/llm_answers.jsonl"),
+    max_entries=int(os.getenv("CHETNA_LLM_CACHE_SIZE", "2000")),
+    ttl=float(os.getenv("CHETNA_LLM_CACHE_TTL_HOURS", "168")) * 3600,
+)
+
+# Inference runs on its own thread; a reply waits at most CHETNA_LLM_DEADLINE_SECONDS
+# (default 8). Late answers are still finished and cached unless CHETNA_LLM_LATE=discard.
+LLM_DEADLINE = float(os.getenv("CHETNA_LLM_DEADLINE_SECONDS", "8"))
+LLM_WORKER = LlmWorker(get_llm, cache=LLM_CACHE, keep_late=os.getenv("CHETNA_LLM_LATE", "cache") != "discard")
+
+@METRICS.timed("llm_fallback")
+def llm_fallback(prompt: str, lang: str, on_token=None, on_sentence=None) -> str:
     """
     Used when intent is unknown and a local GPT4All model is available.
     Language-aware: en / hi / hi-latn (Hinglish).
+    on_token / on_sentence receive the answer while it is generated.
+    Returns "" if the model is unavailable or misses the deadline.
     """
-    if not LOCAL_LLM_READY or LLM_MODEL is None:
-        return ""
+    cached = LLM_CACHE.get(prompt, lang)
+    if cached is not None:
+        return cached
     if lang == "hi":
         target = "Hindi (Devanagari script)"
     elif lang == "hi-latn":
@@ -46,53 +101,116 @@ def llm_fallback(prompt: str, lang: str) -> str:
         "You are Chetna, a polite female transport assistant. "
         f"Answer concisely in {target}, no emojis."
     )
-    try:
-        with LLM_MODEL.chat_session(system_prompt=system):
-            out = LLM_MODEL.generate(prompt, max_tokens=256, temp=0.2)
-        return (out or "").strip()
-    except Exception:
-        return ""
+    answer = LLM_WORKER.ask(prompt, lang, system, LLM_DEADLINE, on_token, on_sentence)
+    return answer or ""
 
 # ---------------- Data ----------------
 DATA_PATH_JSON = "data/chetnasample_buses.json"
 DATA_PATH_CSV  = "data/chetnasample_buses.csv"
+# CHETNA_DATA=<file.csv|file.json> serves another timetable (default: the sample, JSON if present)
+DATA_PATH = os.getenv("CHETNA_DATA") or (DATA_PATH_JSON if os.path.exists(DATA_PATH_JSON) else DATA_PATH_CSV)
+
+# The timetable is kept in compact arrays and cached in a memory-mapped <file>.snap,
+# so a restart maps the snapshot instead of re-parsing the data file
+# (CHETNA_SNAPSHOT=0 to always parse; CHETNA_STORAGE=dict for plain row dicts)
+loader = ChetnaLoader(
+    DATA_PATH,
+    storage=os.getenv("CHETNA_STORAGE", "columnar"),
+    snapshot=os.getenv("CHETNA_SNAPSHOT", "1") != "0",
+)
 
-loader = ChetnaLoader(DATA_PATH_JSON if os.path.exists(DATA_PATH_JSON) else DATA_PATH_CSV)
-BUSES = loader.load()
-
-# ---------------- Intro ----------------
-print("Chetna started! Type 'help' for options and 'exit' to quit.")
-
-def handle_intent(user_input: str):
+# Stops and segment times per route for track_bus (chetna_positions.py); positions
+# are recomputed for the whole fleet at most every CHETNA_POSITION_TICK seconds.
+ROUTES_PATH = os.getenv("CHETNA_ROUTES", "data/chetnasample_routes.json")
+ROUTES = load_routes(ROUTES_PATH)
+POSITION_TICK = float(os.getenv("CHETNA_POSITION_TICK", "15"))
+
+def position_engine(tt):
+    return positions_for(tt, ROUTES, current_delays, POSITION_TICK)
+
+def _log_reload(stats):
+    log_event(f"DATA: {format_reload_stats(stats)} from {loader.file_path}"
+              + (f"; first errors: {stats['errors']}" if stats.get("errors") else ""))
+
+def _prepare_timetable(tt):
+    # Build the derived indexes on the loading thread, before the timetable goes live
+    resolver_for(tt)
+    planner_for(tt)
+    position_engine(tt)
+
+# Live timetable; picks up data-file changes and appended delta lines
+# (CHETNA_DELTA_PATH, default <data file>.delta.jsonl) every CHETNA_WATCH_SECONDS.
+TIMETABLE = TimetableReloader(
+    loader,
+    delta_path=os.getenv("CHETNA_DELTA_PATH", os.path.splitext(loader.file_path)[0] + ".delta.jsonl"),
+    on_reload=_log_reload,
+    prepare=_prepare_timetable,
+    max_reject_ratio=float(os.getenv("CHETNA_RELOAD_MAX_REJECT", "0.05")),
+    min_keep_ratio=float(os.getenv("CHETNA_RELOAD_MIN_KEEP", "0.5")),
+)
+if TIMETABLE.last_stats.get("errors"):
+    _log_reload(TIMETABLE.last_stats)
+WATCH_SECONDS = float(os.getenv("CHETNA_WATCH_SECONDS", "5"))
+if WATCH_SECONDS > 0:
+    TIMETABLE.start_watching(WATCH_SECONDS)
+_phase("timetable")
+
+def format_startup():
+    total = sum(sec for name, sec in STARTUP if not name.endswith("(lazy)"))
+    rows = [f"  {name:<16} {sec * 1000:8.1f} ms" for name, sec in STARTUP]
+    return "Startup profile:\n" + "\n".join(rows) + f"\n  {'to prompt':<16} {total * 1000:8.1f} ms"
+
+_NEXT_DAY = {"en": " (tomorrow)", "hi": " (कल)", "hi-latn": " (kal)"}
+
+
+def _journey_text(journey, lang):
+    # mark times that fall on the next day
+    mark = _NEXT_DAY.get(lang, _NEXT_DAY["en"])
+    legs = [(b, s, d + (mark if dd else ""), t, a + (mark if ad and not dd else ""))
+            for (b, s, d, t, a), (dd, ad) in zip(journey.describe_legs(), journey.leg_days())]
+    if lang == "hi":
+        parts = [f"बस {b}: {s} {d} से {t} {a}" for b, s, d, t, a in legs]
+        return "; फिर ".join(parts) + f" (बदलाव: {journey.transfers})"
+    if lang == "hi-latn":
+        parts = [f"Bus {b}: {s} {d} se {t} {a}" for b, s, d, t, a in legs]
+        return "; phir ".join(parts) + f" (badlav: {journey.transfers})"
+    parts = [f"Bus {b}: {s} {d} -> {t} {a}" for b, s, d, t, a in legs]
+    changes = journey.transfers
+    return "; then ".join(parts) + f" ({changes} change{'s' if changes != 1 else ''})"
+
+def handle_intent(user_input: str, dry_run: bool = False, intent_data: dict = None,
+                  on_token=None, on_sentence=None):
     """
     Core dispatcher. Detects intent and returns (reply_text, speak_text).
+    dry_run=True skips side effects (complaints are not saved), for replays.
+    intent_data: get_intent(user_input), if the caller already has it.
+    on_token / on_sentence: stream a local-LLM answer while it is generated.
     """
-    intent_data = get_intent(user_input)
+    with METRICS.turn() as turn:
+        intent_data = intent_data or get_intent(user_input)
+        turn.label(intent_data)
+        # "lookup" is the dispatcher's own time: timetable lookups and reply text.
+        # Delay, LLM and other timed stages inside it are recorded separately.
+        with METRICS.stage("lookup"):
+            return _dispatch(user_input, dry_run, intent_data, on_token, on_sentence)
+
+def _dispatch(user_input, dry_run, intent_data, on_token, on_sentence):
+    buses = TIMETABLE.current  # one consistent timetable for the whole turn
     intent = intent_data.get("intent", "unknown")
     lang = intent_data.get("lang") or detect_language(user_input)
 
     # 1) Greetings
     if intent == "greetings":
-        msg = respond3(
-            "Hello! I am Chetna. How can I help you with buses today?",
-            "नमस्ते! मैं चेतना बोल रही हूँ। मैं आपकी बस से जुड़ी मदद कैसे कर सकती हूँ?",
-            "Namaste! Main Chetna bol rahi hoon. Main aapki bus se judi madad kaise kar sakti hoon?",
-            lang
-        )
+        msg = prompt("greeting", lang)
         return msg, msg
 
     # 2) Fare info
     if intent == "fare_info":
         bus_number = intent_data.get("bus_number")
         if not bus_number:
-            msg = respond3(
-                "Please tell me the bus number to check the fare.",
-                "किराया बताने के लिए बस नंबर बताएँ।",
-                "Kirpya kiraya batane ke liye bus number bataye.",
-                lang
-            )
+            msg = prompt("ask_bus_fare", lang)
             return msg, msg
-        bus = loader.search_buses_by_number(BUSES, bus_number)
+        bus = loader.search_buses_by_number(buses, bus_number)
         if bus:
             msg = respond3(
                 f"The fare for bus {bus_number} is {bus['fare']}.",
@@ -113,15 +231,19 @@ def handle_intent(user_input: str):
     if intent == "timing_info":
         bus_number = intent_data.get("bus_number")
         if not bus_number:
+            msg = prompt("ask_bus_timing", lang)
+            return msg, msg
+        trips = loader.search_all_buses_by_number(buses, bus_number)
+        if len(trips) > 1:
+            times = ", ".join(f"{b['time']} ({b['source']} - {b['destination']})" for b in trips)
             msg = respond3(
-                "Please tell me the bus number to check timing.",
-                "टाइमिंग बताने के लिए बस नंबर बताएँ।",
-                "Kirpya timing batane ke liye bus number bataye.",
+                f"Bus {bus_number} leaves at {times}.",
+                f"बस {bus_number} इन समय पर निकलती है: {times}।",
+                f"Bus {bus_number} in samay par nikalti hai: {times}.",
                 lang
             )
-            return msg, msg
-        bus = loader.search_buses_by_number(BUSES, bus_number)
-        if bus:
+        elif trips:
+            bus = trips[0]
             msg = respond3(
                 f"Bus {bus_number} leaves at {bus['time']}.",
                 f"बस {bus_number} {bus['time']} बजे निकलती है।",
@@ -141,21 +263,39 @@ def handle_intent(user_input: str):
     if intent == "track_bus":
         bus_number = intent_data.get("bus_number")
         if not bus_number:
+            msg = prompt("ask_bus_track", lang)
+            return msg, msg
+        pos = position_engine(buses).locate(bus_number)
+        if pos and pos["state"] == "running" and pos["near"]:
+            near, dst = pos["near"], pos["destination"]
             msg = respond3(
-                "Please tell me the bus number to track.",
-                "बस को ट्रैक करने के लिए बस नंबर बताएँ।",
-                "Kirpya bus ko track karne ke liye bus number bataye.",
+                f"Bus {bus_number} is currently near {near}, heading to {dst}.",
+                f"बस {bus_number} अभी {near} के पास है, {dst} की ओर जा रही है।",
+                f"Bus {bus_number} abhi {near} ke paas hai, {dst} ki taraf ja rahi hai.",
                 lang
             )
-            return msg, msg
-        bus = loader.search_buses_by_number(BUSES, bus_number)
-        if bus:
-            loc_map = loader.simulate_bus_locations([bus])
-            location = loc_map[str(bus_number)]["location"]
+        elif pos and pos["state"] == "running":
+            (a, b), dst = pos["between"], pos["destination"]
             msg = respond3(
-                f"Bus {bus_number} is currently near {location}.",
-                f"बस {bus_number} अभी {location} के पास है।",
-                f"Bus {bus_number} abhi {location} ke paas hai.",
+                f"Bus {bus_number} is between {a} and {b}, heading to {dst}.",
+                f"बस {bus_number} अभी {a} और {b} के बीच है, {dst} की ओर जा रही है।",
+                f"Bus {bus_number} abhi {a} aur {b} ke beech hai, {dst} ki taraf ja rahi hai.",
+                lang
+            )
+        elif pos and pos["state"] == "waiting":
+            src, dep = pos["source"], pos["departs"]
+            msg = respond3(
+                f"Bus {bus_number} has not left yet; it departs {src} at {dep}.",
+                f"बस {bus_number} अभी निकली नहीं है; {src} से {dep} बजे निकलेगी।",
+                f"Bus {bus_number} abhi nikli nahi hai; {src} se {dep} baje niklegi.",
+                lang
+            )
+        elif pos:
+            dst = pos["destination"]
+            msg = respond3(
+                f"Bus {bus_number} has finished its last trip today at {dst}.",
+                f"बस {bus_number} आज की आख़िरी यात्रा पूरी करके {dst} पहुँच चुकी है।",
+                f"Bus {bus_number} aaj ki aakhri yatra poori karke {dst} pahunch chuki hai.",
                 lang
             )
         else:
@@ -174,17 +314,16 @@ def handle_intent(user_input: str):
         period = intent_data.get("period")
         ask_next = intent_data.get("ask_next", False)
 
+        # Map typos / Hinglish / Devanagari spellings onto the timetable's stop names
+        src = loader.resolve_city(buses, src) or src
+        dst = loader.resolve_city(buses, dst) or dst
+
         if not (src and dst):
-            msg = respond3(
-                "Please provide both source and destination, e.g., 'buses from Delhi to Karnal'.",
-                "कृपया स्रोत और गंतव्य दोनों बताएँ, जैसे: 'दिल्ली से करनाल की बसें'।",
-                "Kirpya source aur destination dono bataye, jaise: 'Delhi se Karnal ki basen'.",
-                lang
-            )
+            msg = prompt("ask_route", lang)
             return msg, msg
 
         if ask_next:
-            nb = loader.next_bus_between(BUSES, src, dst)
+            nb = loader.next_bus_between(buses, src, dst)
             if nb:
                 msg = respond3(
                     f"Next bus from {src} to {dst} is {nb['bus_id']} at {nb['time']} with fare {nb['fare']}.",
@@ -202,7 +341,7 @@ def handle_intent(user_input: str):
             return msg, msg
 
         if period:
-            lb = loader.last_bus_in_period_between(BUSES, src, dst, period)
+            lb = loader.last_bus_in_period_between(buses, src, dst, period)
             if lb:
                 msg = respond3(
                     f"The last {period} bus from {src} to {dst} is {lb['bus_id']} at {lb['time']}.",
@@ -211,7 +350,7 @@ def handle_intent(user_input: str):
                     lang
                 )
             else:
-                matches = loader.buses_between(BUSES, src, dst)
+                matches = loader.buses_between(buses, src, dst)
                 if matches:
                     times = ", ".join([f'{b["bus_id"]} at {b["time"]}' for b in matches])
                     msg = respond3(
@@ -229,7 +368,7 @@ def handle_intent(user_input: str):
                     )
             return msg, msg
 
-        matches = loader.buses_between(BUSES, src, dst)
+        matches = loader.buses_between(buses, src, dst)
         if matches:
             if lang == "hi":
                 lines = [f"बस {b['bus_id']} {b['source']} से {b['destination']} के लिए {b['time']} बजे, किराया {b['fare']}।" for b in matches]
@@ -239,12 +378,15 @@ def handle_intent(user_input: str):
                 lines = [f"Bus {b['bus_id']} from {b['source']} to {b['destination']} at {b['time']} (fare {b['fare']})." for b in matches]
             msg = "\n".join(lines)
         else:
-            nb = loader.next_bus_between(BUSES, src, dst)
-            if nb:
+            # No direct bus: look for connections from now, running on into tomorrow's buses
+            planner = planner_for(buses)
+            journeys = planner.plan(src, dst, minutes_now())
+            if journeys:
+                options = "\n".join(f"{i}) {_journey_text(j, lang)}" for i, j in enumerate(journeys, 1))
                 msg = respond3(
-                    f"No direct listing found. Next bus from {src} to {dst} is {nb['bus_id']} at {nb['time']}.",
-                    f"सीधी सूची नहीं मिली। {src} से {dst} की अगली बस {nb['bus_id']} है, समय {nb['time']}।",
-                    f"Seedhi suchi nahi mili. {src} se {dst} ka agla bus {nb['bus_id']} hai, samay {nb['time']}.",
+                    f"No direct bus from {src} to {dst}. Connecting options:\n{options}",
+                    f"{src} से {dst} के लिए सीधी बस नहीं है। जुड़ने वाले विकल्प:\n{options}",
+                    f"{src} se {dst} ke liye seedhi bus nahi hai. Connecting options:\n{options}",
                     lang
                 )
             else:
@@ -260,14 +402,9 @@ def handle_intent(user_input: str):
     if intent == "status_info":
         bus_number = intent_data.get("bus_number")
         if not bus_number:
-            msg = respond3(
-                "Please tell me the bus number to check status.",
-                "स्टेटस बताने के लिए बस नंबर बताएँ।",
-                "Kirpya status batane ke liye bus number bataye.",
-                lang
-            )
+            msg = prompt("ask_bus_status", lang)
             return msg, msg
-        bus = loader.search_buses_by_number(BUSES, bus_number)
+        bus = loader.search_buses_by_number(buses, bus_number)
         if not bus:
             msg = respond3(
                 f"Sorry, I could not find bus {bus_number}.",
@@ -277,7 +414,14 @@ def handle_intent(user_input: str):
             )
             return msg, msg
         delay = get_bus_delay_minutes(bus_number)
-        if delay <= 0:
+        if delay is None:
+            msg = respond3(
+                f"I have no live status for bus {bus_number} right now.",
+                f"बस {bus_number} की अभी कोई लाइव जानकारी नहीं है।",
+                f"Bus {bus_number} ki abhi koi live jankari nahi hai.",
+                lang
+            )
+        elif delay <= 0:
             msg = respond3(
                 f"Bus {bus_number} is on time today.",
                 f"बस {bus_number} आज समय पर है।",
@@ -299,15 +443,10 @@ def handle_intent(user_input: str):
         complaint_text = intent_data.get("complaint_text") or user_input
 
         if not bus_number:
-            msg = respond3(
-                "Please mention the bus number in your complaint.",
-                "कृपया अपनी शिकायत में बस नंबर ज़रूर बताएँ।",
-                "Kirpya apni shikayat mein bus number zarur bataye.",
-                lang
-            )
+            msg = prompt("ask_bus_complaint", lang)
             return msg, msg
 
-        ticket_id = save_complaint_json(bus_number, complaint_text)
+        ticket_id = "C-DRYRUN" if dry_run else save_complaint_json(bus_number, complaint_text)
 
         msg = respond3(
             f"Your complaint has been logged. Ticket ID: {ticket_id}.",
@@ -322,7 +461,7 @@ def handle_intent(user_input: str):
     bus_num_match = re.search(r"\b\d{2,4}\b", user_input)
     if bus_num_match:
         bus_number = bus_num_match.group()
-        bus = loader.search_buses_by_number(BUSES, bus_number)
+        bus = loader.search_buses_by_number(buses, bus_number)
         if bus:
             msg = respond3(
                 f"Bus {bus_number} goes from {bus['source']} to {bus['destination']} at {bus['time']} with fare {bus['fare']}.",
@@ -334,16 +473,10 @@ def handle_intent(user_input: str):
 
     # If still unknown and local LLM exists, try answering generally
     if LOCAL_LLM_READY:
-        llm_ans = llm_fallback(user_input, lang)
+        llm_ans = llm_fallback(user_input, lang, on_token, on_sentence)
         if llm_ans:
             return llm_ans, llm_ans
-# Final fallback
-    # Final fallback with language detection
-    try:
-        lang = detect(user_input)
-    except:
-        lang = "en"   # default to English if detection fails
-
+    # Final fallback, in the language get_intent already identified
     if lang == "en":
         msg = "I am not sure I understood that. Please rephrase."
     elif lang == "hi":
@@ -353,57 +486,73 @@ def handle_intent(user_input: str):
 
     return msg, msg
 
+def handle_intents(texts, chunk_size: int = 200, dry_run: bool = False):
+    """Batch form of handle_intent: yields (reply_text, speak_text) per text, in order."""
+    for chunk in chunked(texts, chunk_size):
+        yield from [handle_intent(t, dry_run=dry_run) for t in chunk]
+
 
 # ---------------- Optional Voice Input (Vosk) ----------------
 USE_VOICE = voice_available()
 USE_TTS = tts_available()
 
+LISTEN_SECONDS = float(os.getenv("CHETNA_LISTEN_SECONDS", "8"))
+_SPEECH = None
+
+def speech_service():
+    """The shared SpeechService (model loaded and microphone opened once), or None."""
+    global _SPEECH, USE_VOICE
+    if _SPEECH is None and USE_VOICE:
+        model_dir = os.getenv("CHETNA_VOSK_MODEL", DEFAULT_VOSK_MODEL)
+        try:
+            if not os.path.exists(model_dir):
+                raise FileNotFoundError(model_dir)
+            # don't transcribe the bot's own replies
+            _SPEECH = SpeechService(mute=tts_service().is_speaking if USE_TTS else None).start()
+        except Exception:
+            USE_VOICE = False   # fall back to typed input for the rest of the session
+    return _SPEECH
+
 def listen_once():
     """
-    If voice stack is available, capture one utterance and return text.
-    Otherwise return ''.
+    If voice stack is available, return the next spoken utterance
+    (waiting up to CHETNA_LISTEN_SECONDS). Otherwise return ''.
     """
-    if not USE_VOICE:
-        return ""
-    try:
-        from vosk import Model, KaldiRecognizer
-        import pyaudio, json, os
-        model_dir = os.getenv("CHETNA_VOSK_MODEL", "models/vosk-model-small-en-us-0.15")
-        if not os.path.exists(model_dir):
-            return ""
-        model = Model(model_dir)
-        rec = KaldiRecognizer(model, 16000)
-
-        pa = pyaudio.PyAudio()
-        stream = pa.open(format=pyaudio.paInt16, channels=1, rate=16000, input=True, frames_per_buffer=8000)
-        stream.start_stream()
-
-        print("Listening... (speak now)")
-        text_out = ""
-        silence_count = 0
-        while True:
-            data = stream.read(4000, exception_on_overflow=False)
-            if len(data) == 0:
-                break
-            if rec.AcceptWaveform(data):
-                res = rec.Result()
-                j = json.loads(res)
-                text_out = (j.get("text") or "").strip()
-                break
-            else:
-                silence_count += 1
-                if silence_count > 30:  # ~ few seconds
-                    break
-
-        stream.stop_stream()
-        stream.close()
-        pa.terminate()
-        return text_out
-    except Exception:
+    svc = speech_service()
+    if svc is None or svc.ended:
         return ""
+    print("Listening... (speak now)")
+    return svc.listen(timeout=LISTEN_SECONDS)
 
 # ---------------- Main Loop ----------------
+class _ConsoleStream:
+    """Prints a streamed LLM answer as it arrives and speaks it sentence by sentence."""
+
+    def __init__(self):
+        self.text = ""
+        self.spoken = False
+
+    def token(self, tok):
+        if not self.text:
+            print("Chetna: ", end="", flush=True)
+        self.text += tok
+        print(tok, end="", flush=True)
+
+    def sentence(self, text):
+        if USE_TTS:
+            say(text)
+            self.spoken = True
+
 def main():
+    # ---------------- Intro ----------------
+    _phase("prompt")
+    print("Chetna started! Type 'help' for options and 'exit' to quit.")
+    if os.getenv("CHETNA_PROFILE_STARTUP") == "1":
+        print(format_startup())
+    if os.getenv("CHETNA_LLM_WARM", "1") != "0":
+        warm_llm_async()
+    if USE_TTS:
+        tts_service().prerender(fixed_prompts())   # fills the audio cache while idle
     while True:
         try:
             # Input (voice preferred if available)
@@ -418,20 +567,57 @@ def main():
 
             if not user_input:
                 continue
+            if USE_TTS:
+                cancel_speech()   # a new question interrupts the previous answer
 
             low = user_input.lower().strip()
             if low in ("exit", "quit", "bye"):
-                bye = respond3(
-                    "Goodbye! Have a safe journey.",
-                    "अलविदा! आपकी यात्रा शुभ हो।",
-                    "Goodbye! Aapki yatra shubh ho.",
-                    detect_language(user_input)
-                )
+                bye = prompt("goodbye", detect_language(user_input))
                 print(f"Chetna: {bye}")
                 if USE_TTS:
-                    say(bye)
+                    say(bye, wait=True)
                 break
 
+            if low in ("reload", "reload force"):
+                # Rebuild off the main thread; the old timetable keeps serving until the swap
+                TIMETABLE.reload_async(force=low == "reload force").join()
+                print(f"Chetna: Timetable {format_reload_stats(TIMETABLE.last_stats)}.")
+                if TIMETABLE.last_stats["kind"] == "refused":
+                    print("Chetna: Fix the data file, or type 'reload force' to load it anyway.")
+                continue
+
+            if low == "startup":
+                print(f"Chetna:\n{format_startup()}")
+                continue
+
+            if low == "llm stats":
+                stats = {**LLM_CACHE.stats(), "timeouts": LLM_WORKER.timeouts, "late_cached": LLM_WORKER.late_cached,
+                         "dropped": LLM_WORKER.dropped}
+                print("Chetna: " + ", ".join(f"{k}={v}" for k, v in stats.items()))
+                continue
+
+            if low == "delay stats":
+                print("Chetna: " + ", ".join(f"{k}={v}" for k, v in DELAYS.stats().items()))
+                continue
+
+            if low == "speech stats":
+                m = tts_service().metrics()
+                print("Chetna: " + ", ".join(f"{k}={v}" for k, v in m.items()))
+                continue
+
+            if low in ("stats", "stats reset"):
+                # Per-stage latency (p50/p99) and per-intent turn times since start
+                print(f"Chetna:\n{format_metrics(METRICS)}")
+                if low == "stats reset":
+                    METRICS.reset()
+                continue
+
+            if low.startswith("hotspots"):
+                # Complaint hotspots, e.g. "hotspots" (last 7 days) or "hotspots 30"
+                days = int(low.split()[1]) if len(low.split()) > 1 and low.split()[1].isdigit() else 7
+                print(f"Chetna:\n{format_complaint_report(COMPLAINT_STATS.report(days))}")
+                continue
+
             if low in ("help", "menu"):
                 lang = detect_language(user_input)
                 if lang == "hi":
@@ -475,15 +661,26 @@ def main():
                 print(f"Chetna:\n{help_text}")
                 continue
 
-            reply, speak_txt = handle_intent(user_input)
-
-            # Log chat
-            log_chat(user_input, reply)
-
-            # Output
-            print(f"Chetna: {reply}")
-            if USE_TTS:
-                say(speak_txt)
+            with METRICS.turn() as turn:
+                t0 = time.perf_counter()
+                intent_data = get_intent(user_input)
+                turn.label(intent_data)
+                stream = _ConsoleStream()
+                reply, speak_txt = handle_intent(user_input, intent_data=intent_data,
+                                                 on_token=stream.token, on_sentence=stream.sentence)
+
+                # Log chat (queued; written by the log thread)
+                log_chat(user_input, reply, lang=intent_data.get("lang"), intent=intent_data.get("intent"),
+                         latency_ms=round((time.perf_counter() - t0) * 1000, 2))
+
+                # Output (a streamed LLM answer is already on screen / being spoken)
+                streamed = stream.text.strip() == reply
+                if stream.text:
+                    print()
+                if not streamed:
+                    print(f"Chetna: {reply}")
+                if USE_TTS and not (streamed and stream.spoken):
+                    say(speak_txt)
 
         except KeyboardInterrupt:
             print("\nChetna: Goodbye!")
@@ -0,0 +1,170 @@
+# chetna_analytics.py
+# Incremental complaint analytics: per-day counters by bus and category, plus flood grouping
+#
+# ComplaintAnalytics follows the complaint store by id: update() reads only the
+# rows added since the last call (by any bot process), so nothing is ever
+# re-read. Counts live in one bucket per day; queries sum the last N buckets.
+# Near-identical complaints about the same bus (copy-pasted floods) are grouped
+# with MinHash + LSH banding; both the band index and the group table are
+# LRU-bounded, so memory stays constant however many complaints arrive.
+
+import re
+import threading
+import zlib
+from collections import Counter, OrderedDict
+from datetime import date, datetime, timedelta
+
+NUM_HASHES = 16
+BANDS = 4                     # 4 bands x 4 rows: pairs above ~70% Jaccard similarity collide
+_ROWS = NUM_HASHES // BANDS
+_PRIME = (1 << 61) - 1
+_SEEDS = [((i + 1) * 0x9E3779B97F4A7C15 % _PRIME | 1, (i + 7) * 0xC2B2AE3D27D4EB4F % _PRIME)
+          for i in range(NUM_HASHES)]
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _shingles(text):
+    tokens = _TOKEN_RE.findall(text.lower())
+    if len(tokens) < 2:
+        return set(tokens) or {""}
+    return {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+
+
+def minhash(text):
+    """NUM_HASHES-value MinHash signature over word bigrams."""
+    xs = [zlib.crc32(s.encode("utf-8")) for s in _shingles(text)]
+    return tuple(min((a * x + b) % _PRIME for x in xs) for a, b in _SEEDS)
+
+
+class ComplaintAnalytics:
+    def __init__(self, store, max_days=31, max_groups=5000, categorize=None):
+        self.store = store
+        self.max_days = max_days
+        self.max_groups = max_groups
+        self._categorize = categorize
+        self._lock = threading.Lock()
+        self._last_id = None
+        self._days = {}                   # date -> {"bus": Counter, "category": Counter, "bus_category": Counter}
+        self._bands = OrderedDict()       # (bus, band, values) -> group id
+        self._groups = OrderedDict()      # group id -> {"bus", "ticket_id", "text", "count", "last_day"}
+        self._next_group = 1
+
+    def _category(self, text):
+        if self._categorize is None:
+            from chetnaintent import complaint_category  # chetnaintent imports chetnautils, which imports us
+            self._categorize = complaint_category
+        return self._categorize(text)
+
+    # ---------- Feeding ----------
+    def update(self):
+        """Fold in complaints stored since the last call. Returns how many were added."""
+        with self._lock:
+            if self._last_id is None:
+                since = (date.today() - timedelta(days=self.max_days - 1)).isoformat()
+                first = self.store.first_id_since(since)
+                self._last_id = first - 1 if first else self.store.last_id()
+            n = 0
+            for row_id, record in self.store.iter_all(self._last_id):
+                self._observe(record)
+                self._last_id = row_id
+                n += 1
+            return n
+
+    def _observe(self, record):
+        try:
+            day = datetime.fromisoformat(record["time"]).date()
+        except (TypeError, ValueError):
+            day = date.today()
+        bus, text = record["bus_number"], record["complaint"] or ""
+        category = self._category(text)
+        bucket = self._days.get(day)
+        if bucket is None:
+            bucket = self._days[day] = {"bus": Counter(), "category": Counter(), "bus_category": Counter()}
+            for old in sorted(self._days)[:-self.max_days]:
+                del self._days[old]
+        bucket["bus"][bus] += 1
+        bucket["category"][category] += 1
+        bucket["bus_category"][(bus, category)] += 1
+        self._group(bus, text, record.get("ticket_id"), day)
+
+    def _group(self, bus, text, ticket_id, day):
+        sig = minhash(text)
+        keys = [(bus, b, sig[b * _ROWS:(b + 1) * _ROWS]) for b in range(BANDS)]
+        gid = next((self._bands[k] for k in keys if self._bands.get(k) in self._groups), None)
+        if gid is None:
+            gid = self._next_group
+            self._next_group += 1
+            self._groups[gid] = {"bus": bus, "ticket_id": ticket_id, "text": text, "count": 0, "last_day": day}
+        g = self._groups[gid]
+        g["count"] += 1
+        g["last_day"] = max(g["last_day"], day)
+        self._groups.move_to_end(gid)
+        for k in keys:
+            self._bands[k] = gid
+            self._bands.move_to_end(k)
+        while len(self._groups) > self.max_groups:
+            self._groups.popitem(last=False)
+        while len(self._bands) > self.max_groups * BANDS:
+            self._bands.popitem(last=False)
+
+    # ---------- Queries ----------
+    def _window(self, days):
+        start = date.today() - timedelta(days=days - 1)
+        return [b for d, b in self._days.items() if d >= start]
+
+    def top_buses(self, days=7, category=None, n=10):
+        """[(bus_number, complaints)] over the last `days` days, most complained-about first."""
+        with self._lock:
+            total = Counter()
+            for b in self._window(days):
+                if category:
+                    total.update({bus: c for (bus, cat), c in b["bus_category"].items() if cat == category})
+                else:
+                    total.update(b["bus"])
+            return total.most_common(n)
+
+    def by_category(self, days=7):
+        with self._lock:
+            total = Counter()
+            for b in self._window(days):
+                total.update(b["category"])
+            return dict(total.most_common())
+
+    def floods(self, days=7, min_count=3, n=10):
+        """Groups of near-identical complaints (same bus) seen at least min_count times."""
+        start = date.today() - timedelta(days=days - 1)
+        with self._lock:
+            groups = [dict(g) for g in self._groups.values() if g["count"] >= min_count and g["last_day"] >= start]
+        return sorted(groups, key=lambda g: -g["count"])[:n]
+
+    def report(self, days=7, n=5):
+        """Summary over the last `days` days, clamped to 1..max_days (only that many are kept)."""
+        self.update()
+        requested, days = days, max(1, min(days, self.max_days))
+        categories = self.by_category(days)
+        return {
+            "days": days,
+            "requested_days": requested,
+            "total": sum(categories.values()),
+            "by_category": categories,
+            "top_buses": self.top_buses(days, n=n),
+            "top_by_category": {c: self.top_buses(days, c, n=3) for c in categories},
+            "floods": self.floods(days, n=n),
+        }
+
+
+def format_report(r):
+    lines = []
+    if r.get("requested_days", r["days"]) > r["days"]:
+        lines.append(f"Only the last {r['days']} days are kept; showing those.")
+    if not r["total"]:
+        return "\n".join(lines + [f"No complaints in the last {r['days']} days."])
+    lines.append(f"{r['total']} complaints in the last {r['days']} days.")
+    lines.append("Most complaints: " + ", ".join(f"bus {b} ({c})" for b, c in r["top_buses"]))
+    for cat, count in r["by_category"].items():
+        buses = ", ".join(f"{b} ({c})" for b, c in r["top_by_category"][cat])
+        lines.append(f"- {cat}: {count} (buses {buses})")
+    for g in r["floods"]:
+        lines.append(f"Repeated complaint x{g['count']} about bus {g['bus']} "
+                     f"(first ticket {g['ticket_id']}): {g['text'][:60]!r}")
+    return "\n".join(lines)
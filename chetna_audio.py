@@ -0,0 +1,179 @@
+# chetna_audio.py
+# Phrase-audio cache: synthesized replies kept as WAV files, keyed by (text, voice, rate)
+#
+#   python chetna_audio.py prerender      # synthesize every fixed prompt (chetnautils.PROMPTS) ahead of time
+#   python chetna_audio.py stats
+#
+# The TTS worker (chetna_tts.py) plays a cached file when there is one and
+# otherwise synthesizes into the cache, then plays it; repeated prompts cost
+# only the playback. The directory is capped in size, evicting the least
+# recently played files first.
+
+import argparse
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import wave
+
+DEFAULT_DIR = "cache/audio"
+
+
+class AudioCache:
+    def __init__(self, directory=DEFAULT_DIR, max_bytes=200 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+        self._files = {}      # name -> (size, last use)
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.endswith(".wav") and ".part." not in name:
+                st = os.stat(os.path.join(directory, name))
+                self._files[name] = (st.st_size, st.st_mtime)
+        self._total = sum(size for size, _ in self._files.values())
+
+    @staticmethod
+    def key(text, voice, rate):
+        return hashlib.sha1(f"{voice}\0{rate}\0{text}".encode("utf-8")).hexdigest() + ".wav"
+
+    def __contains__(self, key):
+        """(text, voice, rate) in cache, without counting a hit or miss."""
+        with self._lock:
+            return self.key(*key) in self._files
+
+    def get(self, text, voice, rate):
+        """Path of the cached audio, or None. A hit refreshes the file's LRU position."""
+        name = self.key(text, voice, rate)
+        with self._lock:
+            entry = self._files.get(name)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            now = time.time()
+            self._files[name] = (entry[0], now)
+        path = os.path.join(self.directory, name)
+        try:
+            os.utime(path, (now, now))   # LRU order survives restarts
+        except OSError:
+            with self._lock:
+                self._forget(name)
+            return None
+        return path
+
+    def put(self, text, voice, rate, render):
+        """render(tmp_path) writes the WAV; it is moved into place atomically. Returns the cached path."""
+        name = self.key(text, voice, rate)
+        path = os.path.join(self.directory, name)
+        tmp = f"{path[:-4]}.{os.getpid()}.{threading.get_ident()}.part.wav"  # engines pick the format by extension
+        try:
+            render(tmp)
+            if not os.path.exists(tmp) or os.path.getsize(tmp) == 0:
+                return None
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        with self._lock:
+            self._forget(name)
+            size = os.path.getsize(path)
+            self._files[name] = (size, time.time())
+            self._total += size
+            self._evict()
+        return path
+
+    def _forget(self, name):
+        entry = self._files.pop(name, None)
+        if entry:
+            self._total -= entry[0]
+
+    def _evict(self):
+        if self._total <= self.max_bytes:
+            return
+        for name, _ in sorted(self._files.items(), key=lambda kv: kv[1][1]):
+            if self._total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            self._forget(name)
+
+    def stats(self):
+        with self._lock:
+            return {"files": len(self._files), "bytes": self._total, "hits": self.hits, "misses": self.misses}
+
+
+# ---------- Playback ----------
+class Playback:
+    """A playing WAV file: is_playing() / stop()."""
+
+    def __init__(self, is_playing, stop):
+        self.is_playing = is_playing
+        self.stop = stop
+
+
+def _wav_seconds(path):
+    with wave.open(path, "rb") as w:
+        return w.getnframes() / float(w.getframerate() or 1)
+
+
+def find_player():
+    """play(path) -> Playback using simpleaudio, winsound or a command-line player; None if none exists."""
+    try:
+        import simpleaudio
+
+        def play(path):
+            obj = simpleaudio.WaveObject.from_wave_file(path).play()
+            return Playback(obj.is_playing, obj.stop)
+        return play
+    except Exception:
+        pass
+    if sys.platform == "win32":
+        import winsound
+
+        def play(path):
+            winsound.PlaySound(path, winsound.SND_FILENAME | winsound.SND_ASYNC)
+            end = time.monotonic() + _wav_seconds(path)
+            return Playback(lambda: time.monotonic() < end, lambda: winsound.PlaySound(None, 0))
+        return play
+    for cmd in (["afplay"], ["paplay"], ["aplay", "-q"]):
+        if shutil.which(cmd[0]):
+            def play(path, cmd=cmd):
+                proc = subprocess.Popen(cmd + [path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                return Playback(lambda: proc.poll() is None, proc.terminate)
+            return play
+    return None
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Chetna phrase-audio cache")
+    ap.add_argument("cmd", choices=("prerender", "stats"))
+    ap.add_argument("--dir", default=os.getenv("CHETNA_AUDIO_CACHE", DEFAULT_DIR))
+    args = ap.parse_args(argv)
+
+    cache = AudioCache(args.dir)
+    if args.cmd == "stats":
+        print(cache.stats())
+        return
+    from chetna_tts import default_engine
+    from chetnautils import fixed_prompts
+    engine = default_engine()
+    voice, rate = engine.getProperty("voice"), engine.getProperty("rate")
+    made = 0
+    for text in fixed_prompts():
+        if (text, voice, rate) not in cache:
+            def render(path, text=text):
+                engine.save_to_file(text, path)
+                engine.runAndWait()
+            if cache.put(text, voice, rate, render):
+                made += 1
+    print(f"{made} prompts rendered; cache: {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
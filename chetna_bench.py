@@ -0,0 +1,417 @@
+# chetna_bench.py
+# Benchmarks for Chetna's timetable storage and intent detection
+#
+#   python chetna_bench.py memory                 # 10k / 100k / 1M trips
+#   python chetna_bench.py memory --sizes 10000 50000
+#   python chetna_bench.py intent                 # get_intent utterances/second
+#   python chetna_bench.py suite                  # everything below, saved to bench/results-*.json
+#   python chetna_bench.py suite --cities 500 --routes 5000 --trips 12 --out bench/big.json
+#   python chetna_bench.py compare bench/old.json bench/new.json
+#
+# The suite generates a synthetic network (N cities, M routes, K trips per
+# route, bus numbers shared between routes like the sample data), writes it as
+# CSV and JSON, and measures load time per format/storage, retained memory,
+# get_intent throughput and handle_intent p50/p99 on a corpus drawn from it.
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from chetna_loader import ChetnaLoader, ColumnarTimetable, Timetable, format_time_minutes
+
+# Utterance templates per language; {n} = bus number, {a}/{b} = cities
+UTTERANCE_TEMPLATES = {
+    "en": [
+        "hi", "hello there", "what is the fare of bus {n}", "ticket price for {n}",
+        "timing of {n}", "when does bus {n} leave", "where is bus {n}", "track {n}",
+        "is {n} on time?", "bus {n} is delayed", "complaint bus {n} driver rude",
+        "the bus {n} was dirty", "buses from {a} to {b}", "next bus from {a} to {b}",
+        "evening bus {a} to {b}", "{n}", "tell me a joke", "what is the weather today",
+    ],
+    "hi-latn": [
+        "namaste", "bus {n} ka kiraya kya hai", "{n} kab nikalti hai", "{n} kitne baje aayegi",
+        "{n} kidhar hai", "bus {n} abhi kaha hai", "{n} late hai kya", "{n} ka status batao",
+        "bus {n} ka driver bahut rude tha shikayat", "{a} se {b} tak", "{a} se {b} agla bus",
+        "{a} se {b} shaam ki bus", "mujhe ghar jana hai", "kya haal hai",
+    ],
+    "hi": [
+        "नमस्ते", "बस {n} का किराया", "{n} कब निकलती है", "{n} कहाँ है", "{n} लेट है क्या",
+        "बस {n} की शिकायत ड्राइवर बदतमीज", "{a} से {b} तक", "{a} से {b} सुबह की बस",
+        "आज मौसम कैसा है",
+    ],
+}
+CORPUS_CITIES = ["Delhi", "Karnal", "Panipat", "Agra", "Lucknow", "Ambala", "dilli", "दिल्ली", "करनाल"]
+
+
+def synthetic_rows(n, n_cities=500, n_buses=None, seed=7):
+    """
+    Generate n trip dicts shaped like chetnasample_buses.csv.
+    Bus numbers repeat across trips, as in the sample data (bus 202).
+    """
+    rng = random.Random(seed)
+    cities = [f"City{i}" for i in range(n_cities)]
+    n_buses = n_buses or max(n // 4, 1)
+    for _ in range(n):
+        src, dst = rng.sample(cities, 2)
+        yield {
+            "bus_id": str(100 + rng.randrange(n_buses)),
+            "source": src,
+            "destination": dst,
+            "time": f"{rng.randint(1, 12)}:{rng.randrange(0, 60, 5):02d} {rng.choice(('AM', 'PM'))}",
+            "fare": f"₹{rng.randint(20, 900)}",
+        }
+
+
+# ---------- Synthetic network ----------
+SAMPLE_CITIES = ["Delhi", "Karnal", "Panipat", "Rohtak", "Ambala", "Agra", "Lucknow", "Jaipur", "Chandigarh"]
+_SYLLABLES = ("ra", "ma", "pur", "ga", "na", "sa", "bad", "ko", "li", "de", "va", "ta", "ni", "har", "sh", "dh")
+
+
+def city_names(n, seed=7):
+    """n distinct letter-only city names: the sample's cities first, then made-up ones ("Ramapur")."""
+    rng = random.Random(seed)
+    names = SAMPLE_CITIES[:n]
+    seen = {c.lower() for c in names}
+    while len(names) < n:
+        name = "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+        if name.lower() not in seen:
+            seen.add(name.lower())
+            names.append(name)
+    return names
+
+
+def synthetic_network(n_cities=200, n_routes=1000, trips_per_route=8, shared_buses=0.3, seed=7):
+    """
+    Trip dicts for a network of n_cities and n_routes distinct (source,
+    destination) pairs with trips_per_route departures each, spread over
+    05:00-23:00. A share of the trips reuse a bus number already running on
+    another route, as bus 202 does in the sample data.
+    """
+    rng = random.Random(seed)
+    cities = city_names(n_cities, seed)
+    n_routes = min(n_routes, n_cities * (n_cities - 1))
+    routes = set()
+    while len(routes) < n_routes:
+        routes.add(tuple(rng.sample(cities, 2)))
+    buses, next_bus = [], 100
+    for src, dst in sorted(routes):
+        base_fare = rng.randint(20, 600)
+        step = (18 * 60) // max(trips_per_route, 1)
+        for k in range(trips_per_route):
+            if buses and rng.random() < shared_buses:
+                bus = rng.choice(buses)
+            else:
+                bus = str(next_bus)
+                next_bus += 1
+                buses.append(bus)
+            yield {
+                "bus_id": bus,
+                "source": src,
+                "destination": dst,
+                "time": format_time_minutes(5 * 60 + k * step + rng.randrange(0, max(step, 1), 5)),
+                "fare": f"₹{base_fare + rng.randint(-5, 5) * 5}",
+            }
+
+
+def network_corpus(rows, n, seed=11, missing=0.05):
+    """Utterances drawn from a generated network's bus numbers and cities (plus some unknown buses)."""
+    rng = random.Random(seed)
+    bus_numbers = sorted({r["bus_id"] for r in rows})
+    cities = sorted({r["source"] for r in rows} | {r["destination"] for r in rows})
+    sample_buses = rng.sample(bus_numbers, min(len(bus_numbers), 500))
+    sample_buses += ["9999"] * max(1, int(len(sample_buses) * missing))
+    return utterance_corpus(n, seed, sample_buses, rng.sample(cities, min(len(cities), 200)))
+
+
+def utterance_corpus(n, seed=11, bus_numbers=None, cities=None):
+    """n mixed English / Hindi / Hinglish utterances covering every intent."""
+    rng = random.Random(seed)
+    bus_numbers = bus_numbers or ["202", "105", "702", "1001", "1201", "9999"]
+    cities = cities or CORPUS_CITIES
+    flat = [t for ts in UTTERANCE_TEMPLATES.values() for t in ts]
+    out = []
+    for _ in range(n):
+        a, b = rng.sample(cities, 2)
+        out.append(rng.choice(flat).format(n=rng.choice(bus_numbers), a=a, b=b))
+    return out
+
+
+def bench_intent(n=20_000, repeat=3):
+    """get_intent throughput (utterances/second, best of repeat) on a mixed corpus."""
+    from chetnaintent import get_intent
+    corpus = utterance_corpus(n)
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for u in corpus:
+            get_intent(u)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return {"utterances": n, "seconds": best, "per_second": n / best, "us_per_utterance": best / n * 1e6}
+
+
+def _measure(build):
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    obj = build()
+    elapsed = time.perf_counter() - t0
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del obj
+    return current, peak, elapsed
+
+
+def bench_memory(sizes=(10_000, 100_000, 1_000_000)):
+    """Retained / peak bytes of dict-row Timetable vs ColumnarTimetable."""
+    results = []
+    for n in sizes:
+        for name, build in (
+            ("dict", lambda: Timetable(list(synthetic_rows(n)))),
+            ("columnar", lambda: ColumnarTimetable.from_rows(synthetic_rows(n))),
+        ):
+            current, peak, elapsed = _measure(build)
+            results.append({
+                "trips": n, "storage": name, "retained_bytes": current,
+                "peak_bytes": peak, "bytes_per_trip": current / n, "build_s": elapsed,
+            })
+    return results
+
+
+# ---------- Suite ----------
+def _percentile(samples, p):
+    s = sorted(samples)
+    return s[min(len(s) - 1, int(p / 100 * len(s)))] if s else None
+
+
+def _write_dataset(rows, directory):
+    csv_path = os.path.join(directory, "network.csv")
+    json_path = os.path.join(directory, "network.json")
+    with open(csv_path, "w", encoding="utf-8", newline="") as f:
+        f.write("bus_id,source,destination,time,fare\n")
+        for r in rows:
+            f.write(f"{r['bus_id']},{r['source']},{r['destination']},{r['time']},{r['fare']}\n")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(rows, f, ensure_ascii=False)
+    return csv_path, json_path
+
+
+def bench_load(csv_path, json_path):
+    """Seconds to load each file format into each storage mode (cold and warm snapshot for columnar)."""
+    results = []
+    for path in (csv_path, json_path):
+        fmt = os.path.splitext(path)[1][1:]
+        for storage, snapshot in (("dict", False), ("columnar", False), ("columnar", True), ("columnar", True)):
+            t0 = time.perf_counter()
+            ChetnaLoader(path, storage=storage, snapshot=snapshot).load()
+            name = storage + ("+snapshot" if snapshot else "")
+            if snapshot and any(r["format"] == fmt and r["storage"] == name for r in results):
+                name += " (warm)"
+            results.append({"format": fmt, "storage": name, "seconds": time.perf_counter() - t0})
+    return results
+
+
+def bench_loaded_memory(csv_path):
+    """Retained bytes of the loaded timetable per storage mode."""
+    out = []
+    for storage in ("dict", "columnar"):
+        current, peak, _ = _measure(lambda: ChetnaLoader(csv_path, storage=storage).load())
+        out.append({"storage": storage, "retained_bytes": current, "peak_bytes": peak})
+    return out
+
+
+def bench_intent_corpus(corpus, repeat=3):
+    from chetnaintent import get_intent
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        intents = [get_intent(u)["intent"] for u in corpus]
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return {
+        "utterances": len(corpus),
+        "per_second": len(corpus) / best,
+        "us_per_utterance": best / len(corpus) * 1e6,
+        "coverage": dict(Counter(intents)),
+    }
+
+
+def _scratch_logs(d):
+    """
+    Send the bot's chat log, complaint store and caches to d. Must run before
+    chetnautils is first imported (chetnaintent imports it), so a benchmark
+    never writes into the user's chat history.
+    """
+    os.environ.update(
+        CHETNA_CHAT_LOG=os.path.join(d, "logs", "chetna_chat_history.txt"),
+        CHETNA_COMPLAINTS_DB=os.path.join(d, "logs", "complaints.db"),
+        CHETNA_LLM_CACHE=os.path.join(d, "cache", "llm_answers.jsonl"),
+        CHETNA_AUDIO_CACHE=os.path.join(d, "cache", "audio"),
+    )
+
+
+def _bot_serving(csv_path, storage):
+    """botchetna with csv_path as its live timetable; set through the environment on first import."""
+    _scratch_logs(os.path.dirname(os.path.abspath(csv_path)))
+    os.environ.update(CHETNA_DATA=csv_path, CHETNA_STORAGE=storage, CHETNA_SNAPSHOT="0")
+    os.environ.setdefault("CHETNA_WATCH_SECONDS", "0")
+    import botchetna
+    if (botchetna.loader.file_path, botchetna.loader.storage) != (csv_path, storage):
+        botchetna.loader.file_path, botchetna.loader.storage, botchetna.loader.snapshot = csv_path, storage, False
+        botchetna.TIMETABLE.delta_path = None
+        botchetna.TIMETABLE.reload_now(force=True)
+    return botchetna
+
+
+def bench_handle_intent(csv_path, corpus, storage="dict", warmup=200):
+    """End-to-end handle_intent latency (dry run) with the generated network as the live timetable."""
+    botchetna = _bot_serving(csv_path, storage)
+    from chetnaintent import get_intent
+    for u in corpus[:warmup]:
+        botchetna.handle_intent(u, dry_run=True)
+    times, per_intent = [], defaultdict(list)
+    for u in corpus:
+        intent = get_intent(u)["intent"]
+        t0 = time.perf_counter()
+        botchetna.handle_intent(u, dry_run=True)
+        dt = time.perf_counter() - t0
+        times.append(dt)
+        per_intent[intent].append(dt)
+    ms = lambda v: round(v * 1000, 4)  # noqa: E731
+    return {
+        "storage": storage,
+        "turns": len(times),
+        "p50_ms": ms(_percentile(times, 50)),
+        "p99_ms": ms(_percentile(times, 99)),
+        "mean_ms": ms(sum(times) / len(times)),
+        "per_intent": {k: {"n": len(v), "p50_ms": ms(_percentile(v, 50)), "p99_ms": ms(_percentile(v, 99))}
+                       for k, v in sorted(per_intent.items())},
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_suite(n_cities=200, n_routes=1000, trips_per_route=8, utterances=20_000, seed=7):
+    rows = list(synthetic_network(n_cities, n_routes, trips_per_route, seed=seed))
+    corpus = network_corpus(rows, utterances, seed=seed + 4)
+    with tempfile.TemporaryDirectory(prefix="chetna-bench-") as d:
+        _scratch_logs(d)
+        csv_path, json_path = _write_dataset(rows, d)
+        load = bench_load(csv_path, json_path)
+        memory = bench_loaded_memory(csv_path)
+        intent = bench_intent_corpus(corpus)
+        handle = [bench_handle_intent(csv_path, corpus, storage) for storage in ("dict", "columnar")]
+        from chetnautils import LOG
+        LOG.flush()   # reload events land in d before it is removed
+    return {
+        "revision": _git_revision(),
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {"cities": n_cities, "routes": n_routes, "trips_per_route": trips_per_route,
+                   "utterances": utterances, "seed": seed},
+        "network": {"trips": len(rows), "buses": len({r["bus_id"] for r in rows})},
+        "load": load,
+        "memory": memory,
+        "get_intent": intent,
+        "handle_intent": handle,
+    }
+
+
+def _headline(results):
+    """Flat {metric: value} of the numbers worth comparing between runs."""
+    out = {f"load {r['format']} {r['storage']} s": r["seconds"] for r in results["load"]}
+    out.update({f"memory {m['storage']} MB": m["retained_bytes"] / 1e6 for m in results["memory"]})
+    out["get_intent utt/s"] = results["get_intent"]["per_second"]
+    for h in results["handle_intent"]:
+        out[f"handle_intent {h['storage']} p50 ms"] = h["p50_ms"]
+        out[f"handle_intent {h['storage']} p99 ms"] = h["p99_ms"]
+    return out
+
+
+def format_suite(results, baseline=None):
+    head = _headline(results)
+    base = _headline(baseline) if baseline else {}
+    rows = [f"{results['network']['trips']} trips, {results['network']['buses']} buses, "
+            f"{results['params']['cities']} cities, rev {results['revision']}"]
+    for k, v in head.items():
+        line = f"  {k:<40} {v:>12.4f}"
+        if k in base and base[k]:
+            line += f"   {(v - base[k]) / base[k] * 100:+6.1f}% vs {base[k]:.4f}"
+        rows.append(line)
+    cov = results["get_intent"]["coverage"]
+    rows.append("  intents: " + ", ".join(f"{k}={v}" for k, v in sorted(cov.items())))
+    return "\n".join(rows)
+
+
+def _print_memory(results):
+    print(f"{'trips':>10} {'storage':>9} {'retained MB':>12} {'peak MB':>9} {'B/trip':>8} {'build s':>8}")
+    for r in results:
+        print(f"{r['trips']:>10} {r['storage']:>9} {r['retained_bytes'] / 1e6:>12.1f} "
+              f"{r['peak_bytes'] / 1e6:>9.1f} {r['bytes_per_trip']:>8.0f} {r['build_s']:>8.2f}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Chetna benchmarks")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    mem = sub.add_parser("memory", help="dict rows vs columnar timetable memory")
+    mem.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    it = sub.add_parser("intent", help="get_intent throughput on a mixed-language corpus")
+    it.add_argument("-n", type=int, default=20_000)
+    su = sub.add_parser("suite", help="synthetic network: load time, memory, get_intent and handle_intent latency")
+    su.add_argument("--cities", type=int, default=200)
+    su.add_argument("--routes", type=int, default=1000)
+    su.add_argument("--trips", type=int, default=8, help="trips per route")
+    su.add_argument("--utterances", type=int, default=20_000)
+    su.add_argument("--seed", type=int, default=7)
+    su.add_argument("--out", help="results JSON (default bench/results-<time>.json)")
+    su.add_argument("--baseline", help="earlier results JSON to compare against")
+    cmp_ = sub.add_parser("compare", help="compare two suite result files")
+    cmp_.add_argument("old")
+    cmp_.add_argument("new")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "memory":
+        _print_memory(bench_memory(args.sizes))
+    elif args.cmd == "intent":
+        r = bench_intent(args.n)
+        print(f"{r['utterances']} utterances in {r['seconds']:.3f} s: "
+              f"{r['per_second']:,.0f} utt/s ({r['us_per_utterance']:.1f} us each)")
+    elif args.cmd == "suite":
+        results = run_suite(args.cities, args.routes, args.trips, args.utterances, args.seed)
+        out = args.out or os.path.join("bench", f"results-{datetime.now():%Y%m%d-%H%M%S}.json")
+        if os.path.dirname(out):
+            os.makedirs(os.path.dirname(out), exist_ok=True)
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        baseline = None
+        if args.baseline:
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        print(format_suite(results, baseline))
+        print(f"saved {out}")
+    elif args.cmd == "compare":
+        with open(args.old, "r", encoding="utf-8") as f:
+            old = json.load(f)
+        with open(args.new, "r", encoding="utf-8") as f:
+            new = json.load(f)
+        print(format_suite(new, old))
+
+
+if __name__ == "__main__":
+    main()
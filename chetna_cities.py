@@ -0,0 +1,206 @@
+# chetna_cities.py
+# Resolve user-typed city names (typos, Hinglish spellings, Devanagari) to timetable stops
+
+import threading
+import weakref
+from collections import OrderedDict
+
+# ----------- Devanagari -> Latin -----------
+_CONSONANTS = {
+    "क": "k", "ख": "kh", "ग": "g", "घ": "gh", "ङ": "n",
+    "च": "ch", "छ": "chh", "ज": "j", "झ": "jh", "ञ": "n",
+    "ट": "t", "ठ": "th", "ड": "d", "ढ": "dh", "ण": "n",
+    "त": "t", "थ": "th", "द": "d", "ध": "dh", "न": "n",
+    "प": "p", "फ": "ph", "ब": "b", "भ": "bh", "म": "m",
+    "य": "y", "र": "r", "ल": "l", "ळ": "l", "व": "v",
+    "श": "sh", "ष": "sh", "स": "s", "ह": "h",
+    "क़": "q", "ख़": "kh", "ग़": "g", "ज़": "z", "ड़": "r", "ढ़": "rh", "फ़": "f",
+}
+_VOWELS = {
+    "अ": "a", "आ": "aa", "इ": "i", "ई": "ee", "उ": "u", "ऊ": "oo",
+    "ऋ": "ri", "ए": "e", "ऐ": "ai", "ओ": "o", "औ": "au",
+}
+_MATRAS = {
+    "ा": "aa", "ि": "i", "ी": "ee", "ु": "u", "ू": "oo", "ृ": "ri",
+    "े": "e", "ै": "ai", "ो": "o", "ौ": "au",
+}
+_MARKS = {"ं": "n", "ँ": "n", "ः": "h"}
+_VIRAMA, _NUKTA = "्", "़"
+
+# Common names that no spelling rule maps to the timetable's spelling
+ALIASES = {
+    "dilli": "delhi", "dehli": "delhi", "dilhi": "delhi", "new delhi": "delhi",
+    "banaras": "varanasi", "benaras": "varanasi", "kashi": "varanasi",
+    "prayagraj": "allahabad", "gurgaon": "gurugram",
+    "lakhnau": "lucknow", "lakhanau": "lucknow", "lakhnow": "lucknow",
+}
+
+
+def is_devanagari(text):
+    return any("ऀ" <= ch <= "ॿ" for ch in text)
+
+
+def transliterate(text):
+    """
+    Rough Devanagari -> Latin romanization (दिल्ली -> "dillee", करनाल -> "karanaal").
+    Consonants carry an inherent "a" unless followed by a matra or virama;
+    the word-final one is dropped. Good enough for fuzzy matching, not display.
+    """
+    out, i = [], 0
+    while i < len(text):
+        ch = text[i]
+        if i + 1 < len(text) and text[i + 1] == _NUKTA and ch + _NUKTA in _CONSONANTS:
+            ch, i = ch + _NUKTA, i + 1
+        if ch in _CONSONANTS:
+            out.append(_CONSONANTS[ch])
+            nxt = text[i + 1] if i + 1 < len(text) else ""
+            if nxt and is_devanagari(nxt) and nxt not in _MATRAS and nxt not in (_VIRAMA, _NUKTA):
+                out.append("a")
+        elif ch in _VOWELS:
+            out.append(_VOWELS[ch])
+        elif ch in _MATRAS:
+            out.append(_MATRAS[ch])
+        elif ch in _MARKS:
+            out.append(_MARKS[ch])
+        elif ch in (_VIRAMA, _NUKTA):
+            pass
+        else:
+            out.append(ch)
+        i += 1
+    return "".join(out)
+
+
+# ----------- Spelling keys -----------
+def phonetic(name):
+    """Collapse spelling variation: long vowels, doubled letters, w/v, z/j."""
+    s = name.lower().strip()
+    for a, b in (("aa", "a"), ("ee", "i"), ("oo", "u"), ("w", "v"), ("z", "j"), ("ph", "f"), ("q", "k")):
+        s = s.replace(a, b)
+    out = []
+    for ch in s:
+        if ch.isalnum() or ch == " ":
+            if not out or out[-1] != ch:
+                out.append(ch)
+    return "".join(out)
+
+
+def skeleton(name):
+    """Consonant skeleton (no vowels, no h, no doubles): delhi / dilli / dehli -> "dl"."""
+    out = []
+    for ch in phonetic(name):
+        if ch in "aeiouyh ":
+            continue
+        if not out or out[-1] != ch:
+            out.append(ch)
+    return "".join(out)
+
+
+def _trigrams(s):
+    s = f"  {s} "
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+def _edit_distance(a, b, limit):
+    """Levenshtein distance, giving up (returns limit + 1) once it must exceed limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(cur) > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1]
+
+
+class CityResolver:
+    """
+    Built once per timetable from its stop names. resolve() tries, in order:
+    exact name, Devanagari transliteration, alias table, phonetic key,
+    consonant skeleton, then trigram candidates ranked by edit distance.
+    Results (including misses) are memoized, least recently used evicted first.
+    """
+
+    def __init__(self, names, cache_size=4096):
+        self._names = sorted({n.strip() for n in names if n and n.strip()})
+        self._exact = {n.lower(): n for n in self._names}
+        self._phon = {}
+        self._skel = {}
+        self._tri = {}
+        for n in self._names:
+            p = phonetic(n)
+            self._phon.setdefault(p, []).append(n)
+            self._skel.setdefault(skeleton(n), []).append(n)
+            for g in _trigrams(p):
+                self._tri.setdefault(g, []).append(n)
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._cache_lock = threading.Lock()
+
+    def resolve(self, text):
+        """Canonical stop name for a user token, or None."""
+        key = (text or "").strip().lower()
+        if not key:
+            return None
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        result = self._resolve(key)
+        with self._cache_lock:
+            self._cache[key] = result
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def _best(self, query_phon, candidates):
+        return min(candidates, key=lambda n: (_edit_distance(query_phon, phonetic(n), 99), n))
+
+    def _resolve(self, key):
+        if key in self._exact:
+            return self._exact[key]
+        if is_devanagari(key):
+            key = transliterate(key)
+            if key in self._exact:
+                return self._exact[key]
+        p = phonetic(key)
+        alias = ALIASES.get(key) or ALIASES.get(p)
+        if alias and alias in self._exact:
+            return self._exact[alias]
+
+        if p in self._phon:
+            return self._best(p, self._phon[p])
+        sk = skeleton(key)
+        if len(sk) >= 2 and sk in self._skel:
+            # same consonants, but don't let vowels drift arbitrarily far
+            best = self._best(p, self._skel[sk])
+            if _edit_distance(p, phonetic(best), max(2, len(p) // 2)) <= max(2, len(p) // 2):
+                return best
+
+        # Typo tolerance: rank by shared trigrams, confirm with edit distance
+        counts = {}
+        for g in _trigrams(p):
+            for n in self._tri.get(g, ()):
+                counts[n] = counts.get(n, 0) + 1
+        limit = max(1, len(p) // 4)
+        best, best_d = None, limit + 1
+        for n in sorted(counts, key=lambda n: (-counts[n], n))[:20]:
+            d = _edit_distance(p, phonetic(n), limit)
+            if d < best_d:
+                best, best_d = n, d
+        return best
+
+
+_RESOLVERS = weakref.WeakKeyDictionary()
+_RESOLVERS_LOCK = threading.Lock()
+
+
+def resolver_for(timetable):
+    """One CityResolver per timetable object, built on first use."""
+    with _RESOLVERS_LOCK:
+        r = _RESOLVERS.get(timetable)
+        if r is None:
+            r = _RESOLVERS[timetable] = CityResolver(timetable.stop_names())
+        return r
@@ -0,0 +1,165 @@
+# chetna_complaints.py
+# Append-only complaint store: SQLite in WAL mode, indexed by ticket and bus number
+#
+# Each complaint is one INSERT (no rewrite of earlier records); WAL lets
+# several bot processes write to the same file while others read. Ticket IDs
+# come from the table's AUTOINCREMENT key ("C-000001", "C-000002", ...), so
+# they never repeat, even across processes. Records from the old
+# logs/complaints.json are imported once, keeping their original ticket IDs.
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS complaints (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    ticket_id  TEXT,
+    bus_number TEXT NOT NULL,
+    complaint  TEXT NOT NULL,
+    time       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS complaints_ticket ON complaints (ticket_id);
+CREATE INDEX IF NOT EXISTS complaints_bus ON complaints (bus_number, id);
+CREATE INDEX IF NOT EXISTS complaints_time ON complaints (time);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def format_ticket(n):
+    return f"C-{n:06d}"
+
+
+class ComplaintStore:
+    def __init__(self, path, legacy_json=None):
+        self.path = path
+        self.legacy_json = legacy_json
+        self._local = threading.local()  # sqlite connections are per thread
+        self._pid = None
+        self._ready = False
+        self._ready_lock = threading.Lock()
+
+    def _conn(self):
+        pid = os.getpid()
+        if self._pid != pid:  # forked: never reuse the parent's connections
+            self._local = threading.local()
+            self._pid = pid
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            d = os.path.dirname(self.path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._ready:
+            with self._ready_lock:
+                if not self._ready:
+                    conn.executescript(SCHEMA)
+                    self._migrate(conn)
+                    self._ready = True
+        return conn
+
+    def _migrate(self, conn):
+        """Import legacy_json once; the meta flag makes it safe to race from several processes."""
+        if not self.legacy_json or not os.path.exists(self.legacy_json):
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_json'").fetchone():
+                conn.execute("COMMIT")
+                return
+            try:
+                with open(self.legacy_json, "r", encoding="utf-8") as f:
+                    items = json.load(f)
+            except (OSError, ValueError):
+                items = []
+            conn.executemany(
+                "INSERT INTO complaints (ticket_id, bus_number, complaint, time) VALUES (?, ?, ?, ?)",
+                [(r.get("ticket_id"), str(r.get("bus_number", "")), r.get("complaint", ""),
+                  r.get("time") or datetime.now().isoformat())
+                 for r in items if isinstance(r, dict)],
+            )
+            conn.execute("INSERT INTO meta (key, value) VALUES ('migrated_json', ?)",
+                         (f"{len(items)} records from {self.legacy_json}",))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    # ---------- Writes ----------
+    def add(self, bus_number, complaint_text, when=None):
+        """Store one complaint and return its record (with the new ticket_id)."""
+        conn = self._conn()
+        record = {
+            "bus_number": str(bus_number),
+            "complaint": complaint_text,
+            "time": (when or datetime.now()).isoformat(),
+        }
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cur = conn.execute(
+                "INSERT INTO complaints (bus_number, complaint, time) VALUES (?, ?, ?)",
+                (record["bus_number"], record["complaint"], record["time"]),
+            )
+            record["ticket_id"] = format_ticket(cur.lastrowid)
+            conn.execute("UPDATE complaints SET ticket_id = ? WHERE id = ?", (record["ticket_id"], cur.lastrowid))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return {"ticket_id": record["ticket_id"], **record}
+
+    # ---------- Lookups ----------
+    @staticmethod
+    def _records(rows):
+        return [{"ticket_id": t, "bus_number": b, "complaint": c, "time": w} for t, b, c, w in rows]
+
+    def by_ticket(self, ticket_id):
+        """Record for a ticket ID, or None (legacy random IDs may repeat: the oldest wins)."""
+        rows = self._conn().execute(
+            "SELECT ticket_id, bus_number, complaint, time FROM complaints WHERE ticket_id = ? ORDER BY id LIMIT 1",
+            (ticket_id.strip().upper(),),
+        ).fetchall()
+        return self._records(rows)[0] if rows else None
+
+    def by_bus(self, bus_number, limit=50):
+        """Most recent complaints for a bus, newest first."""
+        return self._records(self._conn().execute(
+            "SELECT ticket_id, bus_number, complaint, time FROM complaints WHERE bus_number = ? "
+            "ORDER BY id DESC LIMIT ?",
+            (str(bus_number), limit),
+        ).fetchall())
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM complaints").fetchone()[0]
+
+    def last_id(self):
+        return self._conn().execute("SELECT MAX(id) FROM complaints").fetchone()[0] or 0
+
+    def first_id_since(self, when_iso):
+        """Smallest id with time >= when_iso (0 if none), to start a scan at a date."""
+        row = self._conn().execute("SELECT MIN(id) FROM complaints WHERE time >= ?", (when_iso,)).fetchone()
+        return row[0] or 0
+
+    def iter_all(self, after_id=0, batch=1000):
+        """(id, record) pairs in insertion order, streamed in batches."""
+        while True:
+            rows = self._conn().execute(
+                "SELECT id, ticket_id, bus_number, complaint, time FROM complaints WHERE id > ? ORDER BY id LIMIT ?",
+                (after_id, batch),
+            ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row[0], self._records([row[1:]])[0]
+            after_id = rows[-1][0]
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,423 @@
+# chetna_delays.py
+# Live delay feed: latest delay per trip from local sources, kept in memory with expiry
+#
+#   CHETNA_DELAY_FEED=feeds/delays.jsonl      tail a JSON Lines file (appended by another process)
+#   CHETNA_DELAY_FEED_HISTORY=1               also read the lines already in it (timestamped ones only)
+#   CHETNA_DELAY_SOCKET=/tmp/chetna-delays.sock   receive datagrams on a UNIX socket
+#   CHETNA_DELAY_REPLAY=feeds/recorded.jsonl  replay a recorded feed (CHETNA_DELAY_REPLAY_SPEED=1)
+#
+#   python chetna_delays.py send --socket /tmp/chetna-delays.sock 202 7
+#   python chetna_delays.py replay recorded.jsonl --socket /tmp/chetna-delays.sock --speed 60
+#   python chetna_delays.py bench
+#
+# One update per line / datagram line:
+#   {"bus_id": "202", "delay": 7, "trip": "10:00 AM", "t": 1760000000.0, "ttl": 900}
+# trip, t (update time, default now) and ttl (seconds, default the store's) are
+# optional. An update older than the one already held for the trip is ignored.
+# A feed file is followed from its end, so a restart does not replay old
+# updates as fresh ones; with from_start (CHETNA_DELAY_FEED_HISTORY=1) the
+# existing lines are read too, keeping only records that carry their own "t".
+#
+# One background thread reads every source and applies updates; lookups are
+# two dict reads and never block on the feed.
+
+import argparse
+import json
+import math
+import os
+import selectors
+import socket
+import threading
+import time
+
+
+class DelayStore:
+    """Latest delay per (bus, trip) and per bus, each expiring `ttl` seconds after its update."""
+
+    def __init__(self, ttl=1800.0):
+        self.ttl = ttl
+        self._by_trip = {}     # (bus, trip) -> (delay, expires, t)
+        self._by_bus = {}      # bus -> (delay, expires, t), newest of its trips
+        self._lock = threading.Lock()   # writers only; readers go straight to the dicts
+        self.updates = self.stale = self.expired = 0
+
+    def update(self, bus_id, delay, trip=None, t=None, ttl=None):
+        bus = str(bus_id).strip()
+        t = time.time() if t is None else float(t)
+        delay, ttl = float(delay), self.ttl if ttl is None else float(ttl)
+        if not all(map(math.isfinite, (delay, ttl, t))):
+            raise ValueError("delay, t and ttl must be finite numbers")
+        entry = (int(round(delay)), t + ttl, t)
+        key = (bus, "" if trip is None else str(trip).strip())
+        with self._lock:
+            old = self._by_trip.get(key)
+            if old is not None and old[2] > t:
+                self.stale += 1
+                return False
+            self._by_trip[key] = entry
+            cur = self._by_bus.get(bus)
+            if cur is None or cur[2] <= t:
+                self._by_bus[bus] = entry
+            self.updates += 1
+        return True
+
+    def get(self, bus_id, trip=None, now=None):
+        """Delay in minutes, or None if nothing current is known."""
+        bus = str(bus_id).strip()
+        entry = self._by_trip.get((bus, trip.strip())) if trip else self._by_bus.get(bus)
+        if entry is None or entry[1] < (time.time() if now is None else now):
+            return None
+        return entry[0]
+
+    def current(self, now=None):
+        """{bus: delay} for every bus with a current update."""
+        now = time.time() if now is None else now
+        return {bus: e[0] for bus, e in list(self._by_bus.items()) if e[1] >= now}
+
+    def expire(self, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            for d in (self._by_trip, self._by_bus):
+                dead = [k for k, e in d.items() if e[1] < now]
+                for k in dead:
+                    del d[k]
+                if d is self._by_trip:
+                    self.expired += len(dead)
+
+    def __len__(self):
+        return len(self._by_trip)
+
+    def stats(self):
+        return {"trips": len(self._by_trip), "buses": len(self._by_bus), "updates": self.updates,
+                "stale": self.stale, "expired": self.expired}
+
+
+# ---------- Sources ----------
+class JsonlTail:
+    """
+    New lines of a JSON Lines file; follows truncation and rotation.
+    Starts at the end of the file unless from_start, in which case the lines
+    already there are read first, dropping any without a "t" timestamp
+    (counted in self.untimed) since their age is unknown.
+    """
+
+    def __init__(self, path, from_start=False):
+        self.path = path
+        self.from_start = from_start
+        self.untimed = 0
+        self._f = None
+        self._ino = None
+        self._partial = ""
+        self._opened = False
+        self._history = False
+
+    def _open(self):
+        # only the file found on the first attempt holds history; one that
+        # appears later (rotation, or created after start) is all new data
+        first, self._opened = not self._opened, True
+        try:
+            self._f = open(self.path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            self._f = None
+            return
+        self._ino = os.fstat(self._f.fileno()).st_ino
+        self._partial = ""
+        if first:
+            if self.from_start:
+                self._history = True
+            else:
+                self._skip_history()
+
+    def _skip_history(self):
+        size = self._f.seek(0, os.SEEK_END)
+        if size:
+            with open(self.path, "rb") as b:
+                b.seek(size - 1)
+                if b.read(1) != b"\n":
+                    self._partial = None   # mid-line: drop the rest of that line
+
+    def poll(self):
+        if self._f is None:
+            self._open()
+            if self._f is None:
+                return []
+        try:
+            st = os.stat(self.path)
+            if st.st_ino != self._ino or st.st_size < self._f.tell():
+                self._f.close()
+                self._open()
+                if self._f is None:
+                    return []
+        except FileNotFoundError:
+            pass  # rotated away; keep reading the old handle until the new file appears
+        data = self._f.read()
+        if self._partial is None:
+            if "\n" not in data:
+                return []
+            data = data.split("\n", 1)[1]
+            self._partial = ""
+        data = self._partial + data
+        if not data:
+            return []
+        lines = data.split("\n")
+        self._partial = lines.pop()   # incomplete last line, finished by a later write
+        if self._history:
+            self._history = False
+            return [line for line in lines if self._timed(line)]
+        return lines
+
+    def _timed(self, line):
+        r = _parse(line)
+        if r is not None and r.get("t") is None:
+            self.untimed += 1
+            return False
+        return True
+
+    def close(self):
+        if self._f:
+            self._f.close()
+
+
+class UnixSocketSource:
+    """Datagrams on a UNIX socket, each holding one or more update lines."""
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.exists(path):
+            os.unlink(path)    # left over from a previous run
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(path)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        self.sock.setblocking(False)
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def poll(self):
+        lines = []
+        while True:
+            try:
+                data = self.sock.recv(65536)
+            except (BlockingIOError, InterruptedError):
+                return lines
+            lines.extend(data.decode("utf-8", "replace").splitlines())
+
+    def close(self):
+        self.sock.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+class ReplaySource:
+    """A recorded feed played back in real time × speed; update times are shifted to now."""
+
+    def __init__(self, path, speed=1.0, loop=False):
+        self.speed = speed
+        self.loop = loop
+        with open(path, "r", encoding="utf-8") as f:
+            self._records = [r for r in (_parse(line) for line in f) if r is not None]
+        self._records.sort(key=lambda r: r.get("t", 0))
+        self._restart()
+
+    def _restart(self):
+        self._i = 0
+        self._start = time.time()
+        self._origin = self._records[0].get("t", 0) if self._records else 0
+
+    def poll(self):
+        out = []
+        now = time.time()
+        elapsed = (now - self._start) * self.speed
+        while self._i < len(self._records):
+            r = self._records[self._i]
+            if r.get("t", 0) - self._origin > elapsed:
+                break
+            out.append({**r, "t": now})
+            self._i += 1
+        if self.loop and self._records and self._i == len(self._records):
+            self._restart()
+        return out
+
+    def close(self):
+        pass
+
+
+def _parse(line):
+    if isinstance(line, dict):
+        return line
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        r = json.loads(line)
+    except ValueError:
+        return None
+    return r if isinstance(r, dict) else None
+
+
+# ---------- Feed ----------
+class DelayFeed:
+    """Reads its sources on one background thread and applies the updates to `store`."""
+
+    def __init__(self, store, sources=(), poll=0.2, sweep=10.0):
+        self.store = store
+        self.sources = list(sources)
+        self.poll_interval = poll
+        self.sweep_interval = sweep
+        self.bad = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def apply(self, records):
+        n = 0
+        for raw in records:
+            r = _parse(raw)
+            if r is None:
+                if isinstance(raw, str) and raw.strip():
+                    self.bad += 1
+                continue
+            try:
+                self.store.update(r["bus_id"], r["delay"], r.get("trip"), r.get("t"), r.get("ttl"))
+                n += 1
+            except (TypeError, KeyError, ValueError, ArithmeticError, AttributeError):
+                self.bad += 1   # one bad record must not stop the feed thread
+        return n
+
+    def start(self):
+        if self._thread is None and self.sources:
+            self._thread = threading.Thread(target=self._run, name="chetna-delays", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        for src in self.sources:
+            src.close()
+
+    def _run(self):
+        sel = selectors.DefaultSelector()
+        for src in self.sources:
+            if hasattr(src, "fileno"):
+                sel.register(src, selectors.EVENT_READ)
+        next_sweep = time.monotonic() + self.sweep_interval
+        while not self._stop.is_set():
+            if sel.get_map():
+                sel.select(self.poll_interval)   # wakes as soon as a datagram arrives
+            else:
+                self._stop.wait(self.poll_interval)
+            for src in self.sources:
+                try:
+                    self.apply(src.poll())
+                except OSError:
+                    pass  # e.g. file briefly unreadable; try again next round
+            if time.monotonic() >= next_sweep:
+                self.store.expire()
+                next_sweep = time.monotonic() + self.sweep_interval
+
+    def stats(self):
+        untimed = sum(getattr(src, "untimed", 0) for src in self.sources)
+        return {**self.store.stats(), "bad": self.bad, "untimed": untimed, "sources": len(self.sources)}
+
+
+def feed_from_env():
+    """DelayFeed over the sources configured in the environment (started if there are any)."""
+    store = DelayStore(ttl=float(os.getenv("CHETNA_DELAY_TTL_MINUTES", "30")) * 60)
+    sources = []
+    if os.getenv("CHETNA_DELAY_FEED"):
+        sources.append(JsonlTail(os.environ["CHETNA_DELAY_FEED"],
+                                 from_start=os.getenv("CHETNA_DELAY_FEED_HISTORY", "0") == "1"))
+    if os.getenv("CHETNA_DELAY_SOCKET") and hasattr(socket, "AF_UNIX"):
+        try:
+            sources.append(UnixSocketSource(os.environ["CHETNA_DELAY_SOCKET"]))
+        except OSError:
+            pass  # socket path unusable; other sources still work
+    if os.getenv("CHETNA_DELAY_REPLAY"):
+        try:
+            sources.append(ReplaySource(os.environ["CHETNA_DELAY_REPLAY"],
+                                        float(os.getenv("CHETNA_DELAY_REPLAY_SPEED", "1")), loop=True))
+        except OSError:
+            pass
+    return DelayFeed(store, sources).start()
+
+
+# ---------- CLI ----------
+def _send(sock_path, lines):
+    s = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    try:
+        batch = []
+        for line in lines:
+            batch.append(line)
+            if sum(len(b) + 1 for b in batch) > 32_000:
+                s.sendto("\n".join(batch).encode("utf-8"), sock_path)
+                batch = []
+        if batch:
+            s.sendto("\n".join(batch).encode("utf-8"), sock_path)
+    finally:
+        s.close()
+
+
+def _bench(n=200_000):
+    import random
+    import tempfile
+    rng = random.Random(5)
+    now = time.time()
+    lines = [json.dumps({"bus_id": str(100 + rng.randrange(5000)), "delay": rng.randint(0, 40),
+                         "trip": f"{rng.randint(1, 12)}:00 PM", "t": now}) for _ in range(n)]
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "feed.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        feed = DelayFeed(DelayStore(), [JsonlTail(path, from_start=True)], poll=0.01).start()
+        t0 = time.perf_counter()
+        while feed.store.updates + feed.store.stale < n and time.perf_counter() - t0 < 60:
+            time.sleep(0.005)
+        elapsed = time.perf_counter() - t0
+        feed.stop()
+    store = feed.store
+    t1 = time.perf_counter()
+    for i in range(100_000):
+        store.get(str(100 + i % 5000))
+    lookup = (time.perf_counter() - t1) / 100_000
+    print(f"ingested {n} updates in {elapsed:.2f} s ({n / elapsed:,.0f}/s); "
+          f"lookup {lookup * 1e6:.2f} us; {store.stats()}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Chetna delay feed tools")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sd = sub.add_parser("send", help="send one update to a running bot's socket")
+    sd.add_argument("--socket", default=os.getenv("CHETNA_DELAY_SOCKET", "/tmp/chetna-delays.sock"))
+    sd.add_argument("bus_id")
+    sd.add_argument("delay", type=float)
+    sd.add_argument("--trip")
+    rp = sub.add_parser("replay", help="play a recorded feed into a socket or a JSONL file")
+    rp.add_argument("path")
+    rp.add_argument("--socket")
+    rp.add_argument("--out", help="append to this JSONL file instead of a socket")
+    rp.add_argument("--speed", type=float, default=1.0)
+    sub.add_parser("bench", help="ingest and lookup rate")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "send":
+        _send(args.socket, [json.dumps({"bus_id": args.bus_id, "delay": args.delay, "trip": args.trip})])
+    elif args.cmd == "replay":
+        src = ReplaySource(args.path, args.speed)
+        while src._i < len(src._records):
+            lines = [json.dumps(r, ensure_ascii=False) for r in src.poll()]
+            if lines:
+                if args.out:
+                    with open(args.out, "a", encoding="utf-8") as f:
+                        f.write("\n".join(lines) + "\n")
+                else:
+                    _send(args.socket or os.getenv("CHETNA_DELAY_SOCKET", "/tmp/chetna-delays.sock"), lines)
+            time.sleep(0.05)
+    else:
+        _bench()
+
+
+if __name__ == "__main__":
+    main()
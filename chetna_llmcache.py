@@ -0,0 +1,166 @@
+# chetna_llmcache.py
+# Cache in front of the GPT4All fallback: exact + near-duplicate prompt matches, TTL, LRU, on disk
+#
+# Keys are (language, normalized prompt). A lookup tries the exact key first,
+# then, for prompts of 3+ words, the cached prompt in the same language with
+# the highest word-set overlap above `similarity`. Entries expire after
+# `ttl` seconds; beyond `max_entries` the least recently used go first.
+# Every insert is appended to a JSON Lines file, which is compacted when it
+# grows to twice the live entry count, so the cache survives restarts.
+
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+_PUNCT = re.compile(r"[^\w\s]")
+
+
+def normalize_prompt(text):
+    return " ".join(_PUNCT.sub(" ", (text or "").lower()).split())
+
+
+class ResponseCache:
+    def __init__(self, path=None, max_entries=2000, ttl=7 * 24 * 3600, similarity=0.8, min_words=3):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self.min_words = min_words
+        self.hits_exact = self.hits_similar = self.misses = self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # (lang, norm) -> (answer, created)
+        self._by_word = {}              # (lang, word) -> set of keys containing it
+        self._file_lines = 0
+        if path:
+            self._load()
+
+    # ---------- Index ----------
+    def _index(self, key):
+        for w in set(key[1].split()):
+            self._by_word.setdefault((key[0], w), set()).add(key)
+
+    def _unindex(self, key):
+        for w in set(key[1].split()):
+            keys = self._by_word.get((key[0], w))
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._by_word[(key[0], w)]
+
+    def _drop(self, key):
+        self._entries.pop(key, None)
+        self._unindex(key)
+
+    def _insert(self, key, answer, created):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        else:
+            self._index(key)
+        self._entries[key] = (answer, created)
+        while len(self._entries) > self.max_entries:
+            old = next(iter(self._entries))
+            self._drop(old)
+            self.evictions += 1
+
+    def _similar(self, lang, norm):
+        words = set(norm.split())
+        if len(words) < self.min_words or not self.similarity:
+            return None
+        overlap = {}
+        for w in words:
+            for k in self._by_word.get((lang, w), ()):
+                overlap[k] = overlap.get(k, 0) + 1
+        best, best_score = None, self.similarity
+        for k, shared in overlap.items():
+            score = shared / len(words | set(k[1].split()))
+            if score >= best_score:
+                best, best_score = k, score
+        return best
+
+    # ---------- API ----------
+    def get(self, prompt, lang):
+        norm = normalize_prompt(prompt)
+        now = time.time()
+        with self._lock:
+            key = (lang, norm)
+            similar = False
+            if key not in self._entries:
+                key, similar = self._similar(lang, norm), True
+            if key is None:
+                self.misses += 1
+                return None
+            answer, created = self._entries[key]
+            if now - created > self.ttl:
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if similar:
+                self.hits_similar += 1
+            else:
+                self.hits_exact += 1
+            return answer
+
+    def put(self, prompt, lang, answer):
+        if not answer:
+            return
+        norm = normalize_prompt(prompt)
+        created = time.time()
+        with self._lock:
+            self._insert((lang, norm), answer, created)
+            if self.path:
+                self._append({"lang": lang, "prompt": norm, "answer": answer, "t": created})
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits_exact": self.hits_exact,
+                "hits_similar": self.hits_similar,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    # ---------- Persistence ----------
+    def _load(self):
+        try:
+            f = open(self.path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            return
+        now = time.time()
+        with f:
+            for line in f:
+                self._file_lines += 1
+                try:
+                    r = json.loads(line)
+                    if now - r["t"] <= self.ttl:
+                        self._insert((r["lang"], r["prompt"]), r["answer"], r["t"])
+                except (ValueError, KeyError, TypeError):
+                    continue
+        self.evictions = 0
+
+    def _append(self, record):
+        try:
+            d = os.path.dirname(self.path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            if self._file_lines >= 2 * max(self.max_entries, len(self._entries)):
+                self._compact()   # rewrites the live entries, this record included
+                return
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file_lines += 1
+        except OSError:
+            pass  # the in-memory cache still works
+
+    def _compact(self):
+        tmp = f"{self.path}.tmp{os.getpid()}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for (lang, norm), (answer, created) in self._entries.items():
+                f.write(json.dumps({"lang": lang, "prompt": norm, "answer": answer, "t": created},
+                                   ensure_ascii=False) + "\n")
+        os.replace(tmp, self.path)
+        self._file_lines = len(self._entries)
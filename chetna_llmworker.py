@@ -0,0 +1,116 @@
+# chetna_llmworker.py
+# GPT4All inference on one dedicated thread, streamed, with a per-request deadline
+#
+# ask() hands the prompt to the worker and waits at most `deadline` seconds.
+# Tokens are passed to on_token as they arrive and complete sentences to
+# on_sentence (e.g. for text-to-speech). When the deadline passes the caller
+# gets None and its callbacks are never called again. If the answer was
+# already being generated, the worker either finishes it anyway and caches
+# it for next time (keep_late=True) or stops generating; a question that
+# timed out while still queued is dropped, so it cannot hold up the ones
+# behind it.
+
+import queue
+import re
+import threading
+
+SENTENCE_END = re.compile(r"[.!?।]+[\"')\]]*\s+")
+
+
+class _Job:
+    def __init__(self, prompt, lang, system, on_token, on_sentence):
+        self.prompt = prompt
+        self.lang = lang
+        self.system = system
+        self.on_token = on_token
+        self.on_sentence = on_sentence
+        self.result = None
+        self.abandoned = False
+        self.lock = threading.Lock()      # callbacks vs. abandonment
+        self.done = threading.Event()
+
+
+class LlmWorker:
+    def __init__(self, get_model, cache=None, keep_late=True, max_tokens=256, temp=0.2):
+        self.get_model = get_model        # () -> model or None; called on the worker thread
+        self.cache = cache
+        self.keep_late = keep_late
+        self.max_tokens = max_tokens
+        self.temp = temp
+        self.timeouts = self.late_cached = self.dropped = 0
+        self._q = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def ask(self, prompt, lang, system, deadline=None, on_token=None, on_sentence=None):
+        """Answer text, or None if the model is unavailable or the deadline passed."""
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="chetna-llm", daemon=True)
+                self._thread.start()
+        job = _Job(prompt, lang, system, on_token, on_sentence)
+        self._q.put(job)
+        if not job.done.wait(deadline):
+            with job.lock:
+                if not job.done.is_set():
+                    job.abandoned = True
+                    self.timeouts += 1
+                    return None
+        return job.result
+
+    # ---------- Worker ----------
+    def _emit(self, job, token, pending):
+        """Forward a token (and any completed sentences) unless the caller gave up. Returns the unsent tail."""
+        with job.lock:
+            if job.abandoned:
+                return pending
+            if job.on_token:
+                job.on_token(token)
+            pending += token
+            if job.on_sentence:
+                m = SENTENCE_END.search(pending)
+                while m:
+                    job.on_sentence(pending[:m.end()].strip())
+                    pending = pending[m.end():]
+                    m = SENTENCE_END.search(pending)
+        return pending
+
+    def _generate(self, model, job):
+        with model.chat_session(system_prompt=job.system):
+            try:
+                tokens = model.generate(job.prompt, max_tokens=self.max_tokens, temp=self.temp, streaming=True)
+            except TypeError:   # older gpt4all without streaming
+                tokens = [model.generate(job.prompt, max_tokens=self.max_tokens, temp=self.temp)]
+            pieces, pending = [], ""
+            for tok in tokens:
+                if job.abandoned and not self.keep_late:
+                    return None
+                pieces.append(tok)
+                pending = self._emit(job, tok, pending)
+            with job.lock:
+                if not job.abandoned and job.on_sentence and pending.strip():
+                    job.on_sentence(pending.strip())
+        return "".join(pieces).strip()
+
+    def _run(self):
+        while True:
+            job = self._q.get()
+            answer = None
+            with job.lock:
+                if job.abandoned:         # timed out before it reached the model
+                    self.dropped += 1
+                    job.done.set()
+                    continue
+            try:
+                model = self.get_model()
+                if model is not None and not (job.abandoned and not self.keep_late):
+                    answer = self._generate(model, job)
+            except Exception:
+                answer = None
+            if answer and self.cache is not None:
+                self.cache.put(job.prompt, job.lang, answer)
+                if job.abandoned:
+                    self.late_cached += 1
+            with job.lock:
+                job.result = answer or None
+                job.done.set()
@@ -5,31 +5,718 @@ import csv
 import json
 import os
 import random
+import re
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
 from datetime import datetime
 
+# Departure-minute ranges [start, end) for each period, latest range first so
+# the first hit is the latest bus of the period ("night" wraps past midnight).
+PERIOD_RANGES = {
+    "morning": ((5 * 60, 12 * 60),),
+    "afternoon": ((12 * 60, 17 * 60),),
+    "evening": ((17 * 60, 21 * 60),),
+    "night": ((21 * 60, 24 * 60), (0, 5 * 60)),
+}
+ALL_DAY = ((0, 24 * 60),)
+
+
+def _norm(value):
+    return str(value or "").strip().lower()
+
+
+def parse_time_minutes(t, default=0):
+    """"11:45 AM" -> minutes after midnight (705). Unparseable -> default (12:00 AM)."""
+    try:
+        clock, ampm = str(t).strip().split()
+        hh, mm = clock.split(":")
+        hh, mm, ampm = int(hh), int(mm), ampm.upper()
+        if not (1 <= hh <= 12 and 0 <= mm < 60 and ampm in ("AM", "PM")):
+            return default
+        return (hh % 12 + (12 if ampm == "PM" else 0)) * 60 + mm
+    except Exception:
+        return default
+
+
+def format_time_minutes(m):
+    """705 -> "11:45 AM" (inverse of parse_time_minutes)."""
+    hh, mm = divmod(int(m) % (24 * 60), 60)
+    return f"{hh % 12 or 12}:{mm:02d} {'PM' if hh >= 12 else 'AM'}"
+
+
+FARE_RE = re.compile(r"(\d+)(?:\.(\d{1,2}))?")
+
+
+def parse_fare_paise(fare):
+    """"₹45" -> 4500, "₹45.5" -> 4550. Unparseable -> -1."""
+    m = FARE_RE.search(str(fare or "").replace(",", ""))
+    if not m:
+        return -1
+    return int(m.group(1)) * 100 + int((m.group(2) or "0").ljust(2, "0"))
+
+
+def format_fare_paise(paise):
+    if paise < 0:
+        return ""
+    rupees, p = divmod(paise, 100)
+    return f"₹{rupees}" if not p else f"₹{rupees}.{p:02d}"
+
+
+# Trip run time used when the data has neither "duration" (minutes) nor "arrival"
+DEFAULT_RUN_MINUTES = 90
+# Longest "duration" accepted (a week); the columnar runtime column holds up to 65535
+MAX_RUN_MINUTES = 7 * 24 * 60
+
+
+def trip_run_minutes(trip):
+    """Minutes from departure to arrival for a row dict (see DEFAULT_RUN_MINUTES)."""
+    try:
+        if trip.get("duration") not in (None, ""):
+            return max(int(float(trip["duration"])), 1)
+        if trip.get("arrival"):
+            arr = parse_time_minutes(trip["arrival"], default=None)
+            if arr is not None:
+                return (arr - parse_time_minutes(trip.get("time"))) % (24 * 60) or 24 * 60
+    except (TypeError, ValueError):
+        pass
+    return DEFAULT_RUN_MINUTES
+
+
+def _minutes_from_now(now):
+    # A bus at 8:30 has already left at 8:30:20, so round partial minutes up.
+    return now.hour * 60 + now.minute + (1 if (now.second or now.microsecond) else 0)
+
+
+def minutes_now():
+    """Current time as minutes after midnight, rounded up like next_bus_between."""
+    return _minutes_from_now(datetime.now())
+
+
+class Timetable:
+    """
+    Read-only, indexed view over the trip rows returned by ChetnaLoader.load().
+
+    Behaves like the old list of dicts (iteration, len, indexing) so existing
+    callers keep working, and adds hash indexes for the hot lookups:
+      - by bus_id (multi-map: one bus number can run several trips)
+      - by normalized (source, destination), with that route's trips sorted by
+        departure and a parallel list of departure minutes for bisect queries
+    """
+
+    def __init__(self, rows):
+        self._rows = list(rows)
+        self._by_bus = {}
+        routes = {}
+        for b in self._rows:
+            self._by_bus.setdefault(str(b.get("bus_id")), []).append(b)
+            key = (_norm(b.get("source")), _norm(b.get("destination")))
+            routes.setdefault(key, []).append((parse_time_minutes(b.get("time", "12:00 AM")), b))
+        self._by_route = {}
+        for key, pairs in routes.items():
+            self._by_route[key] = self._route_entry(pairs)
+
+    @staticmethod
+    def _route_entry(pairs):
+        pairs.sort(key=lambda p: p[0])  # stable: equal times keep file order
+        return [b for _, b in pairs], [m for m, _ in pairs]
+
+    def apply_delta(self, ops, report=None):
+        """
+        Return a new Timetable with delta ops applied (see apply_delta_ops);
+        self is left untouched so readers holding it stay consistent. Only
+        the buckets of touched buses and routes are rebuilt.
+        """
+        touched, removed, added = apply_delta_ops(self.trips_for_bus, ops, report)
+        new = Timetable.__new__(Timetable)
+        gone = {id(b) for b in removed}
+        new._rows = [b for b in self._rows if id(b) not in gone] + added
+        new._by_bus = dict(self._by_bus)
+        for bid, trips in touched.items():
+            if trips:
+                new._by_bus[bid] = trips
+            else:
+                new._by_bus.pop(bid, None)
+        new._by_route = dict(self._by_route)
+        for key in {(_norm(b.get("source")), _norm(b.get("destination"))) for b in removed + added}:
+            old_trips, old_minutes = self._by_route.get(key, ((), ()))
+            pairs = [(m, b) for m, b in zip(old_minutes, old_trips) if id(b) not in gone]
+            pairs += [(parse_time_minutes(b["time"]), b) for b in added
+                      if (_norm(b.get("source")), _norm(b.get("destination"))) == key]
+            if pairs:
+                new._by_route[key] = self._route_entry(pairs)
+            else:
+                new._by_route.pop(key, None)
+        return new
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __getitem__(self, i):
+        return self._rows[i]
+
+    def trips_for_bus(self, bus_number):
+        return list(self._by_bus.get(str(bus_number), ()))
+
+    def stop_names(self):
+        """Distinct stop names as spelled in the data (first spelling seen)."""
+        names = {}
+        for b in self._rows:
+            for field in ("source", "destination"):
+                name = str(b.get(field) or "").strip()
+                names.setdefault(name.lower(), name)
+        return list(names.values())
+
+    def iter_connections(self):
+        """Yield (source, destination, departure_minutes, run_minutes, trip) per trip."""
+        for (src, dst), (trips, minutes) in self._by_route.items():
+            for m, b in zip(minutes, trips):
+                yield src, dst, m, trip_run_minutes(b), b
+
+    def trips_between(self, src, dst):
+        """All trips on the route, ordered by departure time."""
+        trips, _ = self._by_route.get((_norm(src), _norm(dst)), ((), ()))
+        return list(trips)
+
+    def next_between(self, src, dst, now_minutes):
+        """First trip departing at or after now_minutes, else the day's last trip."""
+        trips, minutes = self._by_route.get((_norm(src), _norm(dst)), ((), ()))
+        if not trips:
+            return None
+        i = bisect_left(minutes, now_minutes)
+        return trips[i] if i < len(trips) else trips[-1]
+
+    def last_in_period_between(self, src, dst, period):
+        trips, minutes = self._by_route.get((_norm(src), _norm(dst)), ((), ()))
+        for lo, hi in PERIOD_RANGES.get(period, ALL_DAY):
+            i = bisect_left(minutes, hi) - 1
+            if i >= 0 and minutes[i] >= lo:
+                return trips[i]
+        return None
+
+
+class TripView(Mapping):
+    """
+    Read-only dict-like row of a ColumnarTimetable, so callers can keep using
+    bus['fare'] / bus['time'] / bus.get('source') unchanged.
+    """
+    __slots__ = ("_tt", "_i")
+    FIELDS = ("bus_id", "source", "destination", "time", "fare")
+
+    def __init__(self, tt, i):
+        self._tt = tt
+        self._i = i
+
+    def __getitem__(self, key):
+        tt, i = self._tt, self._i
+        if key == "bus_id":
+            return tt._bus_ids[tt._bus[i]]
+        if key == "source":
+            return tt._cities[tt._src[i]]
+        if key == "destination":
+            return tt._cities[tt._dst[i]]
+        if key == "time":
+            return format_time_minutes(tt._minutes[i])
+        if key == "fare":
+            return format_fare_paise(tt._fare[i])
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class ColumnarTimetable:
+    """
+    Compact, array-backed alternative to Timetable for very large datasets.
+
+    Each trip costs a handful of machine integers instead of a dict of five
+    strings: city and bus_id strings are interned once, departure is stored
+    as minutes after midnight and fare as integer paise. Rows are kept sorted
+    by (route, departure), so a route is a contiguous slice of the minutes
+    column and bisect works on it directly. Both indexes are offset arrays
+    rather than dicts, so the whole table can live in a memory-mapped
+    snapshot (see chetna_snapshot.py):
+      - route_keys / route_offsets: sorted src_id * n_cities + dst_id keys,
+        route r owns rows [route_offsets[r], route_offsets[r + 1])
+      - bus_order / bus_offsets: row positions grouped by bus code (file order
+        within a bus), bus code c owns bus_order[bus_offsets[c]:bus_offsets[c + 1]]
+    Rows come back as TripView objects; iteration follows route order, not
+    file order. Besides the five standard fields only the trip run time
+    (from "duration" / "arrival", see trip_run_minutes) is kept.
+    """
+
+    COLUMNS = ("src", "dst", "minutes", "runtime", "fare", "bus", "route_keys", "route_offsets",
+               "bus_order", "bus_offsets")
+
+    def __init__(self, cities, bus_ids, columns):
+        self._cities = cities
+        self._city_index = {_norm(c): i for i, c in enumerate(cities)}
+        self._bus_ids = bus_ids
+        self._bus_index = {b: i for i, b in enumerate(bus_ids)}
+        self.columns = columns
+        self._src, self._dst = columns["src"], columns["dst"]
+        self._minutes, self._fare, self._bus = columns["minutes"], columns["fare"], columns["bus"]
+        self._runtime = columns["runtime"]
+        self._route_keys, self._route_offsets = columns["route_keys"], columns["route_offsets"]
+        self._bus_order, self._bus_offsets = columns["bus_order"], columns["bus_offsets"]
+
+    @classmethod
+    def from_rows(cls, rows):
+        builder = ColumnarBuilder()
+        for r in rows:
+            builder.add(r)
+        return builder.finish()
+
+    def __iter__(self):
+        return (TripView(self, i) for i in range(len(self._minutes)))
+
+    def __len__(self):
+        return len(self._minutes)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return TripView(self, i)
+
+    def apply_delta(self, ops, report=None):
+        """
+        Return a new ColumnarTimetable with delta ops applied. The arrays are
+        immutable (and may be memory-mapped), so this rebuilds the columns
+        from the in-memory rows: O(N), but no file re-parse.
+        """
+        rows = Timetable(dict(v, duration=self._runtime[v._i]) for v in self).apply_delta(ops, report)
+        return ColumnarTimetable.from_rows(rows)
+
+    def _route_slice(self, src, dst):
+        s = self._city_index.get(_norm(src))
+        d = self._city_index.get(_norm(dst))
+        if s is None or d is None:
+            return 0, 0
+        key = s * max(len(self._cities), 1) + d
+        r = bisect_left(self._route_keys, key)
+        if r == len(self._route_keys) or self._route_keys[r] != key:
+            return 0, 0
+        return self._route_offsets[r], self._route_offsets[r + 1]
+
+    def trips_for_bus(self, bus_number):
+        code = self._bus_index.get(str(bus_number))
+        if code is None:
+            return []
+        return [TripView(self, self._bus_order[j])
+                for j in range(self._bus_offsets[code], self._bus_offsets[code + 1])]
+
+    def trips_between(self, src, dst):
+        start, end = self._route_slice(src, dst)
+        return [TripView(self, i) for i in range(start, end)]
+
+    def stop_names(self):
+        return list(self._cities)
+
+    def iter_connections(self):
+        """Yield (source, destination, departure_minutes, run_minutes, trip) per trip."""
+        names = [_norm(c) for c in self._cities]
+        for i in range(len(self._minutes)):
+            yield names[self._src[i]], names[self._dst[i]], self._minutes[i], self._runtime[i], TripView(self, i)
+
+    def next_between(self, src, dst, now_minutes):
+        start, end = self._route_slice(src, dst)
+        if start == end:
+            return None
+        i = bisect_left(self._minutes, now_minutes, start, end)
+        return TripView(self, i if i < end else end - 1)
+
+    def last_in_period_between(self, src, dst, period):
+        start, end = self._route_slice(src, dst)
+        for lo, hi in PERIOD_RANGES.get(period, ALL_DAY):
+            i = bisect_left(self._minutes, hi, start, end) - 1
+            if i >= start and self._minutes[i] >= lo:
+                return TripView(self, i)
+        return None
+
+
+class ColumnarBuilder:
+    """
+    Accumulates rows straight into typed arrays, then sorts them into a
+    ColumnarTimetable. Single-use: finish() consumes the builder's columns.
+    """
+
+    def __init__(self):
+        self.cities, self._city_index = [], {}
+        self.bus_ids, self._bus_index = [], {}
+        self.src, self.dst = array("I"), array("I")
+        self.minutes, self.fare, self.bus = array("H"), array("i"), array("I")
+        self.runtime = array("H")
+        self.route, self._route_index = array("I"), {}
+
+    def _intern_city(self, name):
+        key = _norm(name)
+        i = self._city_index.get(key)
+        if i is None:
+            i = self._city_index[key] = len(self.cities)
+            self.cities.append(str(name or "").strip())
+        return i
+
+    def _intern_bus(self, bus_id):
+        key = str(bus_id)
+        i = self._bus_index.get(key)
+        if i is None:
+            i = self._bus_index[key] = len(self.bus_ids)
+            self.bus_ids.append(key)
+        return i
+
+    def add_many(self, rows):
+        for r in rows:
+            self.add(r)
+
+    def add(self, row):
+        s = self._intern_city(row.get("source"))
+        d = self._intern_city(row.get("destination"))
+        self.src.append(s)
+        self.dst.append(d)
+        self.route.append(self._route_index.setdefault((s << 32) | d, len(self._route_index)))
+        self.minutes.append(parse_time_minutes(row.get("time", "12:00 AM")))
+        self.runtime.append(trip_run_minutes(row))
+        self.fare.append(parse_fare_paise(row.get("fare")))
+        self.bus.append(self._intern_bus(row.get("bus_id")))
+
+    def finish(self):
+        n, ncity = len(self.minutes), max(len(self.cities), 1)
+        # Rank routes by their (src, dst) key, then order rows by route and
+        # departure with two stable counting sorts over typed arrays: no
+        # per-row Python objects, so the sort adds only a few bytes per trip.
+        ranked = sorted(self._route_index)  # (src << 32) | dst sorts like src * ncity + dst
+        rank = array("I", [0]) * len(ranked)
+        for r, sd in enumerate(ranked):
+            rank[self._route_index[sd]] = r
+        route_rank = array("I", (rank[rid] for rid in self.route))
+        perm = _counting_sort(_counting_sort(range(n), self.minutes, 1440), route_rank, len(ranked))
+        del route_rank
+
+        # Permute column by column, releasing each unsorted column as we go
+        # (the builder is single-use); "bus" is still needed for bus_order.
+        cols = {"bus": array("I", (self.bus[i] for i in perm))}
+        for name, typecode in (("src", "I"), ("dst", "I"), ("minutes", "H"), ("runtime", "H"), ("fare", "i")):
+            col = getattr(self, name)
+            cols[name] = array(typecode, (col[i] for i in perm))
+            setattr(self, name, array(typecode))
+        cols["route_keys"] = array("q", ((sd >> 32) * ncity + (sd & 0xFFFFFFFF) for sd in ranked))
+        route_offsets = array("I", [0]) * (len(ranked) + 1)
+        for rid in self.route:
+            route_offsets[rank[rid] + 1] += 1
+        for r in range(len(ranked)):
+            route_offsets[r + 1] += route_offsets[r]
+        cols["route_offsets"] = route_offsets
+
+        new_pos = array("I", [0]) * n
+        for new, old in enumerate(perm):
+            new_pos[old] = new
+        del perm
+        by_bus = _counting_sort(range(n), self.bus, len(self.bus_ids))
+        cols["bus_order"] = array("I", (new_pos[i] for i in by_bus))
+        bus_offsets = array("I", [0]) * (len(self.bus_ids) + 1)
+        for code in self.bus:
+            bus_offsets[code + 1] += 1
+        for c in range(len(self.bus_ids)):
+            bus_offsets[c + 1] += bus_offsets[c]
+        cols["bus_offsets"] = bus_offsets
+
+        return ColumnarTimetable(self.cities, self.bus_ids, cols)
+
+
+def _counting_sort(order, keys, k):
+    """Stable sort of the row ids in order by keys[row] (ints in [0, k)), as an array."""
+    starts = array("I", [0]) * (k + 1)
+    for i in order:
+        starts[keys[i] + 1] += 1
+    for c in range(k):
+        starts[c + 1] += starts[c]
+    out = array("I", [0]) * len(order)
+    for i in order:
+        c = keys[i]
+        out[starts[c]] = i
+        starts[c] += 1
+    return out
+
+
+TIMETABLE_TYPES = (Timetable, ColumnarTimetable)
+_LIST_TABLE = None   # (rows, Timetable) for the last plain list given to the helpers
+
+REQUIRED_FIELDS = ("bus_id", "source", "destination", "time")
+
+
+def normalize_row(row):
+    """
+    Validate one raw CSV/JSON record and return a cleaned copy (strings
+    stripped, bus_id as str). Raises ValueError with a readable reason.
+    Extra fields are passed through untouched.
+    """
+    if not isinstance(row, dict):
+        raise ValueError(f"expected an object, got {type(row).__name__}")
+    out = dict(row)
+    out.pop(None, None)  # csv.DictReader puts surplus columns under None
+    for field in REQUIRED_FIELDS:
+        value = row.get(field)
+        if value is None or not str(value).strip():
+            raise ValueError(f"missing {field}")
+        out[field] = str(value).strip()
+    if parse_time_minutes(out["time"], default=None) is None:
+        raise ValueError(f"bad time {out['time']!r}")
+    fare = str(row.get("fare") or "").strip()
+    if fare and parse_fare_paise(fare) < 0:
+        raise ValueError(f"bad fare {fare!r}")
+    out["fare"] = fare
+    duration = row.get("duration")
+    if duration not in (None, ""):
+        try:
+            minutes = float(duration)
+        except (TypeError, ValueError):
+            minutes = -1.0
+        if not 0 <= minutes <= MAX_RUN_MINUTES:   # also rejects nan
+            raise ValueError(f"bad duration {duration!r}")
+    return out
+
+
+DELTA_OPS = ("add", "cancel", "retime")
+
+
+def _delta_matches(trip, op):
+    if str(trip.get("bus_id")) != str(op.get("bus_id")):
+        return False
+    for field in ("source", "destination"):
+        if op.get(field) and _norm(trip.get(field)) != _norm(op[field]):
+            return False
+    if op.get("time") and parse_time_minutes(trip.get("time")) != parse_time_minutes(op["time"]):
+        return False
+    return True
+
+
+def apply_delta_ops(trips_for_bus, ops, report=None):
+    """
+    Apply delta ops in order against per-bus trip lists. Each op is a dict:
+      {"op": "add", <full trip fields>}
+      {"op": "cancel", "bus_id": ..., [source, destination, time]}  # omitted fields match any
+      {"op": "retime", "bus_id": ..., [source, destination, time], "new_time": "10:30 AM"}
+    Returns (touched {bus_id: new trip list}, removed trips, added trips).
+    Invalid ops or ops matching no trip are recorded in report and skipped.
+    """
+    touched = {}
+    for n, op in enumerate(ops, start=1):
+        try:
+            if isinstance(op, ValueError):
+                raise op
+            kind = op.get("op") if isinstance(op, dict) else None
+            if kind not in DELTA_OPS:
+                raise ValueError(f"unknown op {kind!r}")
+            bid = str(op.get("bus_id") or "").strip()
+            if not bid:
+                raise ValueError("missing bus_id")
+            if bid not in touched:
+                touched[bid] = list(trips_for_bus(bid))
+            trips = touched[bid]
+            if kind == "add":
+                trips.append(normalize_row({k: v for k, v in op.items() if k != "op"}))
+            else:
+                hits = [i for i, t in enumerate(trips) if _delta_matches(t, op)]
+                if not hits:
+                    raise ValueError(f"{kind}: no trip matches {op}")
+                if kind == "cancel":
+                    touched[bid] = [t for i, t in enumerate(trips) if i not in hits]
+                else:
+                    new_time = str(op.get("new_time") or "").strip()
+                    if parse_time_minutes(new_time, default=None) is None:
+                        raise ValueError(f"retime: bad new_time {new_time!r}")
+                    for i in hits:
+                        trips[i] = dict(trips[i], time=new_time)
+            if report is not None:
+                report.rows_ok += 1
+        except ValueError as e:
+            if report is not None:
+                report.error(n, str(e))
+
+    removed, added = [], []
+    for bid, trips in touched.items():
+        before = list(trips_for_bus(bid))
+        before_ids, after_ids = {id(t) for t in before}, {id(t) for t in trips}
+        removed += [t for t in before if id(t) not in after_ids]
+        added += [t for t in trips if id(t) not in before_ids]
+    return touched, removed, added
+
+
+class LoadReport:
+    """Row-level outcome of a streaming load: counts plus the first max_errors problems."""
+
+    def __init__(self, max_errors=100):
+        self.rows_ok = 0
+        self.rows_bad = 0
+        self.errors = []  # [(record_number, reason)], 1-based, header excluded
+        self.max_errors = max_errors
+
+    def error(self, row_number, reason):
+        self.rows_bad += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((row_number, reason))
+
+    def summary(self):
+        return f"{self.rows_ok} rows loaded, {self.rows_bad} rejected"
+
+
+def iter_json_array(f, chunk_size=1 << 16, max_record=1 << 20):
+    """
+    Incrementally parse a top-level JSON array from a text file object,
+    yielding one element at a time, so memory stays bounded by the largest
+    record rather than the file. An unparseable record is yielded as a
+    ValueError (so the caller can report it) and skipped by resynchronising
+    on the next '{'.
+    """
+    decoder = json.JSONDecoder()
+    buf, pos, eof, started = "", 0, False, False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = f.read(chunk_size)
+        buf = buf[pos:] + chunk
+        pos = 0
+        eof = not chunk
+
+    while True:
+        while pos < len(buf) and (buf[pos].isspace() or (started and buf[pos] == ",")):
+            pos += 1
+        if pos >= len(buf):
+            if eof:
+                return
+            fill()
+            continue
+        if not started:
+            if buf[pos] != "[":
+                raise ValueError("JSON timetable must be an array of trip objects")
+            started = True
+            pos += 1
+            continue
+        if buf[pos] == "]":
+            return
+        try:
+            obj, end = decoder.raw_decode(buf, pos)
+        except ValueError as e:
+            if not eof and len(buf) - pos < max_record:
+                fill()
+                continue
+            yield ValueError(f"invalid JSON: {e.msg}")
+            nxt = buf.find("{", pos + 1)
+            if nxt < 0:
+                if eof:
+                    return
+                pos = len(buf)
+                fill()
+                continue
+            pos = nxt
+            continue
+        if end == len(buf) and not eof:
+            fill()  # value may continue in the next chunk; decode again
+            continue
+        pos = end
+        yield obj
+
+
 class ChetnaLoader:
-    def __init__(self, file_path=None):
+    STORAGE_MODES = ("dict", "columnar")
+
+    def __init__(self, file_path=None, storage="dict", snapshot=False):
+        """
+        storage:  "dict"     -> Timetable over the parsed row dicts (default)
+                  "columnar" -> ColumnarTimetable, far smaller for big datasets
+        snapshot: columnar only; keep a binary snapshot next to the source file
+                  (<file>.snap) and memory-map it instead of re-parsing
+        """
+        if storage not in self.STORAGE_MODES:
+            raise ValueError(f"unknown storage mode: {storage!r}")
         self.file_path = file_path
+        self.storage = storage
+        self.snapshot = snapshot
+        self.last_report = None
 
     # ---------- Loaders ----------
     def load(self):
+        """Load the dataset and return it as an indexed timetable."""
         if not self.file_path:
-            return self._dummy()
+            return self._build(self._dummy())
+        ext = os.path.splitext(self.file_path)[1].lower()
+        if ext not in (".json", ".csv"):
+            return self._build(self._dummy())
+        if self.snapshot and self.storage == "columnar":
+            return self._load_via_snapshot()
+        return self.load_streaming()
+
+    def _build(self, rows):
+        if self.storage == "columnar":
+            return ColumnarTimetable.from_rows(rows)
+        return Timetable(rows)
+
+    def _load_via_snapshot(self):
+        from chetna_snapshot import read_snapshot, snapshot_path, source_key, write_snapshot
+        key = source_key(self.file_path)
+        snap = snapshot_path(self.file_path)
+        tt = read_snapshot(snap, key)
+        if tt is not None:
+            return tt
+        # Missing, stale or corrupt: rebuild from source and refresh the snapshot
+        tt = self.load_streaming()
+        try:
+            write_snapshot(tt, snap, key)
+        except OSError:
+            pass  # read-only data dir: still serve the freshly built table
+        return tt
+
+    def iter_rows(self):
+        """Stream raw records from the CSV/JSON file without materializing it."""
         ext = os.path.splitext(self.file_path)[1].lower()
-        if ext == ".json":
-            return self.load_json()
-        if ext == ".csv":
-            return self.load_csv()
-        return self._dummy()
+        with open(self.file_path, "r", encoding="utf-8", newline="") as f:
+            if ext == ".json":
+                yield from iter_json_array(f)
+            else:
+                yield from csv.DictReader(f)
 
-    def load_json(self):
-        with open(self.file_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+    def load_streaming(self, chunk_size=10_000, max_errors=100):
+        """
+        Read, validate and index the file row by row, feeding the index
+        builder in chunks. Bad rows are skipped and recorded in
+        self.last_report (a LoadReport) instead of failing the load.
+        """
+        report = LoadReport(max_errors)
+        builder = ColumnarBuilder() if self.storage == "columnar" else None
+        rows, chunk = [], []
+        for n, raw in enumerate(self.iter_rows(), start=1):
+            try:
+                if isinstance(raw, ValueError):
+                    raise raw
+                chunk.append(normalize_row(raw))
+            except ValueError as e:
+                report.error(n, str(e))
+                continue
+            if len(chunk) >= chunk_size:
+                self._flush_chunk(chunk, builder, rows, report)
+                chunk = []
+        self._flush_chunk(chunk, builder, rows, report)
+        self.last_report = report
+        return builder.finish() if builder else Timetable(rows)
 
-    def load_csv(self):
-        with open(self.file_path, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            return list(reader)
+    @staticmethod
+    def _flush_chunk(chunk, builder, rows, report):
+        report.rows_ok += len(chunk)
+        if builder:
+            builder.add_many(chunk)
+        else:
+            rows.extend(chunk)
 
     def _dummy(self):
         return [
@@ -39,60 +726,56 @@ class ChetnaLoader:
         ]
 
     # ---------- Helpers ----------
+    # Helpers accept either a Timetable (O(1) index lookups) or a plain
+    # list of dicts (linear scan, kept for callers that build their own lists).
     @staticmethod
     def search_buses_by_number(buses, bus_number):
-        for b in buses:
-            if str(b.get("bus_id")) == str(bus_number):
-                return b
-        return None
+        trips = ChetnaLoader.search_all_buses_by_number(buses, bus_number)
+        return trips[0] if trips else None
+
+    @staticmethod
+    def search_all_buses_by_number(buses, bus_number):
+        if isinstance(buses, TIMETABLE_TYPES):
+            return buses.trips_for_bus(bus_number)
+        return [b for b in buses if str(b.get("bus_id")) == str(bus_number)]
+
+    @staticmethod
+    def resolve_city(buses, name):
+        """Map a user-typed city (typo, Hinglish, Devanagari) to the timetable's spelling, or None."""
+        from chetna_cities import resolver_for
+        return resolver_for(ChetnaLoader._as_timetable(buses)).resolve(name)
 
     @staticmethod
     def buses_between(buses, src, dst):
-        s, d = (src or "").lower(), (dst or "").lower()
-        return [b for b in buses if b.get("source", "").lower() == s and b.get("destination", "").lower() == d]
+        if isinstance(buses, TIMETABLE_TYPES):
+            return buses.trips_between(src, dst)
+        s, d = _norm(src), _norm(dst)
+        return [b for b in buses if _norm(b.get("source")) == s and _norm(b.get("destination")) == d]
 
     @staticmethod
-    def _parse_time_12h(t):
-        # "11:45 AM" -> datetime for sorting within same day
-        try:
-            return datetime.strptime(t.strip(), "%I:%M %p")
-        except Exception:
-            return datetime.strptime("12:00 AM", "%I:%M %p")
+    def _as_timetable(buses):
+        """
+        buses as a Timetable. A plain list is indexed once and reused while
+        the same trip dicts are passed again, so its city resolver and other
+        per-timetable caches keep hitting.
+        """
+        global _LIST_TABLE
+        if isinstance(buses, TIMETABLE_TYPES):
+            return buses
+        cached = _LIST_TABLE
+        if cached is not None and len(cached[0]) == len(buses) and all(a is b for a, b in zip(cached[0], buses)):
+            return cached[1]
+        rows = list(buses)
+        tt = Timetable(rows)
+        _LIST_TABLE = (rows, tt)
+        return tt
 
-    def next_bus_between(self, buses, src, dst):
-        matches = self.buses_between(buses, src, dst)
-        if not matches:
-            return None
-        now = datetime.now()
-        matches.sort(key=lambda b: self._parse_time_12h(b.get("time", "12:00 AM")))
-        for b in matches:
-            t = self._parse_time_12h(b.get("time", "12:00 AM"))
-            if t.time() >= now.time():
-                return b
-        return matches[-1]  # fallback
+    def next_bus_between(self, buses, src, dst, now=None):
+        now = now or datetime.now()
+        return self._as_timetable(buses).next_between(src, dst, _minutes_from_now(now))
 
     def last_bus_in_period_between(self, buses, src, dst, period):
-        matches = self.buses_between(buses, src, dst)
-        if not matches:
-            return None
-
-        def in_period(t, p):
-            hour = self._parse_time_12h(t).hour
-            if p == "morning":
-                return 5 <= hour < 12
-            if p == "afternoon":
-                return 12 <= hour < 17
-            if p == "evening":
-                return 17 <= hour < 21
-            if p == "night":
-                return hour >= 21 or hour < 5
-            return True
-
-        period_matches = [b for b in matches if in_period(b.get("time", "12:00 AM"), period)]
-        if not period_matches:
-            return None
-        period_matches.sort(key=lambda b: self._parse_time_12h(b.get("time", "12:00 AM")))
-        return period_matches[-1]
+        return self._as_timetable(buses).last_in_period_between(src, dst, period)
 
     @staticmethod
     def simulate_bus_locations(buses):
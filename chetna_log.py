@@ -0,0 +1,187 @@
+# chetna_log.py
+# Buffered chat/event log: a background thread batches writes, rotates and compresses segments
+#
+# Records are queued by the caller and written by one writer thread, so the
+# reply path never touches the disk. Two formats:
+#   text: "[2026-01-01 10:00:00] USER: ..."  (the original chat history format)
+#   json: one object per line, e.g. {"ts": ..., "kind": "chat", "user": ..., "bot": ...,
+#         "lang": "hi-latn", "intent": "fare_info", "latency_ms": 3.2}
+# The live file rotates when it passes max_bytes or the day changes; old
+# segments are renamed "<name>-<YYYYmmdd-HHMMSS><ext>" and optionally gzipped.
+
+import atexit
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime
+
+_FLUSH = object()
+_STOP = object()
+
+
+class LogWriter:
+    def __init__(self, path, fmt="text", max_bytes=10 * 1024 * 1024, rotate_daily=True,
+                 compress=True, flush_interval=1.0, batch_size=256, queue_size=10_000):
+        if fmt not in ("text", "json"):
+            raise ValueError(f"unknown log format {fmt!r}")
+        self.path = path
+        self.fmt = fmt
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+        self.compress = compress
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.dropped = 0
+        self.bad = 0           # records that could not be formatted (skipped)
+        self._q = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._f = None
+        self._day = None
+
+    # ---------- Producer side ----------
+    def write(self, record):
+        """Queue a record (dict with at least "kind"; "ts" is added). Never does I/O."""
+        record.setdefault("ts", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        self._ensure_started()
+        try:
+            self._q.put_nowait(record)
+        except queue.Full:
+            try:
+                self._q.put(record, timeout=1.0)  # brief backpressure if the disk falls behind
+            except queue.Full:
+                self.dropped += 1
+
+    def flush(self, timeout=5.0):
+        """Block until everything queued so far is on disk (or timeout)."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self._q.put((_FLUSH, done))
+        done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        if self._thread is not None and self._thread.is_alive():
+            self._q.put(_STOP)
+            self._thread.join(timeout)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                t = threading.Thread(target=self._run, name="chetna-log-writer", daemon=True)
+                t.start()
+                self._thread = t
+                atexit.register(self.close)
+
+    # ---------- Writer thread ----------
+    def format(self, record):
+        if self.fmt == "json":
+            return json.dumps(record, ensure_ascii=False) + "\n"
+        return f"[{record['ts']}] {record['message']}\n"
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self._q.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+            batch, waiters, stop = [], [], False
+            while item is not None:
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, tuple) and item[0] is _FLUSH:
+                    waiters.append(item[1])
+                else:
+                    try:
+                        batch.append(self.format(item))
+                    except Exception:
+                        self.bad += 1   # e.g. not JSON-serialisable; the writer thread must live on
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._q.get_nowait()
+                except queue.Empty:
+                    item = None
+            try:
+                if batch:
+                    self._write("".join(batch))
+                if self._f and (waiters or stop or time.monotonic() - last_flush >= self.flush_interval):
+                    self._f.flush()
+                    last_flush = time.monotonic()
+            except OSError:
+                pass  # logging must never take the bot down
+            for w in waiters:
+                w.set()
+            if stop:
+                if self._f:
+                    self._f.close()
+                    self._f = None
+                return
+
+    def _write(self, data):
+        today = datetime.now().date()
+        if self._f is None:
+            d = os.path.dirname(self.path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            if os.path.exists(self.path) and self._should_rotate(today):
+                self._rotate()
+            self._f = open(self.path, "a", encoding="utf-8")
+            self._day = today
+        elif self._should_rotate(today):
+            self._f.close()
+            self._f = None
+            self._rotate()
+            self._f = open(self.path, "a", encoding="utf-8")
+            self._day = today
+        self._f.write(data)
+
+    def _should_rotate(self, today):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return False
+        if self.max_bytes and st.st_size >= self.max_bytes:
+            return True
+        if self.rotate_daily and st.st_size:
+            day = self._day or datetime.fromtimestamp(st.st_mtime).date()
+            return day != today
+        return False
+
+    def _rotate(self):
+        root, ext = os.path.splitext(self.path)
+        stamp = datetime.fromtimestamp(os.stat(self.path).st_mtime).strftime("%Y%m%d-%H%M%S")
+        target, n = f"{root}-{stamp}{ext}", 1
+        while os.path.exists(target) or os.path.exists(target + ".gz"):
+            n += 1
+            target = f"{root}-{stamp}-{n}{ext}"
+        os.replace(self.path, target)
+        if self.compress:
+            with open(target, "rb") as src, gzip.open(target + ".gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(target)
+
+
+def writer_from_env(text_path):
+    """
+    LogWriter configured from CHETNA_LOG_* variables:
+      CHETNA_LOG_FORMAT=text|json (json writes <name>.jsonl), CHETNA_LOG_MAX_MB (10),
+      CHETNA_LOG_ROTATE_DAILY (1), CHETNA_LOG_GZIP (1), CHETNA_LOG_FLUSH_SECONDS (1)
+    """
+    fmt = os.getenv("CHETNA_LOG_FORMAT", "text")
+    path = os.path.splitext(text_path)[0] + ".jsonl" if fmt == "json" else text_path
+    return LogWriter(
+        path,
+        fmt=fmt,
+        max_bytes=int(float(os.getenv("CHETNA_LOG_MAX_MB", "10")) * 1024 * 1024),
+        rotate_daily=os.getenv("CHETNA_LOG_ROTATE_DAILY", "1") != "0",
+        compress=os.getenv("CHETNA_LOG_GZIP", "1") != "0",
+        flush_interval=float(os.getenv("CHETNA_LOG_FLUSH_SECONDS", "1")),
+    )
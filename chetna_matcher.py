@@ -0,0 +1,63 @@
+# chetna_matcher.py
+# Aho-Corasick keyword matcher: every keyword of every label found in one pass
+
+class KeywordMatcher:
+    """
+    Compiled once from (keyword, label, whole_word) entries. find() walks the
+    text a single time and returns the set of labels whose keyword occurs:
+      - whole_word=False: plain substring match (same as `kw in text`)
+      - whole_word=True : match must sit between non-word characters, like
+        the regex \\bkw\\b (word chars = str.isalnum() or "_")
+    Transitions are precomputed for every state (failure links folded in),
+    so each input character costs one dict lookup.
+    """
+
+    def __init__(self, entries):
+        goto, outputs = [{}], [[]]
+        for keyword, label, whole_word in entries:
+            s = 0
+            for ch in keyword:
+                nxt = goto[s].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[s][ch] = nxt
+                    goto.append({})
+                    outputs.append([])
+                s = nxt
+            outputs[s].append((len(keyword), label, whole_word))
+
+        # BFS: fail links, merged outputs, full transition tables
+        fail = [0] * len(goto)
+        delta = [dict(goto[0])] + [None] * (len(goto) - 1)
+        queue = list(goto[0].values())
+        while queue:
+            s = queue.pop(0)
+            delta[s] = dict(delta[fail[s]])
+            delta[s].update(goto[s])
+            outputs[s] = outputs[s] + outputs[fail[s]]
+            for ch, nxt in goto[s].items():
+                fail[nxt] = delta[fail[s]].get(ch, 0) if s else 0
+                queue.append(nxt)
+        self._delta = delta
+        self._out = [tuple(o) for o in outputs]
+        self.labels = {label for _, label, _ in entries}
+
+    @staticmethod
+    def _is_word(ch):
+        return ch.isalnum() or ch == "_"
+
+    def find(self, text):
+        found = set()
+        delta, out, s = self._delta, self._out, 0
+        n = len(text)
+        for i, ch in enumerate(text):
+            s = delta[s].get(ch, 0)
+            if out[s]:
+                for length, label, whole_word in out[s]:
+                    if whole_word:
+                        start = i - length + 1
+                        if (start > 0 and self._is_word(text[start - 1])) or \
+                                (i + 1 < n and self._is_word(text[i + 1])):
+                            continue
+                    found.add(label)
+        return found
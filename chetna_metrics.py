@@ -0,0 +1,298 @@
+# chetna_metrics.py
+# Per-stage latency histograms, labelled by intent and language, with Prometheus/JSON export
+#
+# Stages are timed with METRICS.stage("name") or @METRICS.timed("name").
+# Stages nest, and each one records its own time only: a stage's children
+# are subtracted from it, so the stages of a turn add up to the whole turn.
+# Inside METRICS.turn() the timings are held back until the turn's intent
+# and language are known (turn.label(intent_data)). They are then added to
+# the histograms together with a "turn" total. Timings taken outside a turn
+# get the label intent="-".
+#
+# When disabled (CHETNA_METRICS=0), stage() returns a shared no-op context
+# and timed() wrappers cost one attribute check.
+
+import atexit
+import contextvars
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+_TURN = contextvars.ContextVar("chetna_turn", default=None)
+
+
+class _Null:
+    """Stage/turn stand-in while metrics are disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def label(self, intent_data):
+        pass
+
+
+_NULL = _Null()
+
+
+class _Turn:
+    __slots__ = ("intent", "lang", "samples", "stack")
+
+    def __init__(self):
+        self.intent = self.lang = "-"
+        self.samples = []     # (stage, seconds), added to the histograms when the turn ends
+        self.stack = []       # [child seconds] per open stage
+
+    def label(self, intent_data):
+        self.intent = intent_data.get("intent") or "-"
+        self.lang = intent_data.get("lang") or "-"
+
+
+class _Stage:
+    __slots__ = ("metrics", "name", "turn", "t0")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.turn = _TURN.get()
+        if self.turn is not None:
+            self.turn.stack.append(0.0)
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.t0
+        turn = self.turn
+        if turn is None:
+            self.metrics.observe(self.name, "-", "-", elapsed)
+            return False
+        own = elapsed - turn.stack.pop()
+        if turn.stack:
+            turn.stack[-1] += elapsed
+        turn.samples.append((self.name, own))
+        return False
+
+
+class _TurnScope:
+    __slots__ = ("metrics", "intent_data", "turn", "token", "t0")
+
+    def __init__(self, metrics, intent_data):
+        self.metrics = metrics
+        self.intent_data = intent_data
+
+    def __enter__(self):
+        self.turn = _TURN.get()
+        self.token = None
+        if self.turn is None:          # outermost turn owns the timings
+            self.turn = _Turn()
+            self.token = _TURN.set(self.turn)
+            self.t0 = time.perf_counter()
+        if self.intent_data:
+            self.turn.label(self.intent_data)
+        return self.turn
+
+    def __exit__(self, *exc):
+        if self.token is None:
+            return False
+        elapsed = time.perf_counter() - self.t0
+        _TURN.reset(self.token)
+        turn = self.turn
+        self.metrics.observe_many(turn.intent, turn.lang, turn.samples + [("turn", elapsed)])
+        return False
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)   # last slot: +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def add(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def merge(self, other):
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.sum += other.sum
+        self.count += other.count
+
+    def quantile(self, q):
+        """Estimate from the buckets (linear within a bucket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if c and seen + c >= rank:
+                lo = BUCKETS[i - 1] if i else 0.0
+                hi = BUCKETS[i] if i < len(BUCKETS) else lo * 2 or 1.0
+                return lo + (hi - lo) * (rank - seen) / c
+            seen += c
+        return BUCKETS[-1]
+
+
+class Metrics:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._hists = {}   # (stage, intent, lang) -> _Histogram
+
+    # ---------- Timing ----------
+    def stage(self, name):
+        return _Stage(self, name) if self.enabled else _NULL
+
+    def timed(self, name):
+        def deco(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with _Stage(self, name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return deco
+
+    def turn(self, intent_data=None):
+        """Group the stages of one user turn under its intent and language."""
+        return _TurnScope(self, intent_data) if self.enabled else _NULL
+
+    def observe(self, stage, intent, lang, seconds):
+        self.observe_many(intent, lang, [(stage, seconds)])
+
+    def observe_many(self, intent, lang, samples):
+        with self._lock:
+            for stage, seconds in samples:
+                h = self._hists.get((stage, intent, lang))
+                if h is None:
+                    h = self._hists[(stage, intent, lang)] = _Histogram()
+                h.add(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._hists.clear()
+
+    # ---------- Views ----------
+    def _copy(self):
+        with self._lock:
+            out = {}
+            for key, h in self._hists.items():
+                c = out[key] = _Histogram()
+                c.merge(h)
+            return out
+
+    def summary(self, by=("stage",)):
+        """{label tuple: (count, p50, p99, mean)}, aggregated over the labels not in `by`."""
+        pos = {"stage": 0, "intent": 1, "lang": 2}
+        groups = {}
+        for key, h in self._copy().items():
+            g = tuple(key[pos[b]] for b in by)
+            groups.setdefault(g, _Histogram()).merge(h)
+        return {g: (h.count, h.quantile(0.5), h.quantile(0.99), h.sum / h.count)
+                for g, h in sorted(groups.items()) if h.count}
+
+    def snapshot(self):
+        return {
+            "time": time.time(),
+            "buckets": list(BUCKETS),
+            "series": [
+                {"stage": s, "intent": i, "lang": lang, "count": h.count, "sum": h.sum, "counts": h.counts}
+                for (s, i, lang), h in sorted(self._copy().items())
+            ],
+        }
+
+    def to_prometheus(self, name="chetna_stage_seconds"):
+        lines = [f"# HELP {name} Time spent per turn stage.", f"# TYPE {name} histogram"]
+        for (s, i, lang), h in sorted(self._copy().items()):
+            labels = f'stage="{s}",intent="{i}",lang="{lang}"'
+            cum = 0
+            for bound, c in zip(BUCKETS + (float("inf"),), h.counts):
+                cum += c
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cum}')
+            lines.append(f"{name}_sum{{{labels}}} {h.sum:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Atomically write a .json snapshot, or Prometheus text for any other extension."""
+        data = json.dumps(self.snapshot()) if path.endswith(".json") else self.to_prometheus()
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        tmp = f"{path}.tmp{os.getpid()}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+
+def format_stats(metrics):
+    """Text table for the chat loop's `stats` command."""
+    if not metrics.enabled:
+        return "Metrics are off (CHETNA_METRICS=0)."
+    ms = lambda v: f"{v * 1000:8.2f}"  # noqa: E731
+    rows = ["stage            count   p50 ms   p99 ms  mean ms"]
+    for (stage,), (n, p50, p99, mean) in metrics.summary(("stage",)).items():
+        rows.append(f"{stage:<14}{n:>8} {ms(p50)} {ms(p99)} {ms(mean)}")
+    turns = {k: v for k, v in metrics.summary(("stage", "intent", "lang")).items() if k[0] == "turn"}
+    if turns:
+        rows.append("")
+        rows.append("turn by intent/lang       count   p50 ms   p99 ms")
+        for (_, intent, lang), (n, p50, p99, _) in turns.items():
+            rows.append(f"{intent + '/' + lang:<24}{n:>8} {ms(p50)} {ms(p99)}")
+    if len(rows) == 1:
+        return "No turns measured yet."
+    return "\n".join(rows)
+
+
+class MetricsExporter:
+    """Writes the metrics to `path` every `interval` seconds, and once more at exit."""
+
+    def __init__(self, metrics, path, interval=15.0):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="chetna-metrics", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _export(self):
+        try:
+            self.metrics.write(self.path)
+        except OSError:
+            pass  # try again next interval
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._export()
+
+    def close(self):
+        if not self._stop.is_set():
+            self._stop.set()
+            self._export()
+
+
+def metrics_from_env():
+    """
+    CHETNA_METRICS=0                      disable timing
+    CHETNA_METRICS_FILE=logs/metrics.prom export path (.json for a JSON snapshot); unset = no export
+    CHETNA_METRICS_EXPORT_SECONDS=15      export interval
+    """
+    metrics = Metrics(enabled=os.getenv("CHETNA_METRICS", "1") != "0")
+    path = os.getenv("CHETNA_METRICS_FILE")
+    if path and metrics.enabled:
+        metrics.exporter = MetricsExporter(metrics, path, float(os.getenv("CHETNA_METRICS_EXPORT_SECONDS", "15")))
+    return metrics
@@ -0,0 +1,205 @@
+# chetna_planner.py
+# Multi-leg journey planning over the timetable (earliest arrival + transfer rounds)
+#
+# Every trip is one connection: (from stop, to stop, departure, arrival), with
+# arrival = departure + run time (see chetna_loader.trip_run_minutes). Times are
+# minutes after midnight of the query day. The timetable repeats daily, so a
+# search that runs out of departures at a stop carries on with the next day's
+# (times >= DAY), up to SEARCH_DAYS days from the query day.
+
+import heapq
+import threading
+import weakref
+from array import array
+from bisect import bisect_left
+
+from chetna_loader import format_time_minutes
+
+# Minimum minutes between arriving on one bus and leaving on another.
+# Staying on the same bus number at a stop needs no transfer time.
+MIN_TRANSFER_MINUTES = 15
+MAX_LEGS = 4
+DAY = 24 * 60
+SEARCH_DAYS = 2      # the query day and the next one
+
+
+class Journey:
+    """A list of legs; each leg is (trip, departure_minutes, arrival_minutes)."""
+
+    def __init__(self, legs):
+        self.legs = legs
+
+    @property
+    def departure(self):
+        return self.legs[0][1]
+
+    @property
+    def arrival(self):
+        return self.legs[-1][2]
+
+    @property
+    def transfers(self):
+        return sum(1 for a, b in zip(self.legs, self.legs[1:])
+                   if str(a[0].get("bus_id")) != str(b[0].get("bus_id")))
+
+    def key(self):
+        return tuple((id(t), d) for t, d, _ in self.legs)
+
+    def leg_days(self):
+        """[(departure day, arrival day), ...] per leg; 0 = the query day, 1 = the next day."""
+        return [(d // DAY, a // DAY) for _, d, a in self.legs]
+
+    def describe_legs(self):
+        """[(bus_id, source, "8:30 AM", destination, "10:00 AM"), ...] for reply templates."""
+        return [(t["bus_id"], t["source"], format_time_minutes(d), t["destination"], format_time_minutes(a))
+                for t, d, a in self.legs]
+
+
+class JourneyPlanner:
+    """
+    Precomputes, once per timetable:
+      - all connections sorted by departure, as parallel arrays
+      - per-stop departure arrays (sorted minutes + connection ids) so both
+        searches jump to "first bus out of stop s after t" with one bisect
+    """
+
+    def __init__(self, timetable, min_transfer=MIN_TRANSFER_MINUTES, days=SEARCH_DAYS):
+        self.min_transfer = min_transfer
+        self.days = days
+        self._stop_index = {}
+        conns = []
+        for src, dst, dep, run, trip in timetable.iter_connections():
+            s, d = self._stop(src), self._stop(dst)
+            if s != d:
+                conns.append((dep, dep + run, s, d, trip))
+        conns.sort(key=lambda c: (c[0], c[1]))
+        self._dep = array("H", (c[0] for c in conns))
+        self._arr = array("I", (c[1] for c in conns))
+        self._from = array("I", (c[2] for c in conns))
+        self._to = array("I", (c[3] for c in conns))
+        self._trip = [c[4] for c in conns]
+        self._bus = [str(c[4].get("bus_id")) for c in conns]
+
+        by_stop = [[] for _ in self._stop_index]
+        for i, s in enumerate(self._from):
+            by_stop[s].append(i)  # already in departure order
+        self._stop_conns = [array("I", ids) for ids in by_stop]
+        self._stop_deps = [array("H", (self._dep[i] for i in ids)) for ids in by_stop]
+
+    def _stop(self, name):
+        i = self._stop_index.get(name)
+        if i is None:
+            i = self._stop_index[name] = len(self._stop_index)
+        return i
+
+    def _ready(self, stop, arrival, via, conn, origin):
+        """Earliest minute connection conn may leave stop, given we got there at arrival via connection via."""
+        if stop == origin or (via is not None and self._bus[via] == self._bus[conn]):
+            return arrival
+        return arrival + self.min_transfer
+
+    def _departures(self, s, after, horizon):
+        """(connection, departure, arrival) leaving stop s at or after `after`, in order, with day offsets added."""
+        deps, ids = self._stop_deps[s], self._stop_conns[s]
+        off = (after // DAY) * DAY
+        start = bisect_left(deps, after - off)
+        while off < horizon:
+            for j in range(start, len(deps)):
+                c = ids[j]
+                yield c, self._dep[c] + off, self._arr[c] + off
+            off += DAY
+            start = 0
+
+    def _journey(self, parent, target):
+        legs, c = [], parent.get(target)
+        while c is not None:
+            conn, off = c[0]
+            legs.append((self._trip[conn], self._dep[conn] + off, self._arr[conn] + off))
+            c = c[1]
+        return Journey(legs[::-1]) if legs else None
+
+    # ---------- Queries ----------
+    def earliest_arrival(self, src, dst, depart_after=0):
+        """
+        Journey reaching dst soonest, leaving src at or after depart_after.
+        Label-setting search in arrival order (time-dependent Dijkstra): each
+        settled stop bisects its departure array and relaxes only the
+        connections leaving after it is reached, so the work is bounded by
+        the part of the network reachable before the best arrival rather
+        than by the whole day's connections.
+        """
+        o, t = self._stop_index.get(src.strip().lower()), self._stop_index.get(dst.strip().lower())
+        if o is None or t is None or o == t:
+            return None
+        horizon = (depart_after // DAY + self.days) * DAY
+        arrival = {o: depart_after}
+        parent = {o: None}  # stop -> ((connection id, day offset), parent link)
+        heap, done = [(depart_after, o)], set()
+        while heap:
+            a, s = heapq.heappop(heap)
+            if s in done:
+                continue
+            if s == t:
+                break
+            done.add(s)
+            via = parent[s][0][0] if parent[s] else None
+            for c, dep, arr in self._departures(s, a, horizon):
+                if dep >= arrival.get(t, 1 << 30):
+                    break  # leaves after the best arrival so far; so do all later ones
+                d = self._to[c]
+                if d in done or arr >= arrival.get(d, 1 << 30):
+                    continue
+                if dep >= self._ready(s, a, via, c, o):
+                    arrival[d], parent[d] = arr, ((c, dep - self._dep[c]), parent[s])
+                    heapq.heappush(heap, (arr, d))
+        return self._journey(parent, t)
+
+    def fewest_transfers(self, src, dst, depart_after=0, max_legs=MAX_LEGS):
+        """Round k finds every stop reachable with k legs; the first round reaching dst wins (earliest arrival within it)."""
+        o, t = self._stop_index.get(src.strip().lower()), self._stop_index.get(dst.strip().lower())
+        if o is None or t is None or o == t:
+            return None
+        horizon = (depart_after // DAY + self.days) * DAY
+        best_any = {o: depart_after}
+        frontier = {o: (depart_after, None)}  # stop -> (arrival, parent link)
+        for _ in range(max_legs):
+            nxt = {}
+            for s, (arr_s, link) in frontier.items():
+                via = link[0][0] if link else None
+                # staying on the same bus can leave at arr_s; others wait min_transfer
+                for c, dep, a in self._departures(s, arr_s, horizon):
+                    if dep >= best_any.get(t, 1 << 30):
+                        break
+                    if dep < self._ready(s, arr_s, via, c, o):
+                        continue
+                    d = self._to[c]
+                    if a < best_any.get(d, 1 << 30) and a < best_any.get(t, 1 << 30):
+                        best_any[d] = a
+                        nxt[d] = (a, ((c, dep - self._dep[c]), link))
+            if t in nxt:
+                return self._journey({t: nxt[t][1]}, t)
+            if not nxt:
+                return None
+            frontier = nxt
+        return None
+
+    def plan(self, src, dst, depart_after=0):
+        """Distinct options: earliest arrival first, then the fewest-transfer journey if different."""
+        options = []
+        for j in (self.earliest_arrival(src, dst, depart_after), self.fewest_transfers(src, dst, depart_after)):
+            if j and all(j.key() != k.key() for k in options):
+                options.append(j)
+        return options
+
+
+_PLANNERS = weakref.WeakKeyDictionary()
+_PLANNERS_LOCK = threading.Lock()
+
+
+def planner_for(timetable):
+    """One JourneyPlanner per timetable object, built on first use (a reload brings a new one)."""
+    with _PLANNERS_LOCK:
+        p = _PLANNERS.get(timetable)
+        if p is None:
+            p = _PLANNERS[timetable] = JourneyPlanner(timetable)
+        return p
@@ -0,0 +1,212 @@
+# chetna_positions.py
+# Where is each bus now? Positions interpolated from the timetable, route stops and live delays
+#
+# Every trip runs along a route geometry: its ordered stops and the share of
+# the run time spent on each segment. Geometries come from a routes file
+#
+#   {"routes": [{"stops": ["Panipat", "Samalkha", "Sonipat", "Delhi"], "minutes": [20, 35, 40]}]}
+#
+# (each route also serves the reverse direction); trips on routes not listed
+# go straight from source to destination. On each tick (default 15 s) the
+# whole fleet is advanced in one pass: minutes since departure, minus the
+# bus's current delay, give the fraction of the trip done; one sorted search
+# over all geometries' segment starts then gives every trip's segment. NumPy
+# does this in a few vector operations when installed; otherwise a plain loop
+# over the same arrays. locate(bus) reads the cached frame.
+
+import json
+import threading
+import time
+import weakref
+from array import array
+from bisect import bisect_right
+from datetime import datetime
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+from chetna_loader import format_time_minutes
+
+DAY = 24 * 60
+NEAR_SHARE = 0.2     # within the first/last 20% of a segment counts as "near" that stop
+
+
+def load_routes(path):
+    """{(source, destination) lowercased: (stops, minutes per segment)}; {} if the file is missing or bad."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    routes = {}
+    for r in data.get("routes", []) if isinstance(data, dict) else []:
+        stops, minutes = r.get("stops") or [], r.get("minutes") or []
+        if len(stops) < 2 or len(minutes) != len(stops) - 1 or min(minutes) <= 0:
+            continue
+        routes[(stops[0].lower(), stops[-1].lower())] = (list(stops), list(minutes))
+        routes.setdefault((stops[-1].lower(), stops[0].lower()), (stops[::-1], minutes[::-1]))
+    return routes
+
+
+def _now_minutes():
+    now = datetime.now()
+    return now.hour * 60 + now.minute + now.second / 60
+
+
+class _Frame:
+    """Fleet state at one tick: per trip, whether it is running, its segment and progress within it."""
+    __slots__ = ("tick", "now", "delay", "active", "segment", "local", "progress")
+
+    def __init__(self, tick, now, delay, active, segment, local, progress):
+        self.tick, self.now, self.delay = tick, now, delay
+        self.active, self.segment, self.local, self.progress = active, segment, local, progress
+
+
+class PositionEngine:
+    def __init__(self, timetable, routes=None, delays=None, tick=15.0, use_numpy=None, clock=_now_minutes):
+        """
+        routes: from load_routes(); delays: () -> {bus_id: minutes late} (current delays only);
+        clock:  () -> minutes after midnight, float.
+        """
+        self.tick = tick
+        self.delays = delays
+        self.clock = clock
+        self.use_numpy = (np is not None) if use_numpy is None else (use_numpy and np is not None)
+        routes = routes or {}
+        geom_index = {}
+        self._stop_names = []       # per segment: (from stop, to stop)
+        seg_starts, seg_lens = [], []
+        dep, run, geom_of, self._trips, self._by_bus = [], [], [], [], {}
+        for src, dst, d, r, trip in timetable.iter_connections():
+            key = (src.lower(), dst.lower())
+            g = geom_index.get(key)
+            if g is None:
+                stops, minutes = routes.get(key) or ([trip["source"], trip["destination"]], [1])
+                g = geom_index[key] = len(geom_index)
+                total, acc = float(sum(minutes)), 0.0
+                for a, b, m in zip(stops, stops[1:], minutes):
+                    seg_starts.append(2 * g + acc / total)   # geometry g owns keys [2g, 2g + 1]
+                    seg_lens.append(m / total)
+                    self._stop_names.append((a, b))
+                    acc += m
+            self._by_bus.setdefault(str(trip.get("bus_id")), []).append(len(dep))
+            self._trips.append(trip)
+            dep.append(d)
+            run.append(max(r, 1))
+            geom_of.append(g)
+        self._dep, self._run = array("f", dep), array("f", run)
+        self._geom2 = array("d", (2 * g for g in geom_of))
+        self._seg_starts, self._seg_lens = array("d", seg_starts), array("d", seg_lens)
+        if self.use_numpy:
+            self._np = {k: np.asarray(v, dtype=np.float64) for k, v in
+                        (("dep", dep), ("run", self._run), ("geom2", self._geom2),
+                         ("starts", seg_starts), ("lens", seg_lens))}
+        self._frame = None
+        self._lock = threading.Lock()
+        self.frames_computed = 0
+
+    def __len__(self):
+        return len(self._trips)
+
+    # ---------- Fleet pass ----------
+    def _delay_vector(self):
+        delays = self.delays() if self.delays else {}
+        if not delays:
+            return None
+        vec = np.zeros(len(self._trips)) if self.use_numpy else [0.0] * len(self._trips)
+        for bus, d in delays.items():
+            for i in self._by_bus.get(str(bus), ()):
+                vec[i] = d
+        return vec
+
+    def compute(self, now, delay=None):
+        """Advance every trip to `now` (minutes after midnight) in one pass."""
+        if self.use_numpy:
+            a = self._np
+            elapsed = (now - a["dep"] - (0 if delay is None else delay)) % DAY
+            active = elapsed <= a["run"]
+            progress = np.minimum(elapsed / a["run"], 1.0)
+            seg = np.searchsorted(a["starts"], a["geom2"] + progress, side="right") - 1
+            local = (a["geom2"] + progress - a["starts"][seg]) / a["lens"][seg]
+            return active, seg, np.clip(local, 0.0, 1.0), progress
+        starts, lens = self._seg_starts, self._seg_lens
+        active, seg, local, progress = [], [], [], []
+        for i, (d, r, g2) in enumerate(zip(self._dep, self._run, self._geom2)):
+            e = (now - d - (delay[i] if delay is not None else 0)) % DAY
+            p = min(e / r, 1.0)
+            s = bisect_right(starts, g2 + p) - 1
+            active.append(e <= r)
+            seg.append(s)
+            local.append(min(max((g2 + p - starts[s]) / lens[s], 0.0), 1.0))
+            progress.append(p)
+        return active, seg, local, progress
+
+    def frame(self):
+        """The fleet state for the current tick, computed at most once per tick."""
+        tick = int(time.time() // self.tick) if self.tick else None
+        f = self._frame
+        if f is not None and tick is not None and f.tick == tick:
+            return f
+        with self._lock:
+            f = self._frame
+            if f is None or tick is None or f.tick != tick:
+                now, delay = self.clock(), self._delay_vector()
+                f = self._frame = _Frame(tick, now, delay, *self.compute(now, delay))
+                self.frames_computed += 1
+            return f
+
+    # ---------- Queries ----------
+    def _running(self, f, i):
+        a, b = self._stop_names[f.segment[i]]
+        local = float(f.local[i])
+        trip = self._trips[i]
+        near = a if local < NEAR_SHARE else b if local > 1 - NEAR_SHARE else None
+        return {"state": "running", "trip": trip, "near": near, "between": (a, b),
+                "source": trip["source"], "destination": trip["destination"],
+                "progress": round(float(f.progress[i]), 3)}
+
+    def locate(self, bus_id):
+        """
+        {"state": "running", near | between, destination, progress, trip}
+        {"state": "waiting", source, departs, delay} next trip today (departs includes the delay)
+        {"state": "done", destination}             no more trips today
+        None if the bus is not in the timetable.
+        """
+        trips = self._by_bus.get(str(bus_id).strip())
+        if not trips:
+            return None
+        f = self.frame()
+        running = [i for i in trips if f.active[i]]
+        if running:
+            # a bus on two overlapping trips: report the one that left last
+            return self._running(f, min(running, key=lambda i: (f.now - self._dep[i]) % DAY))
+        delay = (lambda i: float(f.delay[i])) if f.delay is not None else (lambda i: 0.0)
+        later = [i for i in trips if self._dep[i] + delay(i) > f.now]
+        if later:
+            i = min(later, key=lambda i: self._dep[i] + delay(i))
+            return {"state": "waiting", "trip": self._trips[i], "source": self._trips[i]["source"],
+                    "departs": format_time_minutes(int(self._dep[i] + delay(i)) % DAY),
+                    "delay": int(delay(i))}
+        i = max(trips, key=lambda i: self._dep[i] + self._run[i])
+        return {"state": "done", "trip": self._trips[i], "destination": self._trips[i]["destination"]}
+
+    def fleet(self):
+        """Every running trip: [(bus_id, position dict)], for fleet-wide views."""
+        f = self.frame()
+        idx = np.flatnonzero(f.active) if self.use_numpy else [i for i, a in enumerate(f.active) if a]
+        return [(str(self._trips[i].get("bus_id")), self._running(f, i)) for i in idx]
+
+
+_ENGINES = weakref.WeakKeyDictionary()
+_ENGINES_LOCK = threading.Lock()
+
+
+def positions_for(timetable, routes=None, delays=None, tick=15.0):
+    """One PositionEngine per timetable object, built on first use (a reload brings a new one)."""
+    with _ENGINES_LOCK:
+        e = _ENGINES.get(timetable)
+        if e is None:
+            e = _ENGINES[timetable] = PositionEngine(timetable, routes, delays, tick)
+        return e
@@ -0,0 +1,231 @@
+# chetna_reload.py
+# Hot reload of the timetable: background rebuild + atomic swap, plus delta files
+#
+# Delta file: JSON Lines next to the data file, one op per line, e.g.
+#   {"op": "add", "bus_id": "203", "source": "Delhi", "destination": "Karnal", "time": "6:00 PM", "fare": "₹50"}
+#   {"op": "cancel", "bus_id": "202", "source": "Delhi", "destination": "Karnal"}
+#   {"op": "retime", "bus_id": "105", "time": "9:15 AM", "new_time": "9:45 AM"}
+# Lines appended to it are applied incrementally; truncating or replacing it
+# (or changing the data file) triggers a full reload of data + delta.
+#
+# A data file is reloaded only once its size and mtime are the same on two
+# polls in a row, so a copy still in progress is not picked up. A rebuilt
+# table is not published (the old one keeps serving) if too many of its rows
+# were rejected or it has far fewer trips than the live one: the usual signs
+# of a truncated or half-written file.
+
+import json
+import os
+import threading
+import time
+
+from chetna_loader import LoadReport
+
+
+def read_delta(path, offset=0):
+    """
+    Read complete delta lines from byte offset onwards.
+    Returns (ops, new_offset); a trailing partial line is left for next time.
+    """
+    ops = []
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return ops, 0
+    end = data.rfind(b"\n") + 1
+    for line in data[:end].splitlines():
+        if not line.strip():
+            continue
+        try:
+            ops.append(json.loads(line.decode("utf-8")))
+        except ValueError as e:
+            ops.append(ValueError(f"invalid JSON: {e}"))  # reported by apply_delta_ops
+    return ops, offset + end
+
+
+def _file_sig(path):
+    try:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+
+class TimetableReloader:
+    """
+    Owns the live timetable. Readers call .current once per request and use
+    that object throughout, so a swap never shows them a half-built dataset:
+    new timetables are built off to the side and published with a single
+    attribute assignment.
+    """
+
+    def __init__(self, loader, delta_path=None, on_reload=None, prepare=None,
+                 max_reject_ratio=0.05, min_keep_ratio=0.5):
+        self.loader = loader
+        self.delta_path = delta_path
+        self.on_reload = on_reload          # callback(stats dict), e.g. for logging
+        self.prepare = prepare              # callback(timetable) run before publishing, e.g. to warm derived indexes
+        self.max_reject_ratio = max_reject_ratio   # refuse a reload rejecting more than this share of rows
+        self.min_keep_ratio = min_keep_ratio       # ... or keeping fewer trips than this share of the live table
+        self.last_stats = None
+        self._lock = threading.Lock()       # one build at a time
+        self._delta_offset = 0
+        self._data_sig = _file_sig(loader.file_path) if loader.file_path else None
+        self._seen_sig = self._data_sig     # signature at the last poll
+        self._watcher = None
+        self._stop = threading.Event()
+        tt, self.last_stats, self._delta_offset = self._full_build()
+        if prepare:
+            prepare(tt)
+        self._current = tt
+
+    @property
+    def current(self):
+        return self._current
+
+    # ---------- Builds ----------
+    def _full_build(self):
+        """(timetable, stats, delta offset read up to); nothing is stored until the caller publishes."""
+        t0 = time.perf_counter()
+        tt = self.loader.load()
+        report = self.loader.last_report
+        delta_report = LoadReport()
+        offset = 0
+        if self.delta_path:
+            ops, offset = read_delta(self.delta_path, 0)
+            if ops:
+                tt = tt.apply_delta(ops, delta_report)
+        stats = {
+            "kind": "full",
+            "seconds": time.perf_counter() - t0,
+            "rows": len(tt),
+            "rows_rejected": report.rows_bad if report else 0,
+            "delta_applied": delta_report.rows_ok,
+            "delta_rejected": delta_report.rows_bad,
+            "errors": (report.errors[:5] if report else []) + delta_report.errors[:5],
+        }
+        return tt, stats, offset
+
+    def _publish(self, tt, stats):
+        if self.prepare:
+            self.prepare(tt)
+        self._current = tt
+        self.last_stats = stats
+        if self.on_reload:
+            self.on_reload(stats)
+
+    def _refusal(self, tt, stats):
+        """Why a rebuilt table must not replace the live one, or None."""
+        report = self.loader.last_report
+        rejected = stats["rows_rejected"]
+        read = (report.rows_ok if report else len(tt)) + rejected
+        if read and rejected > self.max_reject_ratio * read:
+            return f"{rejected} of {read} rows rejected"
+        live = len(self._current)
+        if live and len(tt) < self.min_keep_ratio * live:
+            return f"only {len(tt)} trips, {live} live"
+        return None
+
+    def reload_now(self, force=False):
+        """
+        Full rebuild of data file + delta, then swap. Returns the stats dict;
+        kind "refused" (old table kept) if the new one fails the sanity checks
+        and force is not set.
+        """
+        with self._lock:
+            sig = _file_sig(self.loader.file_path)
+            tt, stats, offset = self._full_build()
+            self._data_sig = sig    # a refused file is retried once it changes again
+            reason = None if force else self._refusal(tt, stats)
+            if reason:
+                stats = {**stats, "kind": "refused", "reason": reason, "rows": len(self._current)}
+                self.last_stats = stats
+                if self.on_reload:
+                    self.on_reload(stats)
+                return stats     # the live table keeps its own delta offset
+            self._delta_offset = offset
+            self._publish(tt, stats)
+            return stats
+
+    def apply_new_deltas(self):
+        """Apply delta lines appended since the last build. Returns stats or None."""
+        if not self.delta_path:
+            return None
+        with self._lock:
+            t0 = time.perf_counter()
+            ops, offset = read_delta(self.delta_path, self._delta_offset)
+            self._delta_offset = offset
+            if not ops:
+                return None
+            report = LoadReport()
+            tt = self._current.apply_delta(ops, report)
+            stats = {
+                "kind": "delta",
+                "seconds": time.perf_counter() - t0,
+                "rows": len(tt),
+                "delta_applied": report.rows_ok,
+                "delta_rejected": report.rows_bad,
+                "errors": report.errors[:5],
+            }
+            self._publish(tt, stats)
+            return stats
+
+    def reload_async(self, force=False):
+        """Start a full reload in a background thread and return the thread."""
+        t = threading.Thread(target=self.reload_now, args=(force,), name="chetna-reload", daemon=True)
+        t.start()
+        return t
+
+    # ---------- Watching ----------
+    def check(self):
+        """
+        One poll: full reload if the data file changed (and has stayed the
+        same since the previous poll) or the delta shrank, else apply new
+        delta lines.
+        """
+        if not self.loader.file_path:
+            return None
+        sig = _file_sig(self.loader.file_path)
+        seen, self._seen_sig = self._seen_sig, sig
+        if sig != self._data_sig:
+            if sig is None or sig != seen:
+                return None     # missing or still being written; look again next poll
+            return self.reload_now()
+        delta_size = (_file_sig(self.delta_path) or (0, 0))[1] if self.delta_path else 0
+        if delta_size < self._delta_offset:
+            return self.reload_now()
+        if delta_size > self._delta_offset:
+            return self.apply_new_deltas()
+        return None
+
+    def start_watching(self, interval=5.0):
+        if self._watcher is not None:
+            return
+
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.check()
+                except Exception:
+                    pass  # keep serving the last good timetable
+
+        self._watcher = threading.Thread(target=loop, name="chetna-reload-watch", daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+def format_stats(stats):
+    if not stats:
+        return "No reload yet."
+    if stats["kind"] == "refused":
+        return f"reload refused ({stats['reason']}), still serving {stats['rows']} trips"
+    parts = [f"{stats['kind']} reload: {stats['rows']} trips in {stats['seconds'] * 1000:.0f} ms"]
+    if stats.get("rows_rejected"):
+        parts.append(f"{stats['rows_rejected']} rows rejected")
+    if stats.get("delta_applied") or stats.get("delta_rejected"):
+        parts.append(f"delta {stats['delta_applied']} applied / {stats['delta_rejected']} rejected")
+    return ", ".join(parts)
@@ -0,0 +1,194 @@
+# chetna_replay.py
+# Replay chat history through the intent detector (and optionally the whole bot)
+#
+#   python chetna_replay.py                                   # the live chat log
+#   python chetna_replay.py --out run2.jsonl --against run1.jsonl
+#   python chetna_replay.py --responses --workers 4           # handle_intent too (dry run)
+#
+# Every "USER:" line of the log is one utterance. Results are written as JSON
+# Lines ({"n", "text", "intent", "lang", ...}) in log order, so two runs can be
+# compared line by line after a rule change.
+
+import argparse
+import gzip
+import json
+import os
+import re
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from chetnautils import LOG, chunked
+
+USER_LINE = re.compile(r"^\[[^\]]*\] USER: (.*)$")
+
+
+def iter_user_messages(path):
+    """
+    Stream the user utterances of a chat log, oldest first. Reads text and
+    JSON-lines logs, plain or gzipped (rotated segments).
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if line.startswith("{"):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("kind") == "chat" and record.get("user") is not None:
+                    yield record["user"]
+                continue
+            m = USER_LINE.match(line.rstrip("\n"))
+            if m:
+                yield m.group(1)
+
+
+# ---------- Workers (top level so they pickle into pool processes) ----------
+def _worker_init():
+    # A replay must not start timetable watchers in every worker
+    os.environ["CHETNA_WATCH_SECONDS"] = "0"
+
+
+def _intent_chunk(texts):
+    from chetnaintent import get_intents
+    return [dict(d) for d in get_intents(texts, len(texts))]
+
+
+def _response_chunk(texts):
+    import botchetna
+    out = _intent_chunk(texts)
+    for text, d in zip(texts, out):
+        # reuse the labels: get_intent runs once per utterance
+        d["reply"] = botchetna.handle_intent(text, dry_run=True, intent_data=dict(d))[0]
+    return out
+
+
+def run_ordered(fn, chunks, workers=None, max_pending=None):
+    """
+    Map fn over chunks on a process pool, yielding results in input order.
+    At most max_pending chunks are in flight, so arbitrarily long inputs are
+    streamed rather than submitted all at once. workers=1 runs inline.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _worker_init()
+        for chunk in chunks:
+            yield fn(chunk)
+        return
+    max_pending = max_pending or workers * 4
+    with ProcessPoolExecutor(max_workers=workers, initializer=_worker_init) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(fn, chunk))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def zip_chunks(chunks, fn, workers):
+    """Pair each input chunk with its results; chunks are kept only while in flight."""
+    sent = deque()
+
+    def feed():
+        for chunk in chunks:
+            sent.append(chunk)
+            yield chunk
+
+    for results in run_ordered(fn, feed(), workers):
+        yield sent.popleft(), results
+
+
+def replay(log_path, out_path=None, workers=None, chunk_size=500, responses=False):
+    """Replay log_path, writing labels to out_path (if given). Returns a stats dict."""
+    fn = _response_chunk if responses else _intent_chunk
+    t0 = time.perf_counter()
+    n, counts = 0, Counter()
+    out = open(out_path, "w", encoding="utf-8") if out_path else None
+    try:
+        chunks = chunked(iter_user_messages(log_path), chunk_size)
+        for texts, results in zip_chunks(chunks, fn, workers):
+            for text, d in zip(texts, results):
+                d.pop("complaint_text", None)  # same as text
+                counts[d["intent"]] += 1
+                if out:
+                    out.write(json.dumps({"n": n, "text": text, **d}, ensure_ascii=False) + "\n")
+                n += 1
+    finally:
+        if out:
+            out.close()
+    elapsed = time.perf_counter() - t0
+    return {
+        "utterances": n,
+        "seconds": elapsed,
+        "per_second": n / elapsed if elapsed else 0.0,
+        "intents": dict(counts.most_common()),
+    }
+
+
+# ---------- Comparing runs ----------
+def load_labels(path):
+    """{n: (text, intent)} from a previous replay output."""
+    labels = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                r = json.loads(line)
+                labels[r["n"]] = (r["text"], r["intent"])
+    return labels
+
+
+def diff_labels(previous_path, current_path, max_examples=10):
+    """Intent changes between two replay outputs of the same log."""
+    old = load_labels(previous_path)
+    transitions, examples, compared, unaligned = Counter(), [], 0, 0
+    for n, (text, intent) in load_labels(current_path).items():
+        if n not in old:
+            continue
+        old_text, old_intent = old[n]
+        if old_text != text:
+            unaligned += 1
+            continue
+        compared += 1
+        if old_intent != intent:
+            transitions[f"{old_intent} -> {intent}"] += 1
+            if len(examples) < max_examples:
+                examples.append({"n": n, "text": text, "was": old_intent, "now": intent})
+    return {
+        "compared": compared,
+        "changed": sum(transitions.values()),
+        "unaligned": unaligned,
+        "transitions": dict(transitions.most_common()),
+        "examples": examples,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Replay Chetna chat history through get_intent")
+    ap.add_argument("--log", default=LOG.path, help="chat log, .jsonl or rotated .gz segments too")
+    ap.add_argument("--out", default="logs/replay_intents.jsonl")
+    ap.add_argument("--against", help="previous --out file to diff intent labels with")
+    ap.add_argument("--workers", type=int, default=None, help="processes (default: CPU count, 1 = inline)")
+    ap.add_argument("--chunk-size", type=int, default=500)
+    ap.add_argument("--responses", action="store_true", help="also run handle_intent (no complaints are saved)")
+    args = ap.parse_args(argv)
+
+    if args.against and os.path.abspath(args.against) == os.path.abspath(args.out):
+        ap.error("--against must differ from --out")
+    r = replay(args.log, args.out, args.workers, args.chunk_size, args.responses)
+    print(f"{r['utterances']} utterances in {r['seconds']:.2f} s: {r['per_second']:,.0f} utt/s")
+    for intent, c in r["intents"].items():
+        print(f"  {intent:>16} {c}")
+    if args.against:
+        d = diff_labels(args.against, args.out)
+        print(f"{d['changed']} of {d['compared']} intent labels changed"
+              + (f" ({d['unaligned']} lines did not line up)" if d["unaligned"] else ""))
+        for t, c in d["transitions"].items():
+            print(f"  {t}: {c}")
+        for e in d["examples"]:
+            print(f"  #{e['n']} {e['text']!r}: {e['was']} -> {e['now']}")
+
+
+if __name__ == "__main__":
+    main()
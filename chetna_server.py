@@ -0,0 +1,292 @@
+# chetna_server.py
+# Multi-session HTTP/JSON server around handle_intent, plus a load generator
+#
+#   python chetna_server.py serve --port 8080
+#   curl -s localhost:8080/chat -d '{"session": "kiosk-1", "text": "delhi se karnal agla bus"}'
+#   python chetna_server.py load --url http://127.0.0.1:8080 --sessions 50 --requests 5000
+#
+# One process, one event loop, one shared timetable (botchetna.TIMETABLE).
+# Fast intents are answered on the loop; work that blocks (complaint writes,
+# the local LLM, the fleet position pass behind track_bus) goes to a thread pool. Each session may have only a few
+# requests queued at once; beyond that it gets 429 instead of piling up.
+#
+# Endpoints:
+#   POST /chat   {"session": str, "text": str, "dry_run"?: bool}
+#                -> {"reply", "speak", "intent", "lang", "latency_ms"}
+#   GET  /stats  requests, errors, rejected, rps, p50/p99 latency, sessions
+#   GET  /metrics per-stage latency histograms, Prometheus text format
+#   GET  /health
+
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+MAX_BODY = 64 * 1024
+BLOCKING_INTENTS = ("lodge_complaint", "track_bus")
+
+
+def _percentile(samples, p):
+    if not samples:
+        return None
+    s = sorted(samples)
+    return s[min(len(s) - 1, int(p / 100 * len(s)))]
+
+
+class _Session:
+    __slots__ = ("pending", "last_seen", "lock")
+
+    def __init__(self):
+        self.pending = 0
+        self.last_seen = time.monotonic()
+        self.lock = asyncio.Lock()   # one turn at a time per session, in arrival order
+
+
+class ChetnaServer:
+    def __init__(self, bot, max_pending_per_session=4, workers=4, session_idle=1800.0, window=10_000):
+        self.bot = bot                 # botchetna module (get_intent, handle_intent, LOCAL_LLM_READY, log_chat)
+        self.max_pending = max_pending_per_session
+        self.session_idle = session_idle
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chetna-blocking")
+        self.sessions = {}
+        self.requests = self.errors = self.rejected = 0
+        self.started = time.monotonic()
+        self._latencies = deque(maxlen=window)
+        self._recent = deque(maxlen=window)     # completion times, for current rps
+
+    # ---------- Chat ----------
+    def _blocking(self, intent_data):
+        intent = intent_data.get("intent")
+        return intent in BLOCKING_INTENTS or (intent == "unknown" and self.bot.LOCAL_LLM_READY)
+
+    async def chat(self, session_id, text, dry_run=False):
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = self.sessions[session_id] = _Session()
+        if session.pending >= self.max_pending:
+            self.rejected += 1
+            return 429, {"error": "too many requests for this session"}
+        session.pending += 1
+        session.last_seen = time.monotonic()
+        try:
+            async with session.lock:
+                with self.bot.METRICS.turn() as turn:
+                    t0 = time.perf_counter()
+                    intent_data = self.bot.get_intent(text)
+                    turn.label(intent_data)
+                    if self._blocking(intent_data):
+                        # run in this task's context so the worker's timings join the turn
+                        ctx = contextvars.copy_context()
+                        reply, speak = await asyncio.get_running_loop().run_in_executor(
+                            self.executor, ctx.run,
+                            lambda: self.bot.handle_intent(text, dry_run=dry_run, intent_data=intent_data))
+                    else:
+                        reply, speak = self.bot.handle_intent(text, dry_run=dry_run, intent_data=intent_data)
+                    latency = time.perf_counter() - t0
+        finally:
+            session.pending -= 1
+        self._latencies.append(latency)
+        self._recent.append(time.monotonic())
+        if not dry_run:
+            self.bot.log_chat(text, reply, session=session_id, lang=intent_data.get("lang"),
+                              intent=intent_data.get("intent"), latency_ms=round(latency * 1000, 2))
+        return 200, {
+            "reply": reply,
+            "speak": speak,
+            "intent": intent_data.get("intent"),
+            "lang": intent_data.get("lang"),
+            "latency_ms": round(latency * 1000, 3),
+        }
+
+    def stats(self):
+        now = time.monotonic()
+        lat = list(self._latencies)
+        last10 = sum(1 for t in self._recent if now - t <= 10)
+        ms = lambda v: None if v is None else round(v * 1000, 3)  # noqa: E731
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "sessions": len(self.sessions),
+            "uptime_s": round(now - self.started, 1),
+            "rps_10s": round(last10 / min(10.0, max(now - self.started, 1e-9)), 1),
+            "p50_ms": ms(_percentile(lat, 50)),
+            "p99_ms": ms(_percentile(lat, 99)),
+        }
+
+    def expire_sessions(self):
+        cutoff = time.monotonic() - self.session_idle
+        for sid in [s for s, v in self.sessions.items() if v.last_seen < cutoff and not v.pending]:
+            del self.sessions[sid]
+
+    # ---------- HTTP ----------
+    async def _route(self, method, path, body):
+        if method == "GET" and path == "/health":
+            return 200, {"ok": True}
+        if method == "GET" and path == "/stats":
+            return 200, self.stats()
+        if method == "GET" and path == "/metrics":
+            return 200, self.bot.METRICS.to_prometheus()
+        if method == "POST" and path == "/chat":
+            try:
+                req = json.loads(body or b"{}")
+                text = str(req["text"]).strip()
+            except (ValueError, KeyError, TypeError):
+                return 400, {"error": 'expected JSON {"session": ..., "text": ...}'}
+            if not text:
+                return 400, {"error": "empty text"}
+            return await self.chat(str(req.get("session") or "default"), text, bool(req.get("dry_run")))
+        return 404, {"error": "not found"}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        k, v = line.split(":", 1)
+                        headers[k.strip().lower()] = v.strip()
+                raw_length = headers.get("content-length") or "0"
+                # ASCII digits only: no sign or spaces, and no "²" (isdigit() alone accepts it)
+                length = int(raw_length) if raw_length.isascii() and raw_length.isdigit() else -1
+                if length < 0:
+                    status, payload = 400, {"error": "invalid Content-Length"}
+                    body = None
+                elif length > MAX_BODY:
+                    status, payload = 413, {"error": "body too large"}
+                    body = None
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                self.requests += 1
+                if body is not None:
+                    try:
+                        status, payload = await self._route(method.upper(), urlsplit(target).path, body)
+                    except Exception as e:
+                        self.errors += 1
+                        status, payload = 500, {"error": repr(e)}
+                # a rejected body is left unread, so that connection cannot carry another request
+                keep_alive = (body is not None and version == "HTTP/1.1"
+                              and headers.get("connection", "").lower() != "close")
+                if isinstance(payload, str):
+                    data, ctype = payload.encode("utf-8"), "text/plain; version=0.0.4"
+                else:
+                    data, ctype = json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json"
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS.get(status, 'OK')}\r\n"
+                    f"Content-Type: {ctype}; charset=utf-8\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data)
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8080):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"Chetna server on http://{host}:{port} (POST /chat, GET /stats)")
+
+        async def janitor():
+            while True:
+                await asyncio.sleep(60)
+                self.expire_sessions()
+
+        asyncio.get_running_loop().create_task(janitor())
+        async with server:
+            await server.serve_forever()
+
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+            429: "Too Many Requests", 500: "Internal Server Error"}
+
+
+# ---------- Load generator ----------
+async def _client(host, port, session, texts, latencies, counts, dry_run):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for text in texts:
+            body = json.dumps({"session": session, "text": text, "dry_run": dry_run}).encode("utf-8")
+            t0 = time.perf_counter()
+            writer.write(f"POST /chat HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                         f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+            await writer.drain()
+            head = await reader.readuntil(b"\r\n\r\n")
+            status = int(head.split(b" ", 2)[1])
+            length = next(int(line.split(b":", 1)[1]) for line in head.split(b"\r\n")
+                          if line.lower().startswith(b"content-length:"))
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - t0)
+            counts[status] = counts.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run_load(url, sessions=50, requests=5000, dry_run=True, seed=3):
+    """Closed-loop load: `sessions` keep-alive clients sending `requests` utterances in total."""
+    from chetna_bench import utterance_corpus
+    u = urlsplit(url)
+    corpus = utterance_corpus(requests, seed=seed)
+    per = [corpus[i::sessions] for i in range(sessions)]
+    latencies, counts = [], {}
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_client(u.hostname, u.port or 80, f"load-{i}", texts, latencies, counts, dry_run)
+                           for i, texts in enumerate(per) if texts))
+    elapsed = time.perf_counter() - t0
+    return {
+        "requests": len(latencies),
+        "seconds": elapsed,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": _percentile(latencies, 50) * 1000 if latencies else None,
+        "p99_ms": _percentile(latencies, 99) * 1000 if latencies else None,
+        "status": counts,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Chetna HTTP server and load generator")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sv = sub.add_parser("serve")
+    sv.add_argument("--host", default=os.getenv("CHETNA_HOST", "127.0.0.1"))
+    sv.add_argument("--port", type=int, default=int(os.getenv("CHETNA_PORT", "8080")))
+    sv.add_argument("--workers", type=int, default=4, help="threads for blocking work (complaints, LLM)")
+    sv.add_argument("--max-pending", type=int, default=4, help="queued requests allowed per session")
+    ld = sub.add_parser("load")
+    ld.add_argument("--url", default="http://127.0.0.1:8080")
+    ld.add_argument("--sessions", type=int, default=50)
+    ld.add_argument("--requests", type=int, default=5000)
+    ld.add_argument("--record", action="store_true", help="really file complaints and log chats")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "serve":
+        import botchetna
+        server = ChetnaServer(botchetna, args.max_pending, args.workers)
+        try:
+            asyncio.run(server.serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+    else:
+        r = asyncio.run(run_load(args.url, args.sessions, args.requests, dry_run=not args.record))
+        print(f"{r['requests']} requests in {r['seconds']:.2f} s: {r['rps']:,.0f} req/s, "
+              f"p50 {r['p50_ms']:.2f} ms, p99 {r['p99_ms']:.2f} ms, status {r['status']}")
+        return 0 if set(r["status"]) <= {200} else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
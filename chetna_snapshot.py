@@ -0,0 +1,138 @@
+# chetna_snapshot.py
+# Versioned binary snapshot of a ColumnarTimetable, memory-mapped on load
+#
+# Layout:
+#   8 bytes  magic b"CHETSNAP"
+#   4 bytes  format version (little-endian u32)
+#   4 bytes  header length (little-endian u32)
+#   header   UTF-8 JSON: source key, cities, bus_ids, column layout; then a
+#            16-digit crc32 over the header JSON and the payload
+#   padding  to an 8-byte boundary
+#   payload  raw array columns, each 8-byte aligned, in native byte order
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+
+from chetna_loader import ColumnarTimetable
+
+MAGIC = b"CHETSNAP"
+VERSION = 3
+SNAPSHOT_SUFFIX = ".snap"
+_PREFIX = struct.Struct("<8sII")
+_SAMPLE = 1 << 20  # bytes hashed from each end of the source file
+
+
+def snapshot_path(source_path):
+    return source_path + SNAPSHOT_SUFFIX
+
+
+def source_key(source_path):
+    """
+    Identity of the source file: path, mtime, size and a SHA-1 over its first
+    and last MiB. Hashing the ends rather than the whole file keeps the check
+    cheap on multi-GB exports while still catching in-place rewrites that
+    preserve size and mtime.
+    """
+    st = os.stat(source_path)
+    h = hashlib.sha1()
+    with open(source_path, "rb") as f:
+        h.update(f.read(_SAMPLE))
+        if st.st_size > _SAMPLE:
+            f.seek(max(st.st_size - _SAMPLE, _SAMPLE))
+            h.update(f.read(_SAMPLE))
+    return {
+        "path": os.path.abspath(source_path),
+        "mtime_ns": st.st_mtime_ns,
+        "size": st.st_size,
+        "sha1": h.hexdigest(),
+    }
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+def write_snapshot(tt, path, key):
+    """Write tt atomically (temp file + rename) so readers never see a partial file."""
+    layout, offset = [], 0
+    for name in ColumnarTimetable.COLUMNS:
+        col = tt.columns[name]
+        raw = memoryview(col).cast("B")
+        layout.append({"name": name, "typecode": col.typecode, "offset": offset, "nbytes": raw.nbytes})
+        offset = _align(offset + raw.nbytes)
+    header = json.dumps({
+        "key": key,
+        "byteorder": sys.byteorder,
+        "itemsizes": {c["typecode"]: tt.columns[c["name"]].itemsize for c in layout},
+        "cities": tt._cities,
+        "bus_ids": tt._bus_ids,
+        "columns": layout,
+        "payload_bytes": offset,
+    }, ensure_ascii=False).encode("utf-8")
+    crc = zlib.crc32(header)    # a damaged city or bus name must fail the check too
+
+    tmp = f"{path}.tmp{os.getpid()}"
+    try:
+        with open(tmp, "wb") as f:
+            # crc32 is filled in after the payload, at a fixed-width slot
+            header += b" " * 16
+            f.write(_PREFIX.pack(MAGIC, VERSION, len(header)))
+            f.write(header)
+            f.write(b"\0" * (_align(f.tell()) - f.tell()))
+            base = f.tell()
+            for c in layout:
+                raw = memoryview(tt.columns[c["name"]]).cast("B")
+                f.seek(base + c["offset"])
+                f.write(raw)
+                crc = zlib.crc32(raw, crc)
+            f.seek(base + offset)
+            f.truncate()
+            f.seek(_PREFIX.size + len(header) - 16)
+            f.write(f"{crc:016d}".encode("ascii"))
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def read_snapshot(path, key):
+    """
+    Map the snapshot at path and return a ColumnarTimetable whose columns are
+    zero-copy views into it, or None if it is missing, stale (key mismatch,
+    other version / byte order) or corrupt (bad magic, truncated, crc mismatch
+    over header or payload).
+    """
+    try:
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        magic, version, hlen = _PREFIX.unpack_from(mm, 0)
+        if magic != MAGIC or version != VERSION:
+            return None
+        raw_header = mm[_PREFIX.size:_PREFIX.size + hlen]
+        header = json.loads(raw_header[:-16].decode("utf-8"))
+        stored_crc = int(raw_header[-16:])
+        if header["key"] != key or header["byteorder"] != sys.byteorder:
+            return None
+        base = _align(_PREFIX.size + hlen)
+        if base + header["payload_bytes"] != len(mm):
+            return None
+        view, crc, cols = memoryview(mm), zlib.crc32(raw_header[:-16]), {}
+        for c in header["columns"]:
+            if header["itemsizes"][c["typecode"]] != struct.calcsize(c["typecode"]):
+                return None
+            raw = view[base + c["offset"]:base + c["offset"] + c["nbytes"]]
+            crc = zlib.crc32(raw, crc)
+            cols[c["name"]] = raw.cast(c["typecode"])
+        if crc != stored_crc or set(cols) != set(ColumnarTimetable.COLUMNS):
+            return None
+        return ColumnarTimetable(header["cities"], header["bus_ids"], cols)
+    except Exception:
+        return None
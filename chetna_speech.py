@@ -0,0 +1,392 @@
+# chetna_speech.py
+# Long-lived speech input: one Vosk model, continuous capture, VAD-segmented utterances
+#
+#   capture thread:   source (microphone or WAV files) -> ring buffer
+#   recognizer thread: ring buffer -> VAD segmenter -> Vosk -> transcript queue
+#
+# The main loop only calls listen(timeout) to take the next transcript.
+# While the bot is talking (mute() true, e.g. TtsService.is_speaking) the
+# microphone's audio is dropped and any half-heard utterance discarded, so
+# the reply is not transcribed as the next question; when it stops, audio
+# still buffered from that time is flushed too.
+# Offline check without a microphone:
+#   python chetna_speech.py recording1.wav recording2.wav          # transcripts
+#   python chetna_speech.py --segments-only recording.wav          # VAD only, no Vosk needed
+
+import argparse
+import json
+import math
+import os
+import queue
+import sys
+import threading
+import time
+import wave
+from array import array
+
+RATE = 16000
+FRAME_MS = 30
+FRAME_BYTES = RATE * FRAME_MS // 1000 * 2      # 16-bit mono
+DEFAULT_MODEL_DIR = "models/vosk-model-small-en-us-0.15"
+
+
+# ---------- Audio sources ----------
+class MicSource:
+    """PyAudio input stream, opened once and kept open."""
+
+    live = True
+
+    def __init__(self, rate=RATE, frames_per_buffer=4000):
+        import pyaudio
+        self._pa = pyaudio.PyAudio()
+        self._stream = self._pa.open(format=pyaudio.paInt16, channels=1, rate=rate,
+                                     input=True, frames_per_buffer=frames_per_buffer)
+        self._stream.start_stream()
+
+    def read(self, frames):
+        return self._stream.read(frames, exception_on_overflow=False)
+
+    def close(self):
+        self._stream.stop_stream()
+        self._stream.close()
+        self._pa.terminate()
+
+
+class WavSource:
+    """
+    Plays 16 kHz 16-bit WAV files as if they were the microphone (first
+    channel only), with trailing silence between files so each one ends its
+    utterance. realtime=True paces reads like a live stream.
+    """
+
+    def __init__(self, paths, realtime=False, gap_ms=1000):
+        self._paths = list(paths)
+        self._realtime = realtime
+        self.live = realtime
+        self._gap = b"\0" * (RATE * gap_ms // 1000 * 2)
+        self._wav = None
+        self._pending = b""
+
+    def _next_file(self):
+        if self._wav:
+            self._wav.close()
+            self._wav = None
+        if not self._paths:
+            return False
+        self._wav = wave.open(self._paths.pop(0), "rb")
+        if self._wav.getframerate() != RATE or self._wav.getsampwidth() != 2:
+            raise ValueError(f"{self._wav.getframerate()} Hz / {self._wav.getsampwidth() * 8}-bit WAV; "
+                             f"need {RATE} Hz 16-bit")
+        return True
+
+    def read(self, frames):
+        if self._realtime:
+            time.sleep(frames / RATE)
+        want = frames * 2
+        out = self._pending
+        while len(out) < want:
+            if self._wav is None and not self._next_file():
+                break
+            raw = self._wav.readframes(frames)
+            if not raw:
+                self._wav.close()
+                self._wav = None
+                out += self._gap
+                continue
+            channels = self._wav.getnchannels()
+            if channels > 1:
+                raw = array("h", raw)[::channels].tobytes()
+            out += raw
+        self._pending = out[want:]
+        return out[:want]
+
+    def close(self):
+        if self._wav:
+            self._wav.close()
+
+
+# ---------- Ring buffer ----------
+class RingBuffer:
+    """
+    Fixed-capacity byte ring. For live audio (block=False) a full ring
+    overwrites the oldest audio, counted in .overruns; recorded sources write
+    with block=True and wait for room instead.
+    """
+
+    def __init__(self, capacity):
+        self._buf = bytearray(capacity)
+        self._cap = capacity
+        self._start = 0
+        self._size = 0
+        self.overruns = 0
+        self.closed = False
+        self._cond = threading.Condition()
+
+    def write(self, data, block=False):
+        with self._cond:
+            for i in range(0, len(data), self._cap):
+                part = data[i:i + self._cap]
+                if block:
+                    self._cond.wait_for(lambda: self._cap - self._size >= len(part) or self.closed)
+                end = (self._start + self._size) % self._cap
+                first = min(len(part), self._cap - end)
+                self._buf[end:end + first] = part[:first]
+                self._buf[:len(part) - first] = part[first:]
+                self._size += len(part)
+                if self._size > self._cap:
+                    drop = self._size - self._cap
+                    self._start = (self._start + drop) % self._cap
+                    self._size = self._cap
+                    self.overruns += drop
+            self._cond.notify_all()
+
+    def read(self, n, timeout=None):
+        """Exactly n bytes, waiting up to timeout; fewer (possibly b"") on timeout or once closed."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._size >= n or self.closed, timeout)
+            n = min(n, self._size)
+            first = min(n, self._cap - self._start)
+            out = bytes(self._buf[self._start:self._start + first]) + bytes(self._buf[:n - first])
+            self._start = (self._start + n) % self._cap
+            self._size -= n
+            self._cond.notify_all()
+            return out
+
+    def clear(self):
+        """Drop everything buffered."""
+        with self._cond:
+            self._start = self._size = 0
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+# ---------- Voice activity detection ----------
+def frame_rms(frame):
+    samples = array("h", frame)
+    return math.sqrt(sum(s * s for s in samples) / len(samples)) if samples else 0.0
+
+
+class VadSegmenter:
+    """
+    Energy VAD over 30 ms frames with an adaptive noise floor. An utterance
+    starts after start_frames voiced frames (keeping preroll_ms of audio
+    before it) and ends after silence_ms of unvoiced frames or max_ms.
+    feed(frame) returns the finished utterance's PCM bytes, else None.
+    """
+
+    def __init__(self, min_rms=300.0, ratio=3.0, start_frames=3, silence_ms=700, preroll_ms=300, max_ms=15000):
+        self.min_rms = min_rms
+        self.ratio = ratio
+        self.start_frames = start_frames
+        self.silence_frames = silence_ms // FRAME_MS
+        self.preroll = preroll_ms // FRAME_MS
+        self.max_frames = max_ms // FRAME_MS
+        self.noise = min_rms / ratio
+        self._recent = []       # pre-roll frames while idle
+        self._voiced_run = 0
+        self._speech = None     # frames of the current utterance
+        self._silent_run = 0
+
+    def feed(self, frame):
+        rms = frame_rms(frame)
+        voiced = rms >= max(self.min_rms, self.noise * self.ratio)
+        if not voiced:
+            self.noise = 0.95 * self.noise + 0.05 * rms    # track background level
+        if self._speech is None:
+            self._recent.append(frame)
+            self._voiced_run = self._voiced_run + 1 if voiced else 0
+            if self._voiced_run >= self.start_frames:
+                self._speech = self._recent[-(self.preroll + self.start_frames):]
+                self._recent, self._silent_run = [], 0
+            else:
+                del self._recent[:-self.preroll - self.start_frames]
+            return None
+        self._speech.append(frame)
+        self._silent_run = 0 if voiced else self._silent_run + 1
+        if self._silent_run >= self.silence_frames or len(self._speech) >= self.max_frames:
+            return self.flush()
+        return None
+
+    def flush(self):
+        """End the current utterance (if any) and return its audio."""
+        speech, self._speech, self._voiced_run = self._speech, None, 0
+        return b"".join(speech) if speech else None
+
+    def reset(self):
+        """Forget the current utterance and pre-roll; the noise floor is kept."""
+        self._speech, self._recent, self._voiced_run, self._silent_run = None, [], 0, 0
+
+
+# ---------- Recognizer ----------
+def vosk_recognizer(model_dir=DEFAULT_MODEL_DIR):
+    """Load the Vosk model once; returns recognize(pcm_bytes) -> text."""
+    from vosk import KaldiRecognizer, Model
+    model = Model(model_dir)
+    rec = KaldiRecognizer(model, RATE)
+
+    def recognize(pcm):
+        rec.AcceptWaveform(pcm)
+        return (json.loads(rec.FinalResult()).get("text") or "").strip()  # FinalResult also resets rec
+
+    return recognize
+
+
+class SpeechService:
+    """
+    Owns the capture and recognition threads. recognize(pcm) -> text is
+    called once per utterance (default: Vosk, loaded once); source defaults
+    to the microphone. Transcripts are delivered in order through listen();
+    ones finished while nobody was listening are dropped as stale.
+    mute() -> bool, if given, is polled per read: audio is dropped while it
+    is true and for mute_tail_ms after (room echo).
+    """
+
+    def __init__(self, source=None, recognize=None, vad=None, buffer_seconds=10, mute=None, mute_tail_ms=300):
+        self.source = source
+        self.recognize = recognize
+        self.vad = vad or VadSegmenter()
+        self.ring = RingBuffer(RATE * 2 * buffer_seconds)
+        self.transcripts = queue.Queue()
+        self.mute = mute
+        self.mute_tail = mute_tail_ms / 1000
+        self.segments = 0
+        self.errors = 0
+        self.muted_bytes = 0
+        self.ended = False           # end of input seen, or the threads are gone
+        self._muted_until = 0.0
+        self._reset_vad = False      # set by the capture thread, acted on by the recognizer
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        if self._threads:
+            return self
+        self.source = self.source or MicSource()
+        self.recognize = self.recognize or vosk_recognizer(os.getenv("CHETNA_VOSK_MODEL", DEFAULT_MODEL_DIR))
+        for target, name in ((self._capture, "chetna-speech-capture"), (self._recognize, "chetna-speech-recognize")):
+            t = threading.Thread(target=target, name=name, daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def _muted(self):
+        now = time.monotonic()
+        if self.mute is not None and self.mute():
+            self._muted_until = now + self.mute_tail
+            return True
+        return now < self._muted_until
+
+    def _capture(self):
+        block = not getattr(self.source, "live", True)
+        muted = False
+        try:
+            while not self._stop.is_set():
+                data = self.source.read(FRAME_BYTES // 2 * 4)
+                if not data:
+                    break
+                if self._muted():
+                    if not muted:
+                        muted = self._reset_vad = True
+                    self.muted_bytes += len(data)
+                    continue
+                if muted:
+                    # the bot stopped talking: nothing heard meanwhile may reach the VAD
+                    muted = False
+                    self.ring.clear()
+                    self._reset_vad = True
+                self.ring.write(data, block)
+        except Exception:
+            self.errors += 1
+        finally:
+            self.ring.close()
+
+    def _recognize(self):
+        try:
+            while True:
+                frame = self.ring.read(FRAME_BYTES, timeout=0.5)
+                if self._reset_vad:
+                    self._reset_vad = False
+                    self.vad.reset()
+                    continue
+                if len(frame) < FRAME_BYTES:
+                    if self.ring.closed and not frame:
+                        break
+                    continue
+                pcm = self.vad.feed(frame)
+                if pcm:
+                    self._emit(pcm)
+            pcm = self.vad.flush()
+            if pcm:
+                self._emit(pcm)
+        except Exception:
+            self.errors += 1
+        finally:
+            self.transcripts.put(None)   # end of input
+
+    def _emit(self, pcm):
+        self.segments += 1
+        try:
+            text = self.recognize(pcm)
+        except Exception:
+            self.errors += 1
+            return
+        if text:
+            self.transcripts.put(text)
+
+    def listen(self, timeout=None):
+        """
+        Next transcript spoken from now on, or "" if none arrives within
+        timeout. Once input has ended, returns "" straight away.
+        """
+        while not self.ended:      # drop what was heard between turns
+            try:
+                text = self.transcripts.get_nowait()
+            except queue.Empty:
+                break
+            self.ended = text is None
+        if self.ended or (self._threads and not any(t.is_alive() for t in self._threads)):
+            self.ended = True
+            return ""
+        try:
+            text = self.transcripts.get(timeout=timeout)
+        except queue.Empty:
+            return ""
+        self.ended = text is None
+        return text or ""
+
+    def stop(self):
+        self._stop.set()
+        for t in self._threads:
+            t.join(2)
+        if self.source:
+            self.source.close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Transcribe WAV files through Chetna's speech pipeline")
+    ap.add_argument("wav", nargs="+")
+    ap.add_argument("--model", default=os.getenv("CHETNA_VOSK_MODEL", DEFAULT_MODEL_DIR))
+    ap.add_argument("--segments-only", action="store_true", help="print VAD segments instead of running Vosk")
+    args = ap.parse_args(argv)
+
+    if args.segments_only:
+        recognize = lambda pcm: f"<utterance {len(pcm) / (RATE * 2):.2f} s>"  # noqa: E731
+    else:
+        recognize = vosk_recognizer(args.model)
+    svc = SpeechService(WavSource(args.wav), recognize).start()
+    t0 = time.perf_counter()
+    while True:
+        text = svc.transcripts.get()
+        if text is None:
+            break
+        print(f"[{time.perf_counter() - t0:6.2f}s] {text}")
+    svc.stop()
+    return 0 if not svc.errors else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+# chetna_tts.py
+# Text-to-speech on a dedicated thread: one engine, a bounded queue, interruptible playback
+#
+# pyttsx3 engines must be driven from the thread that created them, so the
+# worker creates the engine (and picks the voice) once and then speaks queued
+# texts in order. speak() returns immediately; cancel() drops everything queued
+# and stops the utterance in progress at the next word boundary.
+#
+# With an AudioCache (chetna_audio.py) and a WAV player available, each text is
+# synthesized to a file once and played from the cache afterwards; idle time is
+# used to pre-render texts handed to prerender().
+
+import queue
+import threading
+import time
+from collections import deque
+
+FEMALE_VOICE_HINTS = ("female", "zira", "heera", "susan")
+
+
+def default_engine(rate=170):
+    """pyttsx3 engine with a female-ish voice if one is installed."""
+    import pyttsx3
+    engine = pyttsx3.init()
+    for v in engine.getProperty("voices") or ():
+        name = (v.name or "").lower()
+        if any(h in name for h in FEMALE_VOICE_HINTS):
+            engine.setProperty("voice", v.id)
+            break
+    engine.setProperty("rate", rate)
+    return engine
+
+
+def _percentile(samples, p):
+    if not samples:
+        return None
+    s = sorted(samples)
+    return s[min(len(s) - 1, int(p / 100 * len(s)))]
+
+
+class TtsService:
+    """
+    speak(text) queues text (dropping the oldest pending one when the queue
+    is full) and returns at once; wait() blocks until the queue is spoken.
+    is_speaking() is true while audio is playing (microphones use it to mute
+    themselves). metrics() reports queue wait and speaking time over recent
+    utterances.
+    """
+
+    def __init__(self, engine_factory=default_engine, max_pending=4, history=200, cache=None, player=None):
+        self._engine_factory = engine_factory
+        self.cache = cache
+        self._player = player if cache is not None else None
+        self._prerender = deque()
+        self._q = queue.Queue(maxsize=max_pending)
+        self._generation = 0          # bumped by cancel(); older jobs are skipped or stopped
+        self._lock = threading.Lock()
+        self._cv = threading.Condition()
+        self._pending = 0             # queued + in progress
+        self._thread = None
+        self._current = None
+        self._speaking = threading.Event()
+        self.engine_error = None
+        self.spoken = self.cancelled = self.dropped = 0
+        self._waits = deque(maxlen=history)      # seconds from speak() to audio start
+        self._durations = deque(maxlen=history)  # seconds spent speaking
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="chetna-tts", daemon=True)
+                self._thread.start()
+
+    # ---------- API ----------
+    def speak(self, text):
+        if not text or self.engine_error is not None:
+            return
+        self._ensure_started()
+        job = (text, time.perf_counter(), self._generation)
+        with self._cv:
+            self._pending += 1
+        while True:
+            try:
+                self._q.put_nowait(job)
+                return
+            except queue.Full:
+                try:
+                    self._q.get_nowait()
+                    self.dropped += 1
+                    self._done()
+                except queue.Empty:
+                    pass
+
+    def cancel(self):
+        """Drop pending speech and interrupt the current utterance (e.g. the user started typing)."""
+        self._generation += 1
+        while True:
+            try:
+                self._q.get_nowait()
+                self.cancelled += 1
+                self._done()
+            except queue.Empty:
+                break
+
+    def prerender(self, texts):
+        """Synthesize texts into the cache whenever the worker has nothing to say."""
+        if self.cache is None or self._player is None:
+            return
+        self._prerender.extend(texts)
+        self._ensure_started()
+
+    def is_speaking(self):
+        return self._speaking.is_set()
+
+    def wait(self, timeout=None):
+        """Block until everything queued has been spoken (or cancelled)."""
+        with self._cv:
+            return self._cv.wait_for(lambda: self._pending == 0, timeout)
+
+    def _done(self):
+        with self._cv:
+            self._pending -= 1
+            self._cv.notify_all()
+
+    def metrics(self):
+        waits, durs = list(self._waits), list(self._durations)
+        ms = lambda v: None if v is None else round(v * 1000, 1)  # noqa: E731
+        return {
+            "spoken": self.spoken,
+            "cancelled": self.cancelled,
+            "dropped": self.dropped,
+            "queue_wait_ms_p50": ms(_percentile(waits, 50)),
+            "queue_wait_ms_p95": ms(_percentile(waits, 95)),
+            "speak_ms_p50": ms(_percentile(durs, 50)),
+            "speak_ms_p95": ms(_percentile(durs, 95)),
+            **({"cache_" + k: v for k, v in self.cache.stats().items()} if self.cache else {}),
+        }
+
+    # ---------- Worker ----------
+    def _run(self):
+        try:
+            engine = self._engine_factory()
+            if hasattr(engine, "connect"):
+                engine.connect("started-word", lambda *a, **k: self._maybe_stop(engine))
+        except Exception as e:
+            self.engine_error = e
+            while True:   # later speak() calls return early; release anything already queued
+                self._drain()
+                time.sleep(0.05)
+                if self._q.empty():
+                    return
+        voice_key = (engine.getProperty("voice"), engine.getProperty("rate")) if self._player else None
+        while True:
+            try:
+                text, queued_at, gen = self._q.get(timeout=0.2 if self._prerender else None)
+            except queue.Empty:
+                self._render_idle(engine, voice_key)
+                continue
+            if gen != self._generation:
+                self.cancelled += 1
+            else:
+                self._current = gen
+                start = time.perf_counter()
+                self._waits.append(start - queued_at)
+                self._speaking.set()
+                try:
+                    if voice_key:
+                        self._play_cached(engine, voice_key, text, gen)
+                    else:
+                        engine.say(text)
+                        engine.runAndWait()
+                except Exception:
+                    pass
+                finally:
+                    self._speaking.clear()
+                self._current = None
+                if gen == self._generation:
+                    self.spoken += 1
+                    self._durations.append(time.perf_counter() - start)
+                else:
+                    self.cancelled += 1
+            self._done()
+
+    def _render(self, engine, text, gen=None):
+        def render(path):
+            engine.save_to_file(text, path)
+            engine.runAndWait()
+            if gen is not None and gen != self._generation:
+                raise InterruptedError("cancelled while rendering")  # don't cache a cut-off file
+        return render
+
+    def _play_cached(self, engine, voice_key, text, gen):
+        path = self.cache.get(text, *voice_key) or self.cache.put(text, *voice_key, self._render(engine, text, gen))
+        if path is None or gen != self._generation:
+            return
+        playback = self._player(path)
+        while playback.is_playing():
+            if gen != self._generation:
+                playback.stop()
+                return
+            time.sleep(0.02)
+
+    def _render_idle(self, engine, voice_key):
+        text = self._prerender.popleft()
+        try:
+            if (text, *voice_key) not in self.cache:
+                self.cache.put(text, *voice_key, self._render(engine, text))
+        except Exception:
+            pass
+
+    def _maybe_stop(self, engine):
+        if self._current is not None and self._current != self._generation:
+            engine.stop()
+
+    def _drain(self):
+        while True:
+            try:
+                self._q.get_nowait()
+                self._done()
+            except queue.Empty:
+                break
@@ -2,13 +2,23 @@
 # Robust intent + entity extraction, unified with chetnautils.detect_language
 
 import re
-from chetnautils import detect_language
+from chetna_matcher import KeywordMatcher
+from chetnautils import METRICS, chunked, language_entries, language_from_hits
 
 # -----------------------------
 # Helper extractors
 # -----------------------------
 
 BUS_RE = re.compile(r"\b(\d{2,4})\b")
+_WORD = r"([a-zA-Z\u0900-\u097F]+)"
+ROUTE_RES = [
+    # English patterns
+    re.compile(rf"(?:from\s+)?{_WORD}\s+to\s+{_WORD}"),
+    # Hinglish/Hindi (roman or Devanagari): "<X> se <Y> (tak|ke liye)?"
+    re.compile(rf"{_WORD}\s+se\s+{_WORD}(?:\s+(?:tak|ke\s+liye))?"),
+    # Devanagari "से" / "तक"
+    re.compile(rf"{_WORD}\s+से\s+{_WORD}(?:\s+तक)?"),
+]
 
 def _extract_bus_number(text: str):
     m = BUS_RE.search(text)
@@ -23,56 +33,91 @@ def _extract_route_entities(t: str):
       - "X से Y तक"
     """
     text = " ".join(t.split())
-
-    # English patterns
-    m = re.search(r"(?:from\s+)?([a-zA-Z\u0900-\u097F]+)\s+to\s+([a-zA-Z\u0900-\u097F]+)", text)
-    if m:
-        return m.group(1), m.group(2)
-
-    # Hinglish/Hindi (roman or Devanagari): "<X> se <Y> (tak|ke liye)?"
-    m = re.search(r"([a-zA-Z\u0900-\u097F]+)\s+se\s+([a-zA-Z\u0900-\u097F]+)(?:\s+(?:tak|ke\s+liye))?", text)
-    if m:
-        return m.group(1), m.group(2)
-
-    # Devanagari "से" / "तक"
-    m = re.search(r"([a-zA-Z\u0900-\u097F]+)\s+से\s+([a-zA-Z\u0900-\u097F]+)(?:\s+तक)?", text)
-    if m:
-        return m.group(1), m.group(2)
+    for route_re in ROUTE_RES:
+        m = route_re.search(text)
+        if m:
+            return m.group(1), m.group(2)
 
     return None, None
 
-def _extract_period(text: str):
-    txt = text.lower()
-    if any(w in txt for w in ["morning", "subah", "सुबह"]):
-        return "morning"
-    if any(w in txt for w in ["afternoon", "dopahar", "दोपहर"]):
-        return "afternoon"
-    if any(w in txt for w in ["evening", "shaam", "शाम"]):
-        return "evening"
-    if any(w in txt for w in ["night", "raat", "रात"]):
-        return "night"
-    return None
-
-def _is_next_asked(text: str):
-    txt = text.lower()
-    return any(w in txt for w in ["next", "agla", "agli", "aagle"])
+# -----------------------------
+# Keyword tables (checked in this order; first intent found wins)
+# -----------------------------
 
-def _is_greeting(text: str):
-    txt = text.lower()
-    greetings = [
-        r"\bhi\b", r"\bhello\b", r"\bhii\b", r"\bhey\b", r"\bhiii\b",
-        r"\bnamaste\b", r"\bnamaskar\b", "नमस्ते", "नमस्कार"
-    ]
-    return any(re.search(g, txt) for g in greetings)
+GREETING_WORDS = ["hi", "hello", "hii", "hey", "hiii", "namaste", "namaskar"]   # whole words
+GREETING_SUBSTRINGS = ["नमस्ते", "नमस्कार"]
 
-def _has_any(txt: str, words):
-    low = txt.lower()
-    return any(w in low for w in words)
+INTENT_KEYWORDS = [
+    ("fare_info", ["fare", "kiraya", "price", "ticket", "किराया"]),
+    ("timing_info", ["time", "timing", "schedule", "kab", "baje", "कब", "समय", "टाइम", "बजे"]),
+    ("track_bus", [
+        "track", "kidhar", "where", "kahan", "location",
+        "कहाँ", "कहां", "abhi kaha hai", "bus kidhar hai",
+        "se aane wali bus", "bus ka pata", "bus location"
+    ]),
+    ("status_info", ["status", "on time", "ontime", "late", "delay", "delayed", "लेट", "देरी"]),
+    ("lodge_complaint", [
+        "complaint", "shikayat", "issue", "problem",
+        "rude", "driver", "bad", "ganda", "gandi", "gandi tarah",
+        "misbehave", "not found", "missing", "unclean", "dirty",
+        "बदतमीज", "शिकायत", "गंदा", "गंदी"
+    ]),
+]
+
+PERIOD_KEYWORDS = [
+    ("morning", ["morning", "subah", "सुबह"]),
+    ("afternoon", ["afternoon", "dopahar", "दोपहर"]),
+    ("evening", ["evening", "shaam", "शाम"]),
+    ("night", ["night", "raat", "रात"]),
+]
+NEXT_WORDS = ["next", "agla", "agli", "aagle"]
+
+# Complaint categories (first match wins; otherwise "other")
+COMPLAINT_CATEGORIES = [
+    ("behaviour", ["rude", "misbehave", "badtameez", "badtamiz", "बदतमीज", "driver", "conductor", "ड्राइवर"]),
+    ("cleanliness", ["dirty", "unclean", "ganda", "gandi", "smell", "गंदा", "गंदी"]),
+    ("delay", ["late", "delay", "der se", "लेट", "देरी"]),
+    ("missing", ["not found", "missing", "nahi aayi", "nahi aai", "नहीं आई"]),
+]
+
+def _build_matcher():
+    entries = [(w, "greetings", True) for w in GREETING_WORDS]
+    entries += [(w, "greetings", False) for w in GREETING_SUBSTRINGS]
+    for intent, words in INTENT_KEYWORDS:
+        entries += [(w, intent, False) for w in words]
+    for period, words in PERIOD_KEYWORDS:
+        entries += [(w, "period:" + period, False) for w in words]
+    entries += [(w, "ask_next", False) for w in NEXT_WORDS]
+    for category, words in COMPLAINT_CATEGORIES:
+        entries += [(w, "category:" + category, False) for w in words]
+    entries += language_entries()
+    return KeywordMatcher(entries)
+
+# Built once at import: intents, periods, "next" words and language markers
+# are all found in a single pass over the lower-cased input.
+MATCHER = _build_matcher()
+
+def _extract_category(hits):
+    for category, _ in COMPLAINT_CATEGORIES:
+        if "category:" + category in hits:
+            return category
+    return "other"
+
+def complaint_category(text: str) -> str:
+    """Category of a complaint text, as get_intent would report it."""
+    return _extract_category(MATCHER.find(text.strip().lower()))
+
+def _extract_period(hits):
+    for period, _ in PERIOD_KEYWORDS:
+        if "period:" + period in hits:
+            return period
+    return None
 
 # -----------------------------
 # Main intent extractor
 # -----------------------------
 
+@METRICS.timed("get_intent")
 def get_intent(user_input: str) -> dict:
     """
     Returns a dict with:
@@ -84,67 +129,61 @@ def get_intent(user_input: str) -> dict:
       period?: str
       ask_next?: bool
       complaint_text?: str
+      category?: str   (complaints: behaviour | cleanliness | delay | missing | other)
     """
     text = user_input.strip()
     low = text.lower()
-    lang = detect_language(text)
-    bus_number = _extract_bus_number(low)
-    src, dst = _extract_route_entities(low)   # ✅ extracted only once here
+    hits = MATCHER.find(low)
+    lang = language_from_hits(text, hits)
 
     # 1) Greetings
-    if _is_greeting(low):
+    if "greetings" in hits:
         return {"intent": "greetings", "lang": lang}
 
-    # 2) Fare
-    if _has_any(low, ["fare", "kiraya", "price", "ticket", "किराया"]):
-        return {"intent": "fare_info", "lang": lang, "bus_number": bus_number}
-
-    # 3) Timing / schedule
-    if _has_any(low, ["time", "timing", "schedule", "kab", "baje", "कब", "समय", "टाइम", "बजे"]):
-        return {"intent": "timing_info", "lang": lang, "bus_number": bus_number}
-
-    # 4) Track location
-    if _has_any(low, [
-        "track", "kidhar", "where", "kahan", "location",
-        "कहाँ", "कहां", "abhi kaha hai", "bus kidhar hai",
-        "se aane wali bus", "bus ka pata", "bus location"
-    ]):
-        return {
-            "intent": "track_bus",
-            "lang": lang,
-            "bus_number": bus_number,
-            "source": src,
-            "destination": dst
-        }
-
-    # 5) Status (late/on-time)
-    if _has_any(low, ["status", "on time", "ontime", "late", "delay", "delayed", "लेट", "देरी"]):
-        return {"intent": "status_info", "lang": lang, "bus_number": bus_number}
-
-     # 6) Complaint
-    if _has_any(low, [
-        "complaint", "shikayat", "issue", "problem",
-        "rude", "driver", "bad", "ganda", "gandi", "gandi tarah",
-        "misbehave", "not found", "missing", "unclean", "dirty",
-        "बदतमीज", "शिकायत", "गंदा", "गंदी"
-    ]):
-        return {
-            "intent": "lodge_complaint",
-            "lang": lang,
-            "bus_number": bus_number,
-            "complaint_text": text
-        }
+    # 2-6) Keyword intents, in priority order
+    for intent, _ in INTENT_KEYWORDS:
+        if intent not in hits:
+            continue
+        bus_number = _extract_bus_number(low)
+        if intent == "track_bus":
+            src, dst = _extract_route_entities(low)
+            return {
+                "intent": "track_bus",
+                "lang": lang,
+                "bus_number": bus_number,
+                "source": src,
+                "destination": dst
+            }
+        if intent == "lodge_complaint":
+            return {
+                "intent": "lodge_complaint",
+                "lang": lang,
+                "bus_number": bus_number,
+                "complaint_text": text,
+                "category": _extract_category(hits),
+            }
+        return {"intent": intent, "lang": lang, "bus_number": bus_number}
 
     # 7) Route / search between cities
+    src, dst = _extract_route_entities(low)
     if src and dst:
         return {
             "intent": "route_info",
             "lang": lang,
             "source": src.title(),
             "destination": dst.title(),
-            "period": _extract_period(low),
-            "ask_next": _is_next_asked(low),
+            "period": _extract_period(hits),
+            "ask_next": "ask_next" in hits,
         }
 
     # 8) Unknown (fallback)
     return {"intent": "unknown", "lang": lang}
+
+def get_intents(texts, chunk_size: int = 1000):
+    """
+    Batch form of get_intent: yields one dict per text, in input order.
+    texts may be any iterable (e.g. a file being streamed); it is consumed
+    chunk_size items at a time.
+    """
+    for chunk in chunked(texts, chunk_size):
+        yield from [get_intent(t) for t in chunk]
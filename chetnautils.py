@@ -1,31 +1,128 @@
 # chetnautils.py
 # Utilities for Chetna: logs, language, complaints, voice/tts wrappers
 
+import importlib.util
 import json
 import os
 import random
 from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+from chetna_analytics import ComplaintAnalytics
+from chetna_audio import AudioCache, find_player
+from chetna_complaints import ComplaintStore
+from chetna_delays import feed_from_env
+from chetna_log import writer_from_env
+from chetna_matcher import KeywordMatcher
+from chetna_metrics import metrics_from_env
+from chetna_tts import TtsService
 
 # ----------- Logging -----------
-CHAT_LOG = "logs/chetna_chat_history.txt"
-COMPLAINTS_JSON = "logs/complaints.json"
+CHAT_LOG = os.getenv("CHETNA_CHAT_LOG", "logs/chetna_chat_history.txt")
+COMPLAINTS_JSON = "logs/complaints.json"  # legacy, migrated into COMPLAINTS_DB
 
 def _ensure_dir(path):
     d = os.path.dirname(path)
     if d and not os.path.exists(d):
         os.makedirs(d, exist_ok=True)
 
-def log_event(message: str):
-    _ensure_dir(CHAT_LOG)
-    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    with open(CHAT_LOG, "a", encoding="utf-8") as f:
-        f.write(f"[{ts}] {message}\n")
+# Writes go through a background thread (see chetna_log.py); CHETNA_LOG_FORMAT=json
+# switches to structured lines in logs/chetna_chat_history.jsonl.
+LOG = writer_from_env(CHAT_LOG)
 
-def log_chat(user, bot):
-    log_event(f"USER: {user}")
-    log_event(f"CHETNA: {bot}")
+# Per-stage timings by intent/language (chetna_metrics.py); `stats` in the chat
+# loop shows them, CHETNA_METRICS_FILE exports them periodically.
+METRICS = metrics_from_env()
+
+def log_event(message: str, **fields):
+    LOG.write({"kind": "event", "message": message, **fields})
+
+@METRICS.timed("log_chat")
+def log_chat(user, bot, **fields):
+    """fields (json format only): e.g. lang, intent, latency_ms."""
+    if LOG.fmt == "json":
+        LOG.write({"kind": "chat", "user": user, "bot": bot, **fields})
+    else:
+        log_event(f"USER: {user}")
+        log_event(f"CHETNA: {bot}")
 
 # ----------- Language & text helpers -----------
+# Greetings typed in Latin that should count as Hinglish
+HINGLISH_GREETING_TRIGGERS = (
+    "namaste", "namaskar", "pranam", "pranaam", "ram ram",
+    "salaam", "salam", "adaab",
+    "sat sri akaal", "satsriakaal", "satshriakal"
+)
+
+# Compact list of common Hindi/Hinglish tokens
+HINGLISH_MARKERS = (
+    "hai", "kya", "kyu", "kyun", "kab", "kaun", "kaise", "kidhar", "kahan",
+    "se", "tak", "ke", "ka", "ki", "hona", "nikalti", "kiraya", "bus",
+    "agla", "shaam", "subah", "rude", "shikayat", "complaint", "driver"
+)
+
+def has_devanagari(text: str) -> bool:
+    return any('\u0900' <= ch <= '\u097F' for ch in text)
+
+def language_entries():
+    """
+    KeywordMatcher entries for the Hinglish heuristic. Markers and greetings
+    are matched as whole words ("se" counts in "delhi se karnal", not in
+    "case"); chetnaintent folds these into its own one-pass matcher.
+    """
+    entries = [(g, "lang:greeting", True) for g in HINGLISH_GREETING_TRIGGERS]
+    entries += [(w, "lang:" + w, True) for w in HINGLISH_MARKERS]
+    return entries
+
+_LANG_MATCHER = KeywordMatcher(language_entries())
+
+def language_from_hits(text: str, hits) -> str:
+    """
+    Decision rule shared by detect_language and chetnaintent.get_intent:
+      Devanagari present          -> 'hi'
+      Hinglish greeting, or >= 2 markers -> 'hi-latn'
+      exactly 1 marker            -> ambiguous: ask the optional model
+      otherwise                   -> 'en'
+    """
+    if has_devanagari(text):
+        return "hi"
+    if "lang:greeting" in hits:
+        return "hi-latn"
+    markers = sum(1 for h in hits if h.startswith("lang:"))
+    if markers >= 2:
+        return "hi-latn"
+    if markers == 1:
+        return _model_language(text.lower().strip())
+    return "en"
+
+# ----------- Optional heavier model (langdetect), only for ambiguous input -----------
+# Off by default: langdetect is slow to load and unreliable on 3-word inputs.
+# CHETNA_LANGDETECT=1 lets it settle single-marker utterances.
+USE_LANGDETECT = os.getenv("CHETNA_LANGDETECT", "0") == "1"
+_LANGDETECT = None
+
+def _langdetect():
+    global _LANGDETECT
+    if _LANGDETECT is None:
+        try:
+            from langdetect import DetectorFactory, detect
+            DetectorFactory.seed = 0   # deterministic results
+            _LANGDETECT = detect
+        except Exception:
+            _LANGDETECT = False
+    return _LANGDETECT
+
+@lru_cache(maxsize=4096)
+def _model_language(text: str) -> str:
+    detect = _langdetect() if USE_LANGDETECT else False
+    if not detect:
+        return "en"
+    try:
+        return "en" if detect(text) == "en" else "hi-latn"
+    except Exception:
+        return "en"
+
+@lru_cache(maxsize=4096)
 def detect_language(text: str) -> str:
     """
     Returns:
@@ -33,38 +130,22 @@ def detect_language(text: str) -> str:
       'hi-latn'  -> Hinglish (Hindi in Latin script)
       'en'       -> English / default
     Heuristic: if any Devanagari char -> 'hi'
-               else if enough Hindi markers in Latin -> 'hi-latn'
+               else if enough Hindi markers (whole words) in Latin -> 'hi-latn'
                else 'en'
+    Recent results are memoized.
     """
     if not text:
         return "en"
+    return language_from_hits(text, _LANG_MATCHER.find(text.lower().strip()))
 
-    # Devanagari range
-    if any('\u0900' <= ch <= '\u097F' for ch in text):
-        return "hi"
-
-    t = text.lower().strip()
-
-    # --- Tiny targeted fix: greetings typed in Latin should count as Hinglish ---
-    hinglish_greeting_triggers = {
-        "namaste", "namaskar", "pranam", "pranaam", "ram ram",
-        "salaam", "salam", "adaab",
-        "sat sri akaal", "satsriakaal", "satshriakal"
-    }
-    if any(g in t for g in hinglish_greeting_triggers):
-        return "hi-latn"
-    # ---------------------------------------------------------------------------
-
-    # Compact list of common Hindi/Hinglish tokens
-    markers = [
-        "hai", "kya", "kyu", "kyun", "kab", "kaun", "kaise", "kidhar", "kahan",
-        "se", "tak", "ke", "ka", "ki", "hona", "nikalti", "kiraya", "bus",
-        "agla", "shaam", "subah", "rude", "shikayat", "complaint", "driver"
-    ]
-    score = sum(1 for w in markers if w in t)
-    if score >= 2:
-        return "hi-latn"
-    return "en"
+def chunked(items, size: int):
+    """Yield lists of up to size items from any iterable, without reading it all."""
+    it = iter(items)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
 
 def normalize_text(text: str) -> str:
     return (text or "").strip()
@@ -86,6 +167,61 @@ def respond3(en: str, hi: str, hinglish: str, lang: str) -> str:
         return en
 
 
+# ----------- Fixed replies -----------
+# Replies with nothing to fill in, as (en, hi, hinglish) for respond3. Being
+# listed here is what gets them pre-rendered to audio (fixed_prompts).
+PROMPTS = {
+    "greeting": (
+        "Hello! I am Chetna. How can I help you with buses today?",
+        "नमस्ते! मैं चेतना बोल रही हूँ। मैं आपकी बस से जुड़ी मदद कैसे कर सकती हूँ?",
+        "Namaste! Main Chetna bol rahi hoon. Main aapki bus se judi madad kaise kar sakti hoon?",
+    ),
+    "ask_bus_fare": (
+        "Please tell me the bus number to check the fare.",
+        "किराया बताने के लिए बस नंबर बताएँ।",
+        "Kirpya kiraya batane ke liye bus number bataye.",
+    ),
+    "ask_bus_timing": (
+        "Please tell me the bus number to check timing.",
+        "टाइमिंग बताने के लिए बस नंबर बताएँ।",
+        "Kirpya timing batane ke liye bus number bataye.",
+    ),
+    "ask_bus_track": (
+        "Please tell me the bus number to track.",
+        "बस को ट्रैक करने के लिए बस नंबर बताएँ।",
+        "Kirpya bus ko track karne ke liye bus number bataye.",
+    ),
+    "ask_route": (
+        "Please provide both source and destination, e.g., 'buses from Delhi to Karnal'.",
+        "कृपया स्रोत और गंतव्य दोनों बताएँ, जैसे: 'दिल्ली से करनाल की बसें'।",
+        "Kirpya source aur destination dono bataye, jaise: 'Delhi se Karnal ki basen'.",
+    ),
+    "ask_bus_status": (
+        "Please tell me the bus number to check status.",
+        "स्टेटस बताने के लिए बस नंबर बताएँ।",
+        "Kirpya status batane ke liye bus number bataye.",
+    ),
+    "ask_bus_complaint": (
+        "Please mention the bus number in your complaint.",
+        "कृपया अपनी शिकायत में बस नंबर ज़रूर बताएँ।",
+        "Kirpya apni shikayat mein bus number zarur bataye.",
+    ),
+    "goodbye": (
+        "Goodbye! Have a safe journey.",
+        "अलविदा! आपकी यात्रा शुभ हो।",
+        "Goodbye! Aapki yatra shubh ho.",
+    ),
+}
+
+def prompt(name: str, lang: str) -> str:
+    """A fixed reply from PROMPTS in the user's language."""
+    return respond3(*PROMPTS[name], lang)
+
+def fixed_prompts():
+    """Every text in PROMPTS, each once, for audio pre-rendering."""
+    return list(dict.fromkeys(t for texts in PROMPTS.values() for t in texts))
+
+
 # Back-compat (en/hi only). If lang is hi-latn, we prefer Hindi here.
 def respond(en_text: str, hi_text: str, lang: str = "en") -> str:
     if lang in ("hi", "hi-latn"):
@@ -94,68 +230,86 @@ def respond(en_text: str, hi_text: str, lang: str = "en") -> str:
 
 
 # ----------- Complaints -----------
-def _load_complaints():
-    if os.path.exists(COMPLAINTS_JSON):
-        with open(COMPLAINTS_JSON, "r", encoding="utf-8") as f:
-            try:
-                return json.load(f)
-            except Exception:
-                return []
-    return []
+# Stored in SQLite (see chetna_complaints.py); complaints.json is imported once.
+COMPLAINTS_DB = os.getenv("CHETNA_COMPLAINTS_DB", "logs/complaints.db")
+COMPLAINTS = ComplaintStore(COMPLAINTS_DB, legacy_json=COMPLAINTS_JSON)
+# Per-day counters by bus/category and repeated-complaint groups (chetna_analytics.py)
+COMPLAINT_STATS = ComplaintAnalytics(COMPLAINTS)
 
 def save_complaint_json(bus_number: str, complaint_text: str) -> str:
-    _ensure_dir(COMPLAINTS_JSON)
-    items = _load_complaints()
-    ticket_id = f"C-{random.randint(1000, 9999)}"
-    record = {
-        "ticket_id": ticket_id,
-        "bus_number": str(bus_number),
-        "complaint": complaint_text,
-        "time": datetime.now().isoformat()
-    }
-    items.append(record)
-    with open(COMPLAINTS_JSON, "w", encoding="utf-8") as f:
-        json.dump(items, f, indent=2, ensure_ascii=False)
+    record = COMPLAINTS.add(bus_number, complaint_text)
     log_event(f"COMPLAINT: {record}")
-    return ticket_id
+    try:
+        COMPLAINT_STATS.update()
+    except Exception:
+        pass  # analytics must never lose a complaint
+    return record["ticket_id"]
 
 # ----------- Status / Delay -----------
-def get_bus_delay_minutes(bus_number: str) -> int:
-    # Simulated delay (0..20 mins). Could be replaced by real feed later.
-    import random as _r
-    _r.seed(int(''.join(ch for ch in str(bus_number) if ch.isdigit()) or "0"))
-    return _r.randint(0, 20)
+# Live delays from a local feed (chetna_delays.py: CHETNA_DELAY_FEED / _SOCKET / _REPLAY),
+# applied by a background thread; lookups are a dict read.
+DELAYS = feed_from_env()
+
+def current_delays() -> dict:
+    """{bus_id: minutes late} from the live feed, for the position engine ({} without a feed)."""
+    return DELAYS.store.current() if DELAYS.sources else {}
+
+@METRICS.timed("delay")
+def get_bus_delay_minutes(bus_number: str):
+    """
+    Latest delay in minutes from the live feed, or None if the feed has
+    nothing current for this bus. Without a configured feed: a simulated
+    0..20 minutes, fixed per bus number (a private RNG; global random is untouched).
+    """
+    if DELAYS.sources:
+        return DELAYS.store.get(bus_number)
+    return random.Random(int(''.join(ch for ch in str(bus_number) if ch.isdigit()) or "0")).randint(0, 20)
 
 # ----------- Voice availability & TTS -----------
-def voice_available() -> bool:
+# Probes only look the packages up (importlib find_spec); the imports themselves
+# happen on first use, so startup does not pay for them.
+def module_available(name: str) -> bool:
     try:
-        import vosk  # noqa: F401
-        import pyaudio  # noqa: F401
-        return True
-    except Exception:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
         return False
 
+def voice_available() -> bool:
+    return module_available("vosk") and module_available("pyaudio")
+
 def tts_available() -> bool:
-    try:
-        import pyttsx3  # noqa: F401
-        return True
-    except Exception:
-        return False
+    return module_available("pyttsx3")
+
+# One engine on its own thread (chetna_tts.py); created on the first say()
+_TTS = None
+
+# Synthesized replies are cached as WAV files (chetna_audio.py) when a player is
+# available; CHETNA_AUDIO_CACHE_MB=0 turns the cache off.
+AUDIO_CACHE_DIR = os.getenv("CHETNA_AUDIO_CACHE", "cache/audio")
+AUDIO_CACHE_MB = float(os.getenv("CHETNA_AUDIO_CACHE_MB", "200"))
+
+def tts_service():
+    global _TTS
+    if _TTS is None:
+        cache = player = None
+        if AUDIO_CACHE_MB > 0:
+            player = find_player()
+            if player is not None:
+                cache = AudioCache(AUDIO_CACHE_DIR, int(AUDIO_CACHE_MB * 1024 * 1024))
+        _TTS = TtsService(max_pending=int(os.getenv("CHETNA_TTS_QUEUE", "4")), cache=cache, player=player)
+    return _TTS
 
-def say(text: str):
+@METRICS.timed("say")
+def say(text: str, wait: bool = False):
+    """Speak text without blocking the caller (wait=True blocks until it has been spoken)."""
     try:
-        import pyttsx3
-        engine = pyttsx3.init()
-        # Optional: select a female-ish voice if available
-        voices = engine.getProperty("voices")
-        for v in voices:
-            name = (v.name or "").lower()
-            if "female" in name or "zira" in name or "heera" in name or "susan" in name:
-                engine.setProperty("voice", v.id)
-                break
-        engine.setProperty("rate", 170)
-        engine.say(text)
-        engine.runAndWait()
+        tts_service().speak(text)
+        if wait:
+            tts_service().wait(timeout=30)
     except Exception:
         pass
 
+def cancel_speech():
+    """Stop talking: drop queued replies and cut the current one short."""
+    if _TTS is not None:
+        _TTS.cancel()
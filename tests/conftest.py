@@ -0,0 +1,40 @@
+# conftest.py
+# Shared fixtures: repo modules on sys.path, and the bot loaded against the shipped sample data
+
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# No background threads or exports while testing
+os.environ.setdefault("CHETNA_WATCH_SECONDS", "0")
+os.environ.setdefault("CHETNA_SNAPSHOT", "0")
+os.environ.setdefault("CHETNA_LLM_WARM", "0")
+os.environ.pop("CHETNA_METRICS_FILE", None)
+os.environ.pop("CHETNA_DELAY_FEED", None)
+os.environ.pop("CHETNA_DELAY_SOCKET", None)
+os.environ.pop("CHETNA_DELAY_REPLAY", None)
+
+
+def sample_path(name):
+    return os.path.join(ROOT, name)
+
+
+@pytest.fixture(scope="session")
+def bot(tmp_path_factory):
+    """botchetna imported from a scratch directory holding data/ as shipped (JSON preferred, as in production)."""
+    work = tmp_path_factory.mktemp("bot")
+    os.makedirs(work / "data")
+    for name in ("chetnasample_buses.json", "chetnasample_buses.csv", "chetnasample_routes.json"):
+        shutil.copy(sample_path(name), work / "data" / name)
+    cwd = os.getcwd()
+    os.chdir(work)
+    try:
+        import botchetna
+        yield botchetna
+    finally:
+        os.chdir(cwd)
@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta
+
+from chetna_analytics import ComplaintAnalytics, format_report
+from chetna_complaints import ComplaintStore
+
+
+def _analytics(tmp_path, ages_days):
+    store = ComplaintStore(str(tmp_path / "complaints.db"))
+    now = datetime.now()
+    for i, age in enumerate(ages_days):
+        store.add(str(200 + i % 2), f"driver was rude number {i}", when=now - timedelta(days=age))
+    return ComplaintAnalytics(store, max_days=31, categorize=lambda text: "behaviour")
+
+
+def test_hotspots_beyond_the_kept_days_are_clamped(tmp_path):
+    stats = _analytics(tmp_path, [0, 10, 40])
+    r = stats.report(90)
+    assert (r["days"], r["requested_days"], r["total"]) == (31, 90, 2)
+    assert format_report(r).startswith("Only the last 31 days are kept; showing those.\n2 complaints")
+
+
+def test_hotspots_within_the_window(tmp_path):
+    stats = _analytics(tmp_path, [0, 0, 0, 10])
+    r = stats.report(7)
+    assert r["total"] == 3 and r["top_buses"] == [("200", 2), ("201", 1)]
+    assert "Only the last" not in format_report(r)
+    assert stats.report(0)["days"] == 1
+
+
+def test_empty_report_still_mentions_the_clamp(tmp_path):
+    r = _analytics(tmp_path, []).report(60)
+    assert format_report(r) == "Only the last 31 days are kept; showing those.\nNo complaints in the last 31 days."
@@ -0,0 +1,18 @@
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+
+
+def test_suite_leaves_no_logs_in_the_working_directory(tmp_path):
+    code = ("import chetna_bench; "
+            "chetna_bench.run_suite(n_cities=10, n_routes=20, trips_per_route=2, utterances=300); "
+            "import chetnautils; print(chetnautils.LOG.path)")
+    env = {k: v for k, v in os.environ.items() if not k.startswith("CHETNA_")}
+    env.update(PYTHONPATH=ROOT, CHETNA_WATCH_SECONDS="0", CHETNA_LLM_WARM="0")
+    out = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, env=env,
+                         capture_output=True, text=True, timeout=300)
+    assert out.returncode == 0, out.stderr
+    assert "chetna-bench-" in out.stdout
+    assert os.listdir(tmp_path) == []
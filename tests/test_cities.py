@@ -0,0 +1,50 @@
+from chetna_cities import CityResolver, phonetic, skeleton, transliterate
+from chetna_loader import ChetnaLoader
+
+STOPS = ["Delhi", "Karnal", "Panipat", "Lucknow", "Agra", "Ambala", "Varanasi", "Sonipat"]
+
+
+def test_devanagari_names():
+    r = CityResolver(STOPS)
+    assert transliterate("करनाल") == "karanaal"
+    assert r.resolve("दिल्ली") == "Delhi"
+    assert r.resolve("करनाल") == "Karnal"
+    assert r.resolve("लखनऊ") == "Lucknow"
+    assert r.resolve("अंबाला") == "Ambala"
+
+
+def test_hinglish_spellings_and_aliases():
+    r = CityResolver(STOPS)
+    assert r.resolve("dilli") == "Delhi"
+    assert r.resolve("banaras") == "Varanasi"
+    assert r.resolve("sonepat") == "Sonipat"
+    assert r.resolve(" DELHI ") == "Delhi"
+    assert skeleton("dehli") == skeleton("delhi") == "dl"
+    assert phonetic("Panipatt") == "panipat"
+
+
+def test_typos_and_misses():
+    r = CityResolver(STOPS)
+    assert r.resolve("Karnl") == "Karnal"
+    assert r.resolve("panipath") == "Panipat"
+    assert r.resolve("xyz") is None
+    assert r.resolve("") is None
+
+
+def test_cache_evicts_least_recently_used():
+    r = CityResolver(STOPS, cache_size=2)
+    r.resolve("dilli")
+    r.resolve("karnl")
+    r.resolve("dilli")           # hit: now the most recent
+    r.resolve("agra")
+    assert list(r._cache) == ["dilli", "agra"]
+
+
+def test_plain_list_is_indexed_once():
+    rows = [{"bus_id": "1", "source": "Delhi", "destination": "Karnal", "time": "8:00 AM", "fare": "₹50"}]
+    assert ChetnaLoader.resolve_city(rows, "dilli") == "Delhi"
+    first = ChetnaLoader._as_timetable(rows)
+    assert ChetnaLoader._as_timetable(rows) is first
+    assert ChetnaLoader._as_timetable(list(rows)) is first          # same trips, new list
+    rows.append(dict(rows[0], bus_id="2"))
+    assert ChetnaLoader._as_timetable(rows) is not first
@@ -0,0 +1,70 @@
+import json
+import threading
+from datetime import datetime
+
+from chetna_complaints import ComplaintStore
+
+
+def test_tickets_are_sequential(tmp_path):
+    store = ComplaintStore(str(tmp_path / "c.db"))
+    tickets = [store.add("202", f"complaint {i}")["ticket_id"] for i in range(3)]
+    assert tickets == ["C-000001", "C-000002", "C-000003"]
+    assert store.count() == 3 and store.last_id() == 3
+
+
+def test_tickets_unique_across_stores_and_threads(tmp_path):
+    path = str(tmp_path / "c.db")
+    stores = [ComplaintStore(path), ComplaintStore(path)]
+    tickets = []
+
+    def work(store):
+        for i in range(25):
+            tickets.append(store.add("105", f"late {i}")["ticket_id"])
+
+    threads = [threading.Thread(target=work, args=(stores[i % 2],)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(set(tickets)) == len(tickets) == 100
+    assert stores[0].count() == 100
+
+
+def test_lookups(tmp_path):
+    store = ComplaintStore(str(tmp_path / "c.db"))
+    store.add("202", "dirty", when=datetime(2024, 1, 1))
+    second = store.add("105", "rude driver", when=datetime(2024, 1, 2))
+    store.add("202", "late", when=datetime(2024, 1, 3))
+    assert store.by_ticket(" c-000002 ") == second
+    assert store.by_ticket("C-999999") is None
+    assert [r["complaint"] for r in store.by_bus("202")] == ["late", "dirty"]
+    assert [r["complaint"] for r in store.by_bus(202, limit=1)] == ["late"]
+    assert store.first_id_since("2024-01-02") == 2
+    assert store.first_id_since("2025-01-01") == 0
+    assert [i for i, _ in store.iter_all(batch=2)] == [1, 2, 3]
+    assert [r["ticket_id"] for _, r in store.iter_all(after_id=1)] == ["C-000002", "C-000003"]
+
+
+def test_legacy_json_is_migrated_once(tmp_path):
+    legacy = tmp_path / "complaints.json"
+    legacy.write_text(json.dumps([
+        {"ticket_id": "C-4821", "bus_number": "202", "complaint": "dirty seats", "time": "2023-05-01T10:00:00"},
+        {"ticket_id": "C-1377", "bus_number": 105, "complaint": "rude", "time": "2023-05-02T10:00:00"},
+    ]), encoding="utf-8")
+    path = str(tmp_path / "c.db")
+    store = ComplaintStore(path, legacy_json=str(legacy))
+    assert store.by_ticket("C-4821")["complaint"] == "dirty seats"
+    assert store.by_bus("105")[0]["ticket_id"] == "C-1377"
+    assert store.add("202", "late")["ticket_id"] == "C-000003"
+    store.close()
+
+    again = ComplaintStore(path, legacy_json=str(legacy))
+    assert again.count() == 3
+
+
+def test_unreadable_legacy_json_is_skipped(tmp_path):
+    legacy = tmp_path / "complaints.json"
+    legacy.write_text("{not json", encoding="utf-8")
+    store = ComplaintStore(str(tmp_path / "c.db"), legacy_json=str(legacy))
+    assert store.count() == 0
+    assert store.add("202", "late")["ticket_id"] == "C-000001"
@@ -0,0 +1,73 @@
+import json
+import time
+
+from chetna_delays import DelayFeed, DelayStore, JsonlTail
+
+
+def _write(path, *records, end="\n"):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("\n".join(json.dumps(r) for r in records) + end)
+
+
+def test_tail_starts_at_end_of_file(tmp_path):
+    path = tmp_path / "feed.jsonl"
+    _write(path, {"bus_id": "202", "delay": 40})
+    feed = DelayFeed(DelayStore(), [JsonlTail(str(path))])
+    assert feed.apply(feed.sources[0].poll()) == 0
+    _write(path, {"bus_id": "101", "delay": 5})
+    feed.apply(feed.sources[0].poll())
+    assert feed.store.get("202") is None
+    assert feed.store.get("101") == 5
+
+
+def test_tail_skips_a_half_written_line_at_start(tmp_path):
+    path = tmp_path / "feed.jsonl"
+    _write(path, {"bus_id": "202", "delay": 40})
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"bus_id": "303", "del')
+    tail = JsonlTail(str(path))
+    assert tail.poll() == []
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('ay": 9}\n{"bus_id": "404", "delay": 1}\n')
+    assert [json.loads(line)["bus_id"] for line in tail.poll()] == ["404"]
+
+
+def test_history_keeps_only_timestamped_records(tmp_path):
+    path = tmp_path / "feed.jsonl"
+    now = time.time()
+    _write(path, {"bus_id": "202", "delay": 40}, {"bus_id": "101", "delay": 5, "t": now - 60},
+           {"bus_id": "303", "delay": 8, "t": now - 7200})
+    tail = JsonlTail(str(path), from_start=True)
+    feed = DelayFeed(DelayStore(ttl=1800), [tail])
+    feed.apply(tail.poll())
+    assert tail.untimed == 1
+    assert feed.store.current() == {"101": 5}     # 303 is older than the TTL
+    _write(path, {"bus_id": "202", "delay": 3})   # live lines default to now
+    feed.apply(tail.poll())
+    assert feed.store.get("202") == 3
+
+
+def test_file_created_after_start_is_read_whole(tmp_path):
+    path = tmp_path / "feed.jsonl"
+    tail = JsonlTail(str(path))
+    assert tail.poll() == []
+    _write(path, {"bus_id": "202", "delay": 4})
+    assert len(tail.poll()) == 1
+
+
+def test_store_ignores_older_updates():
+    store = DelayStore(ttl=600)
+    assert store.update("202", 5, t=1000)
+    assert not store.update("202", 9, t=900)
+    assert store.get("202", now=1100) == 5
+    assert store.get("202", now=1700) is None
+
+
+def test_bad_records_are_counted_not_fatal():
+    feed = DelayFeed(DelayStore())
+    lines = ['{"bus_id": "1", "delay": Infinity}', '{"bus_id": "1", "delay": NaN}',
+             '{"bus_id": "1", "delay": 3, "t": Infinity}', '{"bus_id": "2"}']
+    assert feed.apply(lines) == 0
+    assert feed.bad == 4
+    assert feed.apply(['{"bus_id": "1", "delay": 3, "trip": 5}']) == 1
+    assert feed.store.get("1", trip="5") == 3
@@ -0,0 +1,109 @@
+from chetna_matcher import KeywordMatcher
+from chetnaintent import complaint_category, get_intent, get_intents
+
+# Intent and entities returned by the get_intent that used _has_any/regex scans
+# (before the compiled matcher), for the bench corpus templates and a few
+# utterances that hit several keyword tables at once. "lang" and "category"
+# are left out: language detection changed on purpose, and category is new.
+GOLDEN = [
+    ('hi', {'intent': 'greetings'}),
+    ('hello there', {'intent': 'greetings'}),
+    ('what is the fare of bus 202', {'intent': 'fare_info', 'bus_number': '202'}),
+    ('ticket price for 202', {'intent': 'fare_info', 'bus_number': '202'}),
+    ('timing of 202', {'intent': 'timing_info', 'bus_number': '202'}),
+    ('when does bus 202 leave', {'intent': 'unknown'}),
+    ('where is bus 202', {'intent': 'track_bus', 'bus_number': '202', 'source': None, 'destination': None}),
+    ('track 202', {'intent': 'track_bus', 'bus_number': '202', 'source': None, 'destination': None}),
+    ('is 202 on time?', {'intent': 'timing_info', 'bus_number': '202'}),
+    ('bus 202 is delayed', {'intent': 'status_info', 'bus_number': '202'}),
+    ('complaint bus 202 driver rude', {'intent': 'lodge_complaint', 'bus_number': '202', 'complaint_text': 'complaint bus 202 driver rude'}),
+    ('the bus 202 was dirty', {'intent': 'lodge_complaint', 'bus_number': '202', 'complaint_text': 'the bus 202 was dirty'}),
+    ('buses from Delhi to Karnal', {'intent': 'route_info', 'source': 'Delhi', 'destination': 'Karnal', 'period': None, 'ask_next': False}),
+    ('next bus from Delhi to Karnal', {'intent': 'route_info', 'source': 'Delhi', 'destination': 'Karnal', 'period': None, 'ask_next': True}),
+    ('evening bus Delhi to Karnal', {'intent': 'route_info', 'source': 'Delhi', 'destination': 'Karnal', 'period': 'evening', 'ask_next': False}),
+    ('202', {'intent': 'unknown'}),
+    ('tell me a joke', {'intent': 'unknown'}),
+    ('what is the weather today', {'intent': 'unknown'}),
+    ('namaste', {'intent': 'greetings'}),
+    ('bus 202 ka kiraya kya hai', {'intent': 'fare_info', 'bus_number': '202'}),
+    ('202 kab nikalti hai', {'intent': 'timing_info', 'bus_number': '202'}),
+    ('202 kitne baje aayegi', {'intent': 'timing_info', 'bus_number': '202'}),
+    ('202 kidhar hai', {'intent': 'track_bus', 'bus_number': '202', 'source': None, 'destination': None}),
+    ('bus 202 abhi kaha hai', {'intent': 'track_bus', 'bus_number': '202', 'source': None, 'destination': None}),
+    ('202 late hai kya', {'intent': 'status_info', 'bus_number': '202'}),
+    ('202 ka status batao', {'intent': 'status_info', 'bus_number': '202'}),
+    ('bus 202 ka driver bahut rude tha shikayat', {'intent': 'lodge_complaint', 'bus_number': '202', 'complaint_text': 'bus 202 ka driver bahut rude tha shikayat'}),
+    ('Delhi se Karnal tak', {'intent': 'route_info', 'source': 'Delhi', 'destination': 'Karnal', 'period': None, 'ask_next': False}),
+    ('Delhi se Karnal agla bus', {'intent': 'route_info', 'source': 'Delhi', 'destination': 'Karnal', 'period': None, 'ask_next': True}),
+    ('Delhi se Karnal shaam ki bus', {'intent': 'route_info', 'source': 'Delhi', 'destination': 'Karnal', 'period': 'evening', 'ask_next': False}),
+    ('mujhe ghar jana hai', {'intent': 'unknown'}),
+    ('kya haal hai', {'intent': 'unknown'}),
+    ('नमस्ते', {'intent': 'greetings'}),
+    ('बस 202 का किराया', {'intent': 'fare_info', 'bus_number': '202'}),
+    ('202 कब निकलती है', {'intent': 'timing_info', 'bus_number': '202'}),
+    ('202 कहाँ है', {'intent': 'track_bus', 'bus_number': '202', 'source': None, 'destination': None}),
+    ('202 लेट है क्या', {'intent': 'status_info', 'bus_number': '202'}),
+    ('बस 202 की शिकायत ड्राइवर बदतमीज', {'intent': 'lodge_complaint', 'bus_number': '202', 'complaint_text': 'बस 202 की शिकायत ड्राइवर बदतमीज'}),
+    ('Delhi से Karnal तक', {'intent': 'route_info', 'source': 'Delhi', 'destination': 'Karnal', 'period': None, 'ask_next': False}),
+    ('Delhi से Karnal सुबह की बस', {'intent': 'route_info', 'source': 'Delhi', 'destination': 'Karnal', 'period': 'morning', 'ask_next': False}),
+    ('आज मौसम कैसा है', {'intent': 'unknown'}),
+    ('Hi, bus 202 fare?', {'intent': 'greetings'}),
+    ('hello where is 105', {'intent': 'greetings'}),
+    ('from delhi to agra ticket', {'intent': 'fare_info', 'bus_number': None}),
+    ('track bus from panipat to karnal', {'intent': 'track_bus', 'bus_number': None, 'source': 'panipat', 'destination': 'karnal'}),
+    ('bus 202 kab aayegi delhi se', {'intent': 'timing_info', 'bus_number': '202'}),
+    ('dilli se karnal raat ki bus', {'intent': 'route_info', 'source': 'Dilli', 'destination': 'Karnal', 'period': 'night', 'ask_next': False}),
+    ('complaint: bus 105 late and dirty', {'intent': 'status_info', 'bus_number': '105'}),
+    ('hiking trip', {'intent': 'unknown'}),
+    ('karnal to delhi next morning', {'intent': 'route_info', 'source': 'Karnal', 'destination': 'Delhi', 'period': 'morning', 'ask_next': True}),
+]
+
+
+def test_matches_the_old_get_intent():
+    for text, expected in GOLDEN:
+        got = {k: v for k, v in get_intent(text).items() if k not in ("lang", "category")}
+        assert got == expected, text
+
+
+def test_greeting_wins_over_every_other_intent():
+    assert get_intent("hello, fare of bus 202 from delhi to agra")["intent"] == "greetings"
+
+
+def test_keyword_intents_follow_priority_order():
+    assert get_intent("ticket time for 202")["intent"] == "fare_info"
+    assert get_intent("where is 202, what time")["intent"] == "timing_info"
+    assert get_intent("202 late, where is it")["intent"] == "track_bus"
+    assert get_intent("202 late, driver rude")["intent"] == "status_info"
+    assert get_intent("driver rude delhi to agra")["intent"] == "lodge_complaint"
+
+
+def test_greeting_words_match_whole_words_only():
+    assert get_intent("hiking trip")["intent"] == "unknown"
+    assert get_intent("Hi, bus 202")["intent"] == "greetings"
+
+
+def test_route_entities_only_where_needed():
+    d = get_intent("delhi se karnal")
+    assert (d["source"], d["destination"]) == ("Delhi", "Karnal")
+    assert "source" not in get_intent("fare delhi to karnal")
+
+
+def test_complaint_category():
+    d = get_intent("bus 202 was dirty")
+    assert (d["intent"], d["category"]) == ("lodge_complaint", "cleanliness")
+    assert complaint_category("driver was rude and bus was dirty") == "behaviour"
+    assert complaint_category("seat broken problem") == "other"
+
+
+def test_get_intents_keeps_order_across_chunks():
+    texts = ["hi", "fare 202", "delhi se karnal", "tell me a joke", "track 105"]
+    assert list(get_intents(iter(texts), chunk_size=2)) == [get_intent(t) for t in texts]
+
+
+def test_matcher_substring_and_whole_word():
+    m = KeywordMatcher([("se", "se", True), ("late", "late", False), ("he", "he", False), ("she", "she", False)])
+    assert m.find("case") == set()
+    assert m.find("delhi se") == {"se"}
+    assert m.find("chocolate") == {"late"}
+    assert m.find("ushers") == {"he", "she"}   # overlapping keywords via failure links
+    assert m.labels == {"se", "late", "he", "she"}
@@ -0,0 +1,38 @@
+import chetnautils
+from chetna_bench import utterance_corpus
+from chetnaintent import get_intent
+from chetnautils import detect_language
+
+
+def test_script_and_markers():
+    assert detect_language("") == "en"
+    assert detect_language("बस 202 कहाँ है") == "hi"
+    assert detect_language("Namaste") == "hi-latn"
+    assert detect_language("bus 202 kab nikalti hai") == "hi-latn"
+    assert detect_language("what is the fare of bus 202") == "en"
+
+
+def test_markers_need_word_boundaries():
+    # "se", "ka", "ke", "hai" inside English words used to count as Hinglish
+    assert detect_language("this is a case of late bus") == "en"
+    assert detect_language("please take the kite to the market") == "en"
+    assert detect_language("delhi se karnal tak") == "hi-latn"
+
+
+def test_single_marker_is_english_without_the_model(monkeypatch):
+    monkeypatch.setattr(chetnautils, "USE_LANGDETECT", False)
+    chetnautils._model_language.cache_clear()
+    assert detect_language.__wrapped__("which bus goes there") == "en"
+
+
+def test_results_are_memoized():
+    detect_language.cache_clear()
+    detect_language("agla bus kab hai")
+    detect_language("agla bus kab hai")
+    info = detect_language.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+
+
+def test_get_intent_agrees_with_detect_language():
+    for text in utterance_corpus(300, seed=2):
+        assert get_intent(text)["lang"] == detect_language(text.strip()), text
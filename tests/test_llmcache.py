@@ -0,0 +1,54 @@
+import chetna_llmcache
+from chetna_llmcache import ResponseCache, normalize_prompt
+
+
+def test_keys_ignore_case_and_punctuation_but_not_language():
+    cache = ResponseCache()
+    assert normalize_prompt("  What's the  WEATHER? ") == "what s the weather"
+    cache.put("What's the weather?", "en", "Sunny")
+    assert cache.get("what's the weather", "en") == "Sunny"
+    assert cache.get("What's the weather?", "hi-latn") is None
+    assert cache.stats()["hits_exact"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_near_duplicate_prompts():
+    cache = ResponseCache(similarity=0.75)
+    cache.put("tell me about the delhi metro timings", "en", "A")
+    assert cache.get("tell me about delhi metro timings", "en") == "A"          # 6 of 7 words
+    assert cache.get("tell me about the agra fort", "en") is None
+    cache.put("hi there", "en", "B")
+    assert cache.get("hi there you", "en") is None                              # short prompts: exact only
+    assert cache.stats()["hits_similar"] == 1
+
+
+def test_least_recently_used_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.put("one", "en", "1")
+    cache.put("two", "en", "2")
+    assert cache.get("one", "en") == "1"      # now the most recent
+    cache.put("three", "en", "3")
+    assert cache.get("two", "en") is None
+    assert cache.get("one", "en") == "1" and cache.get("three", "en") == "3"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(chetna_llmcache.time, "time", lambda: now[0])
+    cache = ResponseCache(ttl=60)
+    cache.put("old question here", "en", "x")
+    now[0] += 61
+    assert cache.get("old question here", "en") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_survives_restart_and_compacts(tmp_path):
+    path = str(tmp_path / "cache" / "answers.jsonl")
+    cache = ResponseCache(path, max_entries=2)
+    for i in range(6):
+        cache.put(f"question {i}", "en", str(i))
+    with open(path, encoding="utf-8") as f:
+        assert len(f.readlines()) <= 4          # compacted at twice the entry limit
+    again = ResponseCache(path, max_entries=2)
+    assert again.get("question 5", "en") == "5"
+    assert again.get("question 0", "en") is None
@@ -0,0 +1,48 @@
+import threading
+from contextlib import contextmanager
+
+from chetna_llmworker import LlmWorker
+
+
+class SlowModel:
+    """Streams the prompt back word by word; the first prompt blocks until released."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.prompts = []
+
+    @contextmanager
+    def chat_session(self, system_prompt=None):
+        yield
+
+    def generate(self, prompt, max_tokens=None, temp=None, streaming=False):
+        self.prompts.append(prompt)
+        if len(self.prompts) == 1:
+            self.release.wait(5)
+        return iter(w + " " for w in prompt.split())
+
+
+class Cache(dict):
+    def put(self, prompt, lang, answer):
+        self[prompt] = answer
+
+
+def test_queued_job_that_timed_out_is_dropped():
+    model, cache = SlowModel(), Cache()
+    worker = LlmWorker(lambda: model, cache=cache, keep_late=True)
+    assert worker.ask("first question", "en", "sys", deadline=0.05) is None   # in progress
+    assert worker.ask("second question", "en", "sys", deadline=0.05) is None  # still queued
+    model.release.set()
+    assert worker.ask("third question", "en", "sys", deadline=5) == "third question"
+    assert model.prompts == ["first question", "third question"]
+    assert cache == {"first question": "first question", "third question": "third question"}
+    assert (worker.timeouts, worker.dropped, worker.late_cached) == (2, 1, 1)
+
+
+def test_answer_within_deadline_streams_sentences():
+    model, sentences = SlowModel(), []
+    model.release.set()
+    worker = LlmWorker(lambda: model)
+    answer = worker.ask("Hello there. Bye now.", "en", "sys", deadline=5, on_sentence=sentences.append)
+    assert answer == "Hello there. Bye now."
+    assert sentences == ["Hello there.", "Bye now."]
@@ -0,0 +1,114 @@
+import io
+import json
+
+import pytest
+
+from chetna_loader import ChetnaLoader, iter_json_array, normalize_row
+
+GOOD = {"bus_id": "202", "source": "Panipat", "destination": "Delhi", "time": "8:30 AM", "fare": "₹45"}
+
+
+def _items(text, chunk_size=7):
+    return list(iter_json_array(io.StringIO(text), chunk_size=chunk_size))
+
+
+# ---------- iter_json_array ----------
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 1 << 16])
+def test_yields_each_element_whatever_the_chunking(chunk_size):
+    rows = [dict(GOOD, bus_id=str(i), note="a, b ] { }") for i in range(20)]
+    assert _items(json.dumps(rows, indent=1), chunk_size) == rows
+
+
+def test_empty_and_whitespace_arrays():
+    assert _items("[]") == []
+    assert _items("  [ \n ]  ") == []
+
+
+def test_bad_record_is_reported_and_skipped():
+    text = '[{"bus_id": "1"}, {"bus_id": 2 oops}, {"bus_id": "3"}]'
+    items = _items(text)
+    assert items[0] == {"bus_id": "1"} and items[-1] == {"bus_id": "3"}
+    assert len(items) == 3 and isinstance(items[1], ValueError)
+
+
+def test_truncated_file_yields_what_is_complete():
+    items = _items('[{"bus_id": "1"}, {"bus_id": "2"}, {"bus_id": "3", "sou')
+    assert items[:2] == [{"bus_id": "1"}, {"bus_id": "2"}]
+    assert all(isinstance(x, ValueError) for x in items[2:])
+
+
+def test_top_level_must_be_an_array():
+    with pytest.raises(ValueError):
+        _items('{"bus_id": "1"}')
+
+
+def test_oversized_record_is_rejected():
+    text = '[{"bus_id": "1", "pad": "' + "x" * 500 + '"}, {"bus_id": "2"}]'
+    items = list(iter_json_array(io.StringIO(text), chunk_size=16, max_record=64))
+    assert isinstance(items[0], ValueError)
+    assert items[-1] == {"bus_id": "2"}
+
+
+# ---------- normalize_row ----------
+def test_normalize_strips_and_keeps_extra_fields():
+    row = normalize_row({"bus_id": 202, "source": " Panipat ", "destination": "Delhi", "time": " 8:30 AM",
+                         "fare": " ₹45 ", "duration": "75", None: ["surplus"]})
+    assert row == {"bus_id": "202", "source": "Panipat", "destination": "Delhi", "time": "8:30 AM",
+                   "fare": "₹45", "duration": "75"}
+
+
+@pytest.mark.parametrize("row, reason", [
+    ([1, 2], "expected an object, got list"),
+    (dict(GOOD, bus_id=""), "missing bus_id"),
+    ({k: v for k, v in GOOD.items() if k != "source"}, "missing source"),
+    (dict(GOOD, destination="   "), "missing destination"),
+    (dict(GOOD, time="25:00"), "bad time '25:00'"),
+    (dict(GOOD, fare="free"), "bad fare 'free'"),
+    (dict(GOOD, duration="70000"), "bad duration '70000'"),
+    (dict(GOOD, duration="-5"), "bad duration '-5'"),
+    (dict(GOOD, duration="1h"), "bad duration '1h'"),
+    (dict(GOOD, duration=float("nan")), "bad duration nan"),
+])
+def test_normalize_rejections(row, reason):
+    with pytest.raises(ValueError, match="^" + reason.replace("(", r"\(") + "$"):
+        normalize_row(row)
+
+
+def test_missing_fare_is_allowed():
+    assert normalize_row({k: v for k, v in GOOD.items() if k != "fare"})["fare"] == ""
+
+
+# ---------- load_streaming ----------
+@pytest.mark.parametrize("storage", ["dict", "columnar"])
+def test_streaming_load_reports_bad_rows(tmp_path, storage):
+    path = tmp_path / "buses.csv"
+    path.write_text("bus_id,source,destination,time,fare\n"
+                    "202,Panipat,Delhi,8:30 AM,₹45\n"
+                    ",Delhi,Karnal,9:00 AM,₹50\n"
+                    "101,Delhi,Karnal,99:00 AM,₹50\n"
+                    "105,Rohtak,Delhi,9:15 AM,₹40\n", encoding="utf-8")
+    loader = ChetnaLoader(str(path), storage=storage)
+    tt = loader.load_streaming(chunk_size=1)
+    assert sorted(t["bus_id"] for t in tt) == ["105", "202"]
+    report = loader.last_report
+    assert (report.rows_ok, report.rows_bad) == (2, 2)
+    assert report.errors == [(2, "missing bus_id"), (3, "bad time '99:00 AM'")]
+
+
+def test_streaming_json_load(tmp_path):
+    path = tmp_path / "buses.json"
+    path.write_text(json.dumps([GOOD, {"bus_id": "x"}, dict(GOOD, bus_id="101")]), encoding="utf-8")
+    loader = ChetnaLoader(str(path))
+    assert [t["bus_id"] for t in loader.load()] == ["202", "101"]
+    assert loader.last_report.errors == [(2, "missing source")]
+
+
+def test_huge_duration_is_a_rejected_row_not_a_crash(tmp_path):
+    path = tmp_path / "buses.csv"
+    path.write_text("bus_id,source,destination,time,fare,duration\n"
+                    "202,Panipat,Delhi,8:30 AM,₹45,75\n"
+                    "101,Delhi,Karnal,10:00 AM,₹50,70000\n", encoding="utf-8")
+    loader = ChetnaLoader(str(path), storage="columnar")
+    tt = loader.load()
+    assert [t["bus_id"] for t in tt] == ["202"]
+    assert loader.last_report.errors == [(2, "bad duration '70000'")]
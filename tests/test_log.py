@@ -0,0 +1,59 @@
+import gzip
+import json
+import os
+
+from chetna_log import LogWriter
+
+
+def _lines(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def test_records_are_batched_and_flushed(tmp_path):
+    path = str(tmp_path / "chat.jsonl")
+    log = LogWriter(path, fmt="json", flush_interval=60, batch_size=4)
+    for i in range(10):
+        log.write({"kind": "chat", "user": f"q{i}", "bot": "a"})
+    log.flush()
+    assert [json.loads(line)["user"] for line in _lines(path)] == [f"q{i}" for i in range(10)]
+    log.close()
+
+
+def test_text_format(tmp_path):
+    path = str(tmp_path / "chat.txt")
+    log = LogWriter(path)
+    log.write({"kind": "event", "message": "USER: hi", "ts": "2026-01-01 10:00:00"})
+    log.close()
+    assert _lines(path) == ["[2026-01-01 10:00:00] USER: hi"]
+
+
+def test_rotation_compresses_the_old_segment(tmp_path):
+    path = str(tmp_path / "chat.txt")
+    log = LogWriter(path, max_bytes=50, rotate_daily=False)
+    log.write({"kind": "event", "message": "x" * 60})
+    log.flush()
+    log.write({"kind": "event", "message": "second"})
+    log.close()
+    assert _lines(path)[0].endswith("] second")
+    segments = [n for n in os.listdir(tmp_path) if n.endswith(".txt.gz")]
+    assert len(segments) == 1 and segments[0].startswith("chat-")
+    with gzip.open(tmp_path / segments[0], "rt", encoding="utf-8") as f:
+        assert "x" * 60 in f.read()
+
+
+def test_bad_record_is_skipped_and_writer_keeps_going(tmp_path):
+    path = str(tmp_path / "chat.jsonl")
+    log = LogWriter(path, fmt="json")
+    log.write({"kind": "chat", "user": object()})
+    log.write({"kind": "chat", "user": "ok"})
+    log.flush()
+    assert [json.loads(line)["user"] for line in _lines(path)] == ["ok"]
+    assert log.bad == 1 and log._thread.is_alive()
+    log.close()
+
+    text = LogWriter(str(tmp_path / "chat.txt"))
+    text.write({"kind": "event"})             # no "message"
+    text.write({"kind": "event", "message": "fine"})
+    text.close()
+    assert _lines(str(tmp_path / "chat.txt"))[0].endswith("] fine") and text.bad == 1
@@ -0,0 +1,87 @@
+import contextvars
+import threading
+import time
+
+from chetna_metrics import BUCKETS, Metrics, format_stats
+
+
+def _counts(metrics):
+    return {k: v[0] for k, v in metrics.summary(("stage", "intent", "lang")).items()}
+
+
+def test_stage_outside_a_turn_is_unlabelled():
+    m = Metrics()
+    with m.stage("lookup"):
+        pass
+    assert _counts(m) == {("lookup", "-", "-"): 1}
+
+
+def test_turn_labels_its_stages_when_it_ends():
+    m = Metrics()
+    with m.turn() as turn:
+        with m.stage("get_intent"):
+            pass
+        assert _counts(m) == {}                # held back until the turn ends
+        turn.label({"intent": "fare_info", "lang": "en"})
+    assert _counts(m) == {("get_intent", "fare_info", "en"): 1, ("turn", "fare_info", "en"): 1}
+
+
+def test_nested_turn_belongs_to_the_outer_one():
+    m = Metrics()
+    with m.turn({"intent": "unknown", "lang": "en"}):
+        with m.turn({"intent": "route_info", "lang": "hi"}) as inner:
+            with m.stage("lookup"):
+                pass
+        assert _counts(m) == {}                # the inner turn records nothing itself
+        assert (inner.intent, inner.lang) == ("route_info", "hi")
+    assert _counts(m) == {("lookup", "route_info", "hi"): 1, ("turn", "route_info", "hi"): 1}
+
+
+def test_stages_record_their_own_time_only():
+    m = Metrics()
+    with m.turn({"intent": "x", "lang": "en"}):
+        with m.stage("outer"):
+            with m.stage("inner"):
+                time.sleep(0.02)
+    s = m.summary(("stage",))
+    assert s[("inner",)][3] >= 0.02
+    assert s[("outer",)][3] < 0.01
+
+
+def test_worker_thread_joins_the_turn_through_its_context():
+    m = Metrics()
+
+    def save():
+        with m.stage("save"):
+            pass
+
+    with m.turn({"intent": "lodge_complaint", "lang": "en"}):
+        t = threading.Thread(target=contextvars.copy_context().run, args=(save,))
+        t.start()
+        t.join()
+    assert ("save", "lodge_complaint", "en") in _counts(m)
+
+
+def test_disabled_metrics_record_nothing():
+    m = Metrics(enabled=False)
+
+    @m.timed("f")
+    def f():
+        return 3
+
+    with m.turn() as turn:
+        turn.label({"intent": "x"})
+        with m.stage("s"):
+            assert f() == 3
+    assert _counts(m) == {}
+    assert format_stats(m).startswith("Metrics are off")
+
+
+def test_prometheus_buckets_are_cumulative():
+    m = Metrics()
+    m.observe("s", "i", "en", BUCKETS[0] / 2)
+    m.observe("s", "i", "en", 100.0)
+    text = m.to_prometheus()
+    assert f'le="{BUCKETS[0]!r}"}} 1' in text
+    assert 'le="+Inf"} 2' in text
+    assert 'chetna_stage_seconds_count{stage="s",intent="i",lang="en"} 2' in text
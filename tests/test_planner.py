@@ -0,0 +1,69 @@
+import os
+
+from chetna_loader import ChetnaLoader, Timetable
+from chetna_planner import DAY, JourneyPlanner
+
+# 202 reaches Delhi at 9:45, in time to change to 101 at 10:00
+CONNECTING = os.path.join(os.path.dirname(__file__), "data", "connecting_buses.json")
+
+
+def _tt(*rows):
+    return Timetable({"bus_id": b, "source": s, "destination": d, "time": t, "duration": m}
+                     for b, s, d, t, m in rows)
+
+
+def _legs(journey):
+    return [(t["bus_id"], d, a) for t, d, a in journey.legs]
+
+
+def test_panipat_to_karnal_connects_in_delhi():
+    tt = ChetnaLoader(CONNECTING).load()
+    j = JourneyPlanner(tt).earliest_arrival("Panipat", "Karnal", 0)
+    assert [leg[0] for leg in _legs(j)] == ["202", "101"]
+    assert j.transfers == 1
+    assert j.leg_days() == [(0, 0), (0, 0)]
+
+
+def test_bot_answers_panipat_to_karnal(bot, monkeypatch):
+    monkeypatch.setattr(bot.TIMETABLE, "_current", ChetnaLoader(CONNECTING).load())
+    reply, _ = bot.handle_intent("buses from Panipat to Karnal", dry_run=True)
+    assert "Connecting options" in reply
+    assert "202" in reply and "101" in reply
+
+
+def test_minimum_connection_time():
+    rows = [("1", "A", "B", "8:00 AM", 60), ("2", "B", "C", "9:10 AM", 30), ("3", "B", "C", "9:15 AM", 30)]
+    p = JourneyPlanner(_tt(*rows))
+    # arrive B 9:00; bus 2 leaves after 10 minutes, too soon to change
+    assert _legs(p.earliest_arrival("A", "C")) == [("1", 480, 540), ("3", 555, 585)]
+    assert _legs(JourneyPlanner(_tt(*rows), min_transfer=10).earliest_arrival("A", "C"))[1][0] == "2"
+
+
+def test_staying_on_the_same_bus_needs_no_transfer_time():
+    rows = [("7", "A", "B", "8:00 AM", 60), ("7", "B", "C", "9:00 AM", 30), ("8", "B", "C", "9:05 AM", 30)]
+    p = JourneyPlanner(_tt(*rows))
+    j = p.earliest_arrival("A", "C")
+    assert _legs(j) == [("7", 480, 540), ("7", 540, 570)]
+    assert j.transfers == 0
+    assert _legs(p.fewest_transfers("A", "C")) == _legs(j)
+
+
+def test_search_rolls_into_the_next_day():
+    rows = [("1", "A", "B", "10:00 PM", 60), ("2", "B", "C", "6:00 AM", 60)]
+    p = JourneyPlanner(_tt(*rows))
+    j = p.earliest_arrival("A", "C", 21 * 60)
+    assert _legs(j) == [("1", 1320, 1380), ("2", DAY + 360, DAY + 420)]
+    assert j.leg_days() == [(0, 0), (1, 1)]
+    assert _legs(p.fewest_transfers("A", "C", 21 * 60)) == _legs(j)
+    # missed today's last bus out of A: take tomorrow's
+    assert _legs(p.earliest_arrival("A", "B", 23 * 60)) == [("1", DAY + 1320, DAY + 1380)]
+    # the search stops after the next day
+    assert p.earliest_arrival("A", "C", 23 * 60) is None
+
+
+def test_prefers_arrival_over_fewer_changes():
+    rows = [("1", "A", "C", "8:00 AM", 300), ("2", "A", "B", "8:00 AM", 30), ("3", "B", "C", "9:00 AM", 30)]
+    p = JourneyPlanner(_tt(*rows))
+    assert [leg[0] for leg in _legs(p.earliest_arrival("A", "C"))] == ["2", "3"]
+    assert [leg[0] for leg in _legs(p.fewest_transfers("A", "C"))] == ["1"]
+    assert len(p.plan("A", "C")) == 2
@@ -0,0 +1,63 @@
+import random
+
+import pytest
+
+from chetna_bench import synthetic_network
+from chetna_loader import ChetnaLoader, Timetable
+from chetna_positions import PositionEngine, load_routes
+
+from conftest import sample_path
+
+
+def _network():
+    rows = list(synthetic_network(n_cities=30, n_routes=120, trips_per_route=6, seed=3))
+    rng = random.Random(4)
+    routes = {}
+    for r in rows[::12]:   # give some routes intermediate stops
+        via = [f"Stop{rng.randrange(100)}" for _ in range(rng.randint(1, 3))]
+        stops = [r["source"], *via, r["destination"]]
+        routes[(r["source"].lower(), r["destination"].lower())] = (stops, [rng.randint(5, 40) for _ in via + [0]])
+    delays = {r["bus_id"]: rng.randint(0, 30) for r in rows[::7]}
+    return Timetable(rows), routes, delays
+
+
+def _frame(engine, now):
+    delay = engine._delay_vector()
+    return [[float(x) for x in col] for col in engine.compute(now, delay)]
+
+
+def test_numpy_and_fallback_give_the_same_frame():
+    pytest.importorskip("numpy")
+    tt, routes, delays = _network()
+    fast = PositionEngine(tt, routes, lambda: delays, use_numpy=True)
+    slow = PositionEngine(tt, routes, lambda: delays, use_numpy=False)
+    assert fast.use_numpy and not slow.use_numpy
+    for now in (0.0, 5 * 60 + 7.5, 12 * 60, 17 * 60 + 59.9, 23 * 60 + 30):
+        a, b = _frame(fast, now), _frame(slow, now)
+        assert a[0] == b[0] and a[1] == b[1], now               # active, segment
+        assert a[2] == pytest.approx(b[2], abs=1e-9)            # progress within segment
+        assert a[3] == pytest.approx(b[3], abs=1e-9)            # progress along the trip
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_locate_on_the_sample_routes(use_numpy):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    tt = ChetnaLoader(sample_path("chetnasample_buses.csv")).load()
+    routes = load_routes(sample_path("chetnasample_routes.json"))
+
+    def at(minutes, delays=None):
+        return PositionEngine(tt, routes, (lambda: delays) if delays else None, tick=1e9,
+                              use_numpy=use_numpy, clock=lambda: minutes)
+
+    # 202 leaves Panipat at 8:30 on Panipat-Samalkha-Ganaur-Sonipat-Delhi (20+15+20+35 min)
+    pos = at(8 * 60 + 32).locate("202")
+    assert pos["state"] == "running" and pos["near"] == "Panipat"
+    pos = at(8 * 60 + 40).locate("202")
+    assert pos["between"] == ("Panipat", "Samalkha") and pos["near"] is None
+    pos = at(8 * 60 + 20).locate("202")
+    assert pos["state"] == "waiting" and pos["departs"] == "8:30 AM"
+    pos = at(8 * 60 + 35, {"202": 10}).locate("202")
+    assert pos["state"] == "waiting" and pos["departs"] == "8:40 AM" and pos["delay"] == 10
+    assert at(23 * 60 + 50).locate("202")["state"] == "done"
+    assert at(12 * 60).locate("9999") is None
@@ -0,0 +1,25 @@
+from chetnautils import PROMPTS, fixed_prompts, prompt
+
+
+def test_every_prompt_has_three_languages():
+    for name, texts in PROMPTS.items():
+        assert len(texts) == 3 and all(t.strip() for t in texts), name
+
+
+def test_fixed_prompts_lists_each_text_once():
+    texts = fixed_prompts()
+    assert len(texts) == len(set(texts)) == 3 * len(PROMPTS)
+    assert "Please tell me the bus number to check the fare." in texts
+
+
+def test_prompt_picks_the_language():
+    assert prompt("goodbye", "en") == "Goodbye! Have a safe journey."
+    assert prompt("goodbye", "hi-latn") == "Goodbye! Aapki yatra shubh ho."
+    assert prompt("goodbye", "xx") == "Goodbye! Have a safe journey."
+
+
+def test_bot_replies_come_from_the_table(bot):
+    reply, _ = bot.handle_intent("fare of bus", dry_run=True)
+    assert reply in fixed_prompts()
+    reply, _ = bot.handle_intent("hello", dry_run=True)
+    assert reply == prompt("greeting", "en")
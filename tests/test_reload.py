@@ -0,0 +1,149 @@
+import csv
+import os
+
+from chetna_loader import ChetnaLoader, LoadReport, Timetable, apply_delta_ops
+from chetna_reload import TimetableReloader, format_stats
+
+FIELDS = ("bus_id", "source", "destination", "time", "fare")
+
+
+def _write_csv(path, n, bad=0, mtime=None):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(FIELDS)
+        for i in range(n):
+            w.writerow((str(100 + i), "Delhi", "Karnal", f"{i % 12 + 1}:00 AM", "₹50"))
+        for i in range(bad):
+            w.writerow((str(900 + i), "Delhi", "", "9:00 AM", "₹50"))
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+
+
+def _reloader(tmp_path, n=100, **kw):
+    path = tmp_path / "buses.csv"
+    _write_csv(path, n, mtime=1_000_000_000)
+    return path, TimetableReloader(ChetnaLoader(str(path)), **kw)
+
+
+def test_changed_file_is_loaded_once_it_is_stable(tmp_path):
+    path, r = _reloader(tmp_path)
+    _write_csv(path, 120, mtime=2_000_000_000)
+    assert r.check() is None                 # first sight of the change: wait
+    assert len(r.current) == 100
+    assert r.check()["kind"] == "full"
+    assert len(r.current) == 120
+    assert r.check() is None
+
+
+def test_file_still_growing_is_not_loaded(tmp_path):
+    path, r = _reloader(tmp_path)
+    for i, n in enumerate((110, 130, 150)):
+        _write_csv(path, n, mtime=2_000_000_000 + i)
+        assert r.check() is None
+    assert len(r.current) == 100
+
+
+def test_truncated_file_is_refused(tmp_path):
+    path, r = _reloader(tmp_path)
+    _write_csv(path, 30, mtime=2_000_000_000)
+    r.check()
+    stats = r.check()
+    assert stats["kind"] == "refused" and "only 30 trips" in stats["reason"]
+    assert len(r.current) == 100
+    assert "refused" in format_stats(stats)
+    assert r.check() is None                 # not retried until the file changes again
+    assert r.reload_now(force=True)["kind"] == "full"
+    assert len(r.current) == 30
+
+
+def test_many_rejected_rows_are_refused(tmp_path):
+    path, r = _reloader(tmp_path)
+    _write_csv(path, 100, bad=10, mtime=2_000_000_000)
+    stats = r.reload_now()
+    assert stats["kind"] == "refused" and stats["reason"] == "10 of 110 rows rejected"
+    _write_csv(path, 100, bad=2, mtime=3_000_000_000)
+    assert r.reload_now()["kind"] == "full"
+
+
+def test_appended_delta_lines_are_applied(tmp_path):
+    delta = tmp_path / "buses.delta.jsonl"
+    path, r = _reloader(tmp_path, delta_path=str(delta))
+    with open(delta, "a", encoding="utf-8") as f:
+        f.write('{"op": "cancel", "bus_id": "100"}\n{"op": "add", "bus_id": "7", "source": "Delhi", '
+                '"destination": "Agra", "time": "6:00 PM"}\n{"op": "add", "bus_id": "8"')
+    stats = r.check()
+    assert stats["kind"] == "delta" and stats["delta_applied"] == 2
+    assert r.current.trips_for_bus("100") == []
+    assert [t["destination"] for t in r.current.trips_for_bus("7")] == ["Agra"]
+
+
+# ---------- apply_delta_ops ----------
+ROWS = [
+    {"bus_id": "202", "source": "Panipat", "destination": "Delhi", "time": "8:30 AM", "fare": "₹45"},
+    {"bus_id": "202", "source": "Delhi", "destination": "Karnal", "time": "10:00 AM", "fare": "₹50"},
+    {"bus_id": "105", "source": "Delhi", "destination": "Karnal", "time": "9:15 AM", "fare": "₹60"},
+]
+
+
+def _apply(ops):
+    tt, report = Timetable(ROWS), LoadReport()
+    touched, removed, added = apply_delta_ops(tt.trips_for_bus, ops, report)
+    return touched, removed, added, report
+
+
+def test_cancel_matches_only_the_given_fields():
+    touched, removed, added, report = _apply([{"op": "cancel", "bus_id": "202", "destination": "karnal"}])
+    assert [t["destination"] for t in touched["202"]] == ["Delhi"]
+    assert removed == [ROWS[1]] and added == []
+    assert report.rows_ok == 1
+
+
+def test_retime_replaces_the_trip():
+    touched, removed, added, _ = _apply([{"op": "retime", "bus_id": "105", "time": "9:15 am", "new_time": "9:45 AM"}])
+    assert removed == [ROWS[2]]
+    assert [t["time"] for t in added] == ["9:45 AM"]
+    assert ROWS[2]["time"] == "9:15 AM"     # source rows are never modified
+
+
+def test_ops_apply_in_order():
+    ops = [{"op": "add", "bus_id": "303", "source": "Agra", "destination": "Delhi", "time": "7:00 PM"},
+           {"op": "retime", "bus_id": "303", "new_time": "7:30 PM"}]
+    touched, _, added, report = _apply(ops)
+    assert [t["time"] for t in touched["303"]] == ["7:30 PM"] and len(added) == 1
+    assert report.rows_ok == 2
+
+
+def test_bad_ops_are_reported_and_skipped():
+    ops = [{"op": "move", "bus_id": "202"},
+           {"op": "cancel"},
+           {"op": "cancel", "bus_id": "999"},
+           {"op": "retime", "bus_id": "105", "new_time": "25:00"},
+           {"op": "add", "bus_id": "404", "source": "Agra"},
+           ValueError("invalid JSON: x"),
+           {"op": "cancel", "bus_id": "105"}]
+    touched, removed, _, report = _apply(ops)
+    assert report.rows_ok == 1 and report.rows_bad == 6
+    assert [n for n, _ in report.errors] == [1, 2, 3, 4, 5, 6]
+    assert removed == [ROWS[2]]
+
+
+def test_timetable_apply_delta_keeps_the_original():
+    tt = Timetable(ROWS)
+    new = tt.apply_delta([{"op": "cancel", "bus_id": "202", "source": "Delhi"},
+                          {"op": "add", "bus_id": "9", "source": "Delhi", "destination": "Karnal", "time": "6:00 AM"}])
+    assert [t["bus_id"] for t in new.trips_between("Delhi", "Karnal")] == ["9", "105"]
+    assert [t["bus_id"] for t in tt.trips_between("Delhi", "Karnal")] == ["105", "202"]
+    assert len(new) == len(tt)
+
+
+def test_refused_reload_leaves_new_delta_lines_for_the_live_table(tmp_path):
+    delta = tmp_path / "buses.delta.jsonl"
+    path, r = _reloader(tmp_path, delta_path=str(delta))
+    with open(delta, "a", encoding="utf-8") as f:
+        f.write('{"op": "cancel", "bus_id": "100"}\n')
+    _write_csv(path, 30, mtime=2_000_000_000)
+    assert r.reload_now()["kind"] == "refused"
+    assert len(r.current.trips_for_bus("100")) == 1
+    stats = r.check()
+    assert stats["kind"] == "delta" and stats["delta_applied"] == 1
+    assert r.current.trips_for_bus("100") == []
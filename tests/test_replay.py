@@ -0,0 +1,51 @@
+import gzip
+import json
+
+from chetna_replay import diff_labels, iter_user_messages, replay
+
+
+def _log(tmp_path):
+    path = tmp_path / "chat.txt"
+    path.write_text("[2026-01-01 10:00:00] USER: fare of bus 202\n"
+                    "[2026-01-01 10:00:00] CHETNA: Bus 202 fare is ₹45.\n"
+                    "[2026-01-01 10:01:00] USER: delhi se karnal\n"
+                    "[2026-01-01 10:02:00] USER: hello\n", encoding="utf-8")
+    return str(path)
+
+
+def test_reads_text_json_and_gzipped_logs(tmp_path):
+    assert list(iter_user_messages(_log(tmp_path))) == ["fare of bus 202", "delhi se karnal", "hello"]
+    gz = tmp_path / "chat.jsonl.gz"
+    with gzip.open(gz, "wt", encoding="utf-8") as f:
+        f.write(json.dumps({"kind": "chat", "user": "track 105", "bot": "..."}) + "\n")
+        f.write(json.dumps({"kind": "event", "message": "reload"}) + "\n{broken\n")
+    assert list(iter_user_messages(str(gz))) == ["track 105"]
+
+
+def test_replay_labels_in_log_order(tmp_path):
+    out = tmp_path / "run.jsonl"
+    stats = replay(_log(tmp_path), str(out), workers=1, chunk_size=2)
+    assert stats["utterances"] == 3
+    rows = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    assert [(r["n"], r["intent"]) for r in rows] == [(0, "fare_info"), (1, "route_info"), (2, "greetings")]
+
+
+def test_diff_labels(tmp_path):
+    a, b = tmp_path / "a.jsonl", tmp_path / "b.jsonl"
+    a.write_text('{"n": 0, "text": "x", "intent": "unknown"}\n{"n": 1, "text": "y", "intent": "fare_info"}\n')
+    b.write_text('{"n": 0, "text": "x", "intent": "route_info"}\n{"n": 1, "text": "z", "intent": "fare_info"}\n')
+    d = diff_labels(str(a), str(b))
+    assert (d["compared"], d["changed"], d["unaligned"]) == (1, 1, 1)
+    assert d["transitions"] == {"unknown -> route_info": 1}
+
+
+def test_responses_reuse_the_intent(tmp_path, bot, monkeypatch):
+    def no_second_call(text):
+        raise AssertionError("get_intent ran twice for " + text)
+
+    monkeypatch.setattr(bot, "get_intent", no_second_call)
+    out = tmp_path / "run.jsonl"
+    replay(_log(tmp_path), str(out), workers=1, responses=True)
+    rows = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    assert all(r["reply"] for r in rows)
+    assert rows[2]["reply"] == bot.prompt("greeting", rows[2]["lang"])
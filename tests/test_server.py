@@ -0,0 +1,50 @@
+import asyncio
+import json
+
+from chetna_server import MAX_BODY, ChetnaServer
+
+
+async def _request(server, raw):
+    srv = await asyncio.start_server(server.handle_connection, "127.0.0.1", 0)
+    port = srv.sockets[0].getsockname()[1]
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(raw)
+        await writer.drain()
+        data = await asyncio.wait_for(reader.read(), 5)   # until the server closes
+        writer.close()
+    finally:
+        srv.close()
+    head, _, body = data.partition(b"\r\n\r\n")
+    return int(head.split(b" ", 2)[1]), head, body
+
+
+def _post(length_header, body=b""):
+    return (f"POST /chat HTTP/1.1\r\nHost: x\r\nContent-Length: {length_header}\r\n\r\n").encode("latin-1") + body
+
+
+def test_bad_content_length_gets_400_and_close(bot):
+    for value in ("abc", "-5", "1e3", "+7", "\u00b2", "1\u00b9"):
+        status, head, body = asyncio.run(_request(ChetnaServer(bot), _post(value)))
+        assert status == 400, value
+        assert b"Connection: close" in head
+        assert json.loads(body)["error"] == "invalid Content-Length"
+
+
+def test_oversized_body_gets_413(bot):
+    status, head, _ = asyncio.run(_request(ChetnaServer(bot), _post(MAX_BODY + 1)))
+    assert status == 413 and b"Connection: close" in head
+
+
+def test_chat_round_trip(bot):
+    body = json.dumps({"session": "t", "text": "fare of bus 202", "dry_run": True}).encode()
+    raw = _post(len(body), body).replace(b"Host: x\r\n", b"Host: x\r\nConnection: close\r\n")
+    status, _, reply = asyncio.run(_request(ChetnaServer(bot), raw))
+    assert status == 200
+    assert json.loads(reply)["intent"] == "fare_info"
+
+
+def test_track_bus_runs_off_the_loop(bot):
+    server = ChetnaServer(bot)
+    assert server._blocking({"intent": "track_bus"})
+    assert not server._blocking({"intent": "fare_info"})
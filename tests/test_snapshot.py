@@ -0,0 +1,107 @@
+import os
+import shutil
+
+import pytest
+
+from chetna_loader import ChetnaLoader
+from chetna_snapshot import _PREFIX, read_snapshot, snapshot_path, source_key, write_snapshot
+
+from conftest import sample_path
+
+
+@pytest.fixture
+def data(tmp_path):
+    path = tmp_path / "buses.csv"
+    shutil.copy(sample_path("chetnasample_buses.csv"), path)
+    return str(path)
+
+
+def _rows(tt):
+    return sorted((t["bus_id"], t["source"], t["destination"], t["time"], t["fare"]) for t in tt)
+
+
+def _snapshot(data):
+    loader = ChetnaLoader(data, storage="columnar", snapshot=True)
+    return loader, loader.load()
+
+
+def test_round_trip(data):
+    _, built = _snapshot(data)
+    assert os.path.exists(snapshot_path(data))
+    mapped = read_snapshot(snapshot_path(data), source_key(data))
+    assert mapped is not None and _rows(mapped) == _rows(built)
+    assert [t["bus_id"] for t in mapped.trips_between("Delhi", "Karnal")] == \
+        [t["bus_id"] for t in built.trips_between("Delhi", "Karnal")]
+
+
+def test_second_load_maps_the_snapshot(data):
+    loader, first = _snapshot(data)
+    assert loader.last_report is not None          # parsed the CSV
+    loader.last_report = None
+    again = loader.load()
+    assert loader.last_report is None              # served from the snapshot, no parse
+    assert _rows(again) == _rows(first)
+
+
+def test_changed_source_invalidates(data):
+    _snapshot(data)
+    key = source_key(data)
+    with open(data, "a", encoding="utf-8") as f:
+        f.write("999,Delhi,Agra,6:00 PM,₹90\n")
+    assert read_snapshot(snapshot_path(data), source_key(data)) is None
+    loader, tt = _snapshot(data)
+    assert tt.trips_for_bus("999")                 # rebuilt from the new file
+    assert read_snapshot(snapshot_path(data), source_key(data)) is not None
+    assert read_snapshot(snapshot_path(data), key) is None
+
+
+def test_same_size_and_mtime_rewrite_invalidates(data):
+    _snapshot(data)
+    st = os.stat(data)
+    with open(data, "r+b") as f:
+        f.seek(st.st_size - 8)
+        f.write(b"X")
+    os.utime(data, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert read_snapshot(snapshot_path(data), source_key(data)) is None
+
+
+@pytest.mark.parametrize("damage", ["payload", "header", "truncate", "magic"])
+def test_corrupt_snapshot_is_rejected_and_rebuilt(data, damage):
+    _, built = _snapshot(data)
+    snap = snapshot_path(data)
+    size = os.path.getsize(snap)
+    with open(snap, "r+b") as f:
+        if damage == "payload":
+            _, _, hlen = _PREFIX.unpack(f.read(_PREFIX.size))
+            first_column = (_PREFIX.size + hlen + 7) & ~7
+            f.seek(first_column)
+            b = f.read(1)
+            f.seek(first_column)
+            f.write(bytes([b[0] ^ 0xFF]))
+        elif damage == "header":
+            raw = f.read(size)
+            at = raw.index(b'"Delhi"')
+            f.seek(at)
+            f.write(b'"Dehli"')                    # still valid JSON, wrong city
+        elif damage == "truncate":
+            f.truncate(size - 8)
+        else:
+            f.write(b"NOTASNAP")
+    assert read_snapshot(snap, source_key(data)) is None
+    _, again = _snapshot(data)
+    assert _rows(again) == _rows(built)
+    assert read_snapshot(snap, source_key(data)) is not None
+
+
+def test_missing_snapshot(tmp_path):
+    assert read_snapshot(str(tmp_path / "none.snap"), {}) is None
+
+
+def test_write_is_atomic(data, tmp_path):
+    _, tt = _snapshot(data)
+    write_snapshot(tt, str(tmp_path / "x.snap"), {"k": 1})
+    assert sorted(os.listdir(tmp_path)) == sorted(["buses.csv", os.path.basename(snapshot_path(data)), "x.snap"])
+
+
+def test_bot_starts_from_columnar_storage(bot):
+    assert bot.loader.storage == "columnar"
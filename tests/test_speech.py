@@ -0,0 +1,101 @@
+import threading
+import time
+from array import array
+
+from chetna_speech import FRAME_BYTES, RATE, RingBuffer, SpeechService, VadSegmenter
+
+CHUNK = FRAME_BYTES * 4          # what the capture thread reads at a time
+LOUD = array("h", [8000, -8000] * (CHUNK // 4)).tobytes()
+QUIET = bytes(CHUNK)
+
+
+class ScriptedMic:
+    """Live source playing (audio, bot_speaking) chunks; the flag is what mute() sees."""
+
+    live = True
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.speaking = False
+
+    def read(self, frames):
+        if not self.script:
+            return b""
+        data, self.speaking = self.script.pop(0)
+        return data
+
+    def close(self):
+        pass
+
+
+def _seconds(data, speaking, s):
+    return [(data, speaking)] * int(s * RATE * 2 / CHUNK)
+
+
+def _transcripts(svc):
+    out = []
+    while True:
+        text = svc.transcripts.get(timeout=5)
+        if text is None:
+            return out
+        out.append(text)
+
+
+def _run(mute):
+    script = (_seconds(LOUD, True, 1) + _seconds(QUIET, False, 1)      # the bot's reply, heard by the mic
+              + _seconds(LOUD, False, 1) + _seconds(QUIET, False, 1))  # the user's next question
+    mic = ScriptedMic(script)
+    svc = SpeechService(mic, lambda pcm: f"{len(pcm) / (RATE * 2):.1f}s",
+                        mute=(lambda: mic.speaking) if mute else None, mute_tail_ms=0)
+    return svc.start(), _transcripts(svc)
+
+
+def test_own_speech_is_transcribed_without_mute():
+    _, texts = _run(mute=False)
+    assert len(texts) == 2
+
+
+def test_audio_is_dropped_while_the_bot_speaks():
+    svc, texts = _run(mute=True)
+    assert len(texts) == 1
+    assert svc.muted_bytes > 0
+
+
+def test_ring_clear_and_vad_reset():
+    ring = RingBuffer(4 * FRAME_BYTES)
+    ring.write(LOUD[:FRAME_BYTES])
+    ring.clear()
+    assert ring.read(FRAME_BYTES, timeout=0) == b""
+    vad = VadSegmenter()
+    for _ in range(10):
+        vad.feed(LOUD[:FRAME_BYTES])
+    vad.reset()
+    assert vad.flush() is None
+
+
+def test_listen_drops_transcripts_heard_between_turns():
+    svc = SpeechService(ScriptedMic([]), lambda pcm: "")
+    svc.transcripts.put("said while typing")
+    threading.Timer(0.05, svc.transcripts.put, ["fresh"]).start()
+    assert svc.listen(timeout=2) == "fresh"
+
+
+def test_listen_returns_at_once_after_end_of_input():
+    svc = SpeechService(ScriptedMic([]), lambda pcm: "").start()
+    for t in svc._threads:
+        t.join(5)
+    for _ in range(2):
+        t0 = time.monotonic()
+        assert svc.listen(timeout=5) == ""
+        assert time.monotonic() - t0 < 1
+    assert svc.ended
+
+
+def test_listen_returns_at_once_if_the_threads_died():
+    svc = SpeechService(ScriptedMic([]), lambda pcm: "")
+    svc._threads = [threading.Thread(target=lambda: None)]
+    svc._threads[0].start()
+    svc._threads[0].join()
+    t0 = time.monotonic()
+    assert svc.listen(timeout=5) == "" and svc.ended
+    assert time.monotonic() - t0 < 1
@@ -0,0 +1,109 @@
+from datetime import datetime
+
+import pytest
+
+from chetna_loader import (ChetnaLoader, ColumnarTimetable, Timetable, _minutes_from_now,
+                           format_time_minutes, parse_time_minutes)
+
+ROWS = [
+    {"bus_id": "202", "source": "Panipat", "destination": "Delhi", "time": "8:30 AM", "fare": "₹45"},
+    {"bus_id": "202", "source": "Delhi", "destination": "Karnal", "time": "10:00 AM", "fare": "₹50"},
+    {"bus_id": "101", "source": "Delhi", "destination": "Karnal", "time": "7:15 AM", "fare": "₹50"},
+    {"bus_id": "105", "source": "Delhi", "destination": "Karnal", "time": "10:00 PM", "fare": "₹55.50"},
+    {"bus_id": "701", "source": "Delhi", "destination": "Karnal", "time": "2:40 AM", "fare": "₹70"},
+    {"bus_id": "702", "source": "Agra", "destination": "Lucknow", "time": "11:45 AM", "fare": "₹220"},
+]
+
+
+@pytest.fixture(params=["dict", "columnar"])
+def tt(request):
+    return Timetable(ROWS) if request.param == "dict" else ColumnarTimetable.from_rows(ROWS)
+
+
+def _ids(trips):
+    return [t["bus_id"] for t in trips]
+
+
+def test_rows_keep_their_fields(tt):
+    assert len(tt) == len(ROWS)
+    assert sorted(map(dict, tt), key=lambda r: (r["bus_id"], r["time"])) == \
+        sorted(ROWS, key=lambda r: (r["bus_id"], r["time"]))
+
+
+def test_trips_for_bus_is_a_multimap(tt):
+    assert [(t["source"], t["destination"]) for t in tt.trips_for_bus("202")] == \
+        [("Panipat", "Delhi"), ("Delhi", "Karnal")]
+    assert tt.trips_for_bus(202) == tt.trips_for_bus("202")
+    assert tt.trips_for_bus("999") == []
+
+
+def test_trips_between_is_ordered_by_departure(tt):
+    assert _ids(tt.trips_between("Delhi", "Karnal")) == ["701", "101", "202", "105"]
+    assert _ids(tt.trips_between("  delhi ", "KARNAL")) == ["701", "101", "202", "105"]
+    assert tt.trips_between("Karnal", "Delhi") == []
+    assert tt.trips_between("Nowhere", "Delhi") == []
+
+
+def test_trips_are_read_only_copies(tt):
+    tt.trips_for_bus("202").clear()
+    assert len(tt.trips_for_bus("202")) == 2
+
+
+def test_loader_helpers_match_on_lists_and_timetables(tt):
+    for buses in (ROWS, tt):
+        assert ChetnaLoader.search_buses_by_number(buses, "202")["source"] == "Panipat"
+        assert len(ChetnaLoader.search_all_buses_by_number(buses, "202")) == 2
+        assert ChetnaLoader.search_buses_by_number(buses, "999") is None
+        assert sorted(_ids(ChetnaLoader.buses_between(buses, "delhi", "karnal"))) == ["101", "105", "202", "701"]
+
+
+def test_stop_names_keep_the_data_spelling(tt):
+    assert sorted(tt.stop_names()) == ["Agra", "Delhi", "Karnal", "Lucknow", "Panipat"]
+
+
+# ---------- Departure minutes and bisect queries ----------
+@pytest.mark.parametrize("text, minutes", [
+    ("12:00 AM", 0), ("12:30 AM", 30), ("1:05 am", 65), ("11:45 AM", 705),
+    ("12:00 PM", 720), ("12:59 PM", 779), ("11:59 PM", 1439),
+])
+def test_parse_and_format_time_minutes(text, minutes):
+    assert parse_time_minutes(text) == minutes
+    assert parse_time_minutes(format_time_minutes(minutes)) == minutes
+
+
+@pytest.mark.parametrize("text", ["", "25:00 PM", "13:00 AM", "9:60 AM", "9 AM", "noon", None])
+def test_unparseable_times(text):
+    assert parse_time_minutes(text, default=None) is None
+    assert parse_time_minutes(text) == 0
+
+
+def test_next_between_is_inclusive_and_falls_back_to_the_last_trip(tt):
+    assert tt.next_between("Delhi", "Karnal", 0)["bus_id"] == "701"
+    assert tt.next_between("Delhi", "Karnal", 10 * 60)["bus_id"] == "202"       # leaving now counts
+    assert tt.next_between("Delhi", "Karnal", 10 * 60 + 1)["bus_id"] == "105"
+    assert tt.next_between("Delhi", "Karnal", 23 * 60)["bus_id"] == "105"       # none left today
+    assert tt.next_between("Karnal", "Delhi", 0) is None
+
+
+def test_last_in_period_between(tt):
+    assert tt.last_in_period_between("Delhi", "Karnal", "morning")["bus_id"] == "202"
+    assert tt.last_in_period_between("Delhi", "Karnal", "afternoon") is None
+    assert tt.last_in_period_between("Delhi", "Karnal", "night")["bus_id"] == "105"
+    assert tt.last_in_period_between("Delhi", "Karnal", "anytime")["bus_id"] == "105"
+
+
+def test_night_wraps_past_midnight():
+    tt = Timetable([r for r in ROWS if r["bus_id"] != "105"])
+    assert tt.last_in_period_between("Delhi", "Karnal", "night")["bus_id"] == "701"
+
+
+def test_partial_minutes_round_up():
+    assert _minutes_from_now(datetime(2024, 1, 1, 10, 0)) == 600
+    assert _minutes_from_now(datetime(2024, 1, 1, 10, 0, 20)) == 601
+    assert _minutes_from_now(datetime(2024, 1, 1, 10, 0, 0, 1)) == 601
+
+
+def test_next_bus_between_uses_the_clock(tt):
+    loader = ChetnaLoader()
+    assert loader.next_bus_between(tt, "Delhi", "Karnal", datetime(2024, 1, 1, 10, 0, 30))["bus_id"] == "105"
+    assert loader.next_bus_between(ROWS, "Delhi", "Karnal", datetime(2024, 1, 1, 7, 0))["bus_id"] == "101"
@@ -0,0 +1,27 @@
+from chetna_tts import TtsService
+
+
+class RecordingEngine:
+    def __init__(self, tts):
+        self.tts = tts
+        self.heard = []
+
+    def getProperty(self, name):
+        return None
+
+    def say(self, text):
+        self.heard.append((text, self.tts.is_speaking()))
+
+    def runAndWait(self):
+        pass
+
+
+def test_is_speaking_only_while_saying():
+    engines = []
+    tts = TtsService(engine_factory=lambda: engines.append(RecordingEngine(tts)) or engines[0])
+    assert not tts.is_speaking()
+    tts.speak("Bus 202 leaves at 8:30 AM.")
+    assert tts.wait(5)
+    assert engines[0].heard == [("Bus 202 leaves at 8:30 AM.", True)]
+    assert not tts.is_speaking()
+    assert tts.metrics()["spoken"] == 1